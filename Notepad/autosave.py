@@ -0,0 +1,224 @@
+"""Журнал автосохранения NotePad: правки документа дописываются в файл по мере ввода."""
+import contextlib
+import fcntl
+import json
+import os
+import uuid
+
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtGui import QTextCursor, QTextDocument
+
+# Как часто буфер правок сбрасывается на диск, мс
+FLUSH_INTERVAL = 1000
+# Журнал сжимается в снимок, когда правки перевешивают сам документ
+COMPACT_MIN_BYTES = 1024 * 1024
+JOURNAL_SUFFIX = ".journal"
+# Подкаталог для журналов, которые не удалось восстановить: они не удаляются
+KEPT_DIR = "kept"
+FORMAT_VERSION = 1
+
+
+def state_dir():
+    """Каталог журналов в XDG state dir"""
+    base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    path = os.path.join(base, "nuros-notepad", "autosave")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class BaseChangedError(ValueError):
+    """Файл-база изменился после начала журнала"""
+
+
+def file_signature(path):
+    """Размер и mtime файла — по ним проверяется, что база журнала не изменилась"""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class AutosaveJournal(QObject):
+    """Пишет правки одного документа в журнал с дозаписью.
+
+    Первая строка журнала — заголовок с путём к файлу (база — его содержимое
+    на диске) или со снимком текста, дальше по строке на правку:
+    [позиция, удалено символов, вставленный текст]. Стоимость записи
+    пропорциональна размеру правки, а не документа.
+    """
+
+    def __init__(self, document, directory=None, parent=None):
+        super().__init__(parent)
+        self.document = None
+        self.directory = directory or state_dir()
+        self.path = os.path.join(self.directory, uuid.uuid4().hex + JOURNAL_SUFFIX)
+        self.file = None
+        self.header_path = None
+        self.pending = []
+        self.journal_bytes = 0
+        self.suspended = 0
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(FLUSH_INTERVAL)
+        self.flush_timer.timeout.connect(self.flush)
+
+        self.attach(document)
+
+    @contextlib.contextmanager
+    def suspend(self):
+        """Правки внутри блока (например, загрузка файла) в журнал не попадают"""
+        self.suspended += 1
+        try:
+            yield
+        finally:
+            self.suspended -= 1
+
+    def attach(self, document):
+        """Подключает журнал к документу или отключает от него (document=None)"""
+        if self.document is not None:
+            self.flush()
+            self.document.contentsChange.disconnect(self.on_contents_change)
+        self.document = document
+        if document is not None:
+            document.contentsChange.connect(self.on_contents_change)
+
+    def start(self, file_path=None, text=None):
+        """Начинает новый журнал: от файла на диске, от пустого документа или от снимка текста"""
+        header = {"v": FORMAT_VERSION, "path": file_path}
+        if text is not None:
+            header["text"] = text
+        elif file_path:
+            header["size"], header["mtime"] = file_signature(file_path)
+        self.rewrite(header)
+
+    def compact(self):
+        """Заменяет журнал снимком текущего текста"""
+        self.start(self.header_path, self.document.toPlainText())
+
+    def rewrite(self, header):
+        self.pending = []
+        self.flush_timer.stop()
+        temp_path = self.path + ".tmp"
+        file = open(temp_path, "w", encoding="utf-8")
+        fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        line = json.dumps(header, ensure_ascii=False) + "\n"
+        file.write(line)
+        file.flush()
+        os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+        if self.file is not None:
+            self.file.close()
+        self.file = file
+        self.header_path = header["path"]
+        self.journal_bytes = 0
+
+    def on_contents_change(self, position, removed, added):
+        if self.suspended or self.file is None:
+            return
+        text = ""
+        if added:
+            cursor = QTextCursor(self.document)
+            cursor.setPosition(position)
+            # Вставка в конец документа захватывает и завершающий разделитель абзаца
+            end = min(position + added, self.document.characterCount() - 1)
+            cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+            text = cursor.selectedText().replace("\u2029", "\n")
+        record = json.dumps([position, removed, text], ensure_ascii=False) + "\n"
+        self.pending.append(record)
+        self.journal_bytes += len(record)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        if self.file is None or not self.pending:
+            return
+        self.file.write("".join(self.pending))
+        self.pending = []
+        self.file.flush()
+        os.fdatasync(self.file.fileno())
+        # Сжатие амортизировано: снимок пишется не чаще, чем набирается столько же правок
+        if self.journal_bytes > max(COMPACT_MIN_BYTES, self.document.characterCount() * 2):
+            self.compact()
+
+    def discard(self):
+        """Удаляет журнал: документ сохранён или изменения отброшены"""
+        self.flush_timer.stop()
+        self.pending = []
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path)
+
+
+def find_orphans(directory=None):
+    """Журналы, которые никто не держит открытыми — остались после сбоя"""
+    directory = directory or state_dir()
+    orphans = []
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(JOURNAL_SUFFIX):
+            continue
+        with open(entry.path, "rb") as file:
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            fcntl.flock(file, fcntl.LOCK_UN)
+        orphans.append(entry.path)
+    return orphans
+
+
+def replay(journal_path, ignore_base_change=False):
+    """Восстанавливает текст по журналу.
+
+    Возвращает (путь к исходному файлу или None, текст, были ли изменения
+    относительно файла). Недописанная
+    последняя строка (сбой посреди записи) пропускается. Если файл-база
+    изменился после начала журнала, бросает BaseChangedError; с
+    ignore_base_change правки применяются к текущему содержимому файла.
+    """
+    with open(journal_path, "r", encoding="utf-8") as file:
+        header = json.loads(file.readline())
+        if header.get("v") != FORMAT_VERSION:
+            raise ValueError(f"Неизвестная версия журнала: {header.get('v')}")
+        file_path = header.get("path")
+        if "text" in header:
+            base = header["text"]
+        elif file_path:
+            if not ignore_base_change and \
+                    file_signature(file_path) != (header["size"], header["mtime"]):
+                raise BaseChangedError(f"Файл изменился после начала журнала: {file_path}")
+            with open(file_path, "r", encoding="utf-8") as source:
+                base = source.read()
+        else:
+            base = ""
+
+        # Позиции в журнале — позиции QTextDocument, поэтому и применяем их к нему
+        document = QTextDocument()
+        document.setPlainText(base)
+        cursor = QTextCursor(document)
+        changed = "text" in header
+        for line in file:
+            try:
+                position, removed, text = json.loads(line)
+            except ValueError:
+                break
+            end_limit = document.characterCount() - 1
+            cursor.setPosition(min(position, end_limit))
+            cursor.setPosition(min(position + removed, end_limit), QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText(text)
+            changed = True
+    return file_path, document.toPlainText(), changed
+
+
+def set_aside(journal_path):
+    """Убирает журнал из восстановления при запуске, не удаляя его; возвращает новый путь"""
+    directory = os.path.join(os.path.dirname(journal_path), KEPT_DIR)
+    os.makedirs(directory, exist_ok=True)
+    target = os.path.join(directory, os.path.basename(journal_path))
+    os.replace(journal_path, target)
+    return target
+
+
+def remove_journal(journal_path):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(journal_path)
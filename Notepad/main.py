@@ -1,21 +1,39 @@
+import os
 import sys
-from PyQt6.QtWidgets import (
-    QApplication, QMainWindow, QTextEdit, QVBoxLayout, QWidget, 
-    QFileDialog, QPushButton, QToolBar, QStatusBar, QMessageBox, 
-    QFontDialog, QColorDialog, QMenu, QMenuBar, QFrame
-)
-from PyQt6.QtGui import QAction, QTextCharFormat, QSyntaxHighlighter, QFont, QPalette, QColor
-from PyQt6.QtCore import Qt, QRegularExpression
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.applog import setup_logging
+from common.single_instance import AUTOSTART_FLAG, file_arguments, handoff, install_autostart
+from common.startup import profiler
+
+# До импорта PyQt6: если NotePad уже запущен, отдаём ему файлы и выходим
+if __name__ == "__main__" and handoff("notepad", sys.argv):
+    sys.exit(0)
+
+with profiler.phase("import PyQt6"):
+    from PyQt6.QtWidgets import (
+        QApplication, QMainWindow, QVBoxLayout, QWidget,
+        QFileDialog, QToolBar, QStatusBar, QMessageBox,
+        QFontDialog, QColorDialog, QFrame
+    )
+    from PyQt6.QtGui import QAction, QTextCharFormat, QSyntaxHighlighter, QColor
+    from PyQt6.QtCore import QRegularExpression, QTimer
+
+with profiler.phase("import notepad"):
+    from common.instance_host import InstanceHost
+    from autosave import BaseChangedError, find_orphans, remove_journal, replay, set_aside
+    from search import FindReplaceBar
+    from tabs import EditorTabs
 
 class SyntaxHighlighter(QSyntaxHighlighter):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.highlighting_rules = []
         formats = {
-            'keyword': (QColor("#5c90ff"), 700, r"\b(def|class|if|else|for|while|return|import|from)\b"),
-            'string': (QColor("#4a7ae0"), 400, r'\".*?\"'),
-            'comment': (QColor("#666666"), 400, r'\#.*'),
-            'number': (QColor("#3e68c7"), 400, r'\b\d+\b')
+            'keyword': (QColor.fromString("#5c90ff"), 700, r"\b(def|class|if|else|for|while|return|import|from)\b"),
+            'string': (QColor.fromString("#4a7ae0"), 400, r'\".*?\"'),
+            'comment': (QColor.fromString("#666666"), 400, r'\#.*'),
+            'number': (QColor.fromString("#3e68c7"), 400, r'\b\d+\b')
         }
         for name, (color, weight, pattern) in formats.items():
             text_format = QTextCharFormat()
@@ -33,7 +51,6 @@ class NotePad(QMainWindow):
         super().__init__()
         self.setWindowTitle("NurOS Dark NotePad")
         self.setMinimumSize(800, 600)
-        self.current_file = None
 
         # Создаем центральный виджет
         central_widget = QWidget()
@@ -43,23 +60,28 @@ class NotePad(QMainWindow):
         # Создаем карточку для текстового редактора
         card = QFrame()
         card.setObjectName("card")
-        card_layout = QVBoxLayout(card)
+        self.card_layout = QVBoxLayout(card)
 
-        # Текстовый редактор
-        self.text_edit = QTextEdit()
-        self.text_edit.setObjectName("editor")
-        card_layout.addWidget(self.text_edit)
+        # Вкладки с документами: редактор и подсветка создаются при первом показе
+        self.tabs = EditorTabs(SyntaxHighlighter)
+        self.tabs.setObjectName("tabs")
+        self.tabs.tabCloseRequested.connect(lambda index: self.close_tab(self.tabs.widget(index)))
+        self.card_layout.addWidget(self.tabs)
+
+        # Панель поиска и замены создаётся при первом Ctrl+F / Ctrl+H
+        self.find_bar = None
 
         # Добавляем карточку в основной layout
         main_layout.addWidget(card)
 
-        # Подсветка синтаксиса
-        self.highlighter = SyntaxHighlighter(self.text_edit.document())
+        self.tabs.add_document()
 
         # Создаем интерфейс
         self.create_ui()
         self.apply_NurOS_dark_theme()
 
+        self.restore_pending = True
+
     def create_ui(self):
         # Toolbar
         toolbar = QToolBar()
@@ -67,10 +89,13 @@ class NotePad(QMainWindow):
         toolbar.setObjectName("toolbar")
 
         actions = {
+            "Новый": ("📄", "Ctrl+N", self.new_file),
             "Открыть": ("📂", "Ctrl+O", self.open_file),
             "Сохранить": ("💾", "Ctrl+S", self.save_file),
             "Сохранить как": ("📋", "Ctrl+Shift+S", self.save_file_as),
-            "Шрифт": ("🔤", "Ctrl+F", self.choose_font),
+            "Найти": ("🔍", "Ctrl+F", lambda: self.search_bar().open_bar()),
+            "Заменить": ("🔁", "Ctrl+H", lambda: self.search_bar().open_bar(replace=True)),
+            "Шрифт": ("🔤", "Ctrl+Shift+F", self.choose_font),
             "Цвет": ("🎨", "Ctrl+T", self.choose_text_color),
             "Выход": ("❌", "Ctrl+Q", self.close)
         }
@@ -94,27 +119,40 @@ class NotePad(QMainWindow):
         menu_bar.setObjectName("menubar")
         
         file_menu = menu_bar.addMenu("Файл")
+        edit_menu = menu_bar.addMenu("Правка")
         view_menu = menu_bar.addMenu("Вид")
 
         file_actions = [
+            ("Новый", self.new_file),
             ("Открыть", self.open_file),
             ("Сохранить", self.save_file),
             ("Сохранить как", self.save_file_as),
+            ("Закрыть вкладку", self.close_tab, "Ctrl+W"),
             (None, None),
             ("Выход", self.close)
         ]
 
+        edit_actions = [
+            ("Найти", lambda: self.search_bar().open_bar()),
+            ("Найти далее", lambda: self.search_bar().find_next(), "F3"),
+            ("Найти предыдущее", lambda: self.search_bar().find_previous(), "Shift+F3"),
+            ("Заменить", lambda: self.search_bar().open_bar(replace=True)),
+        ]
+
         theme_actions = [
             ("Тёмная тема", self.apply_NurOS_dark_theme),
             ("Светлая тема", self.apply_NurOS_light_theme)
         ]
 
-        for menu, actions in [(file_menu, file_actions), (view_menu, theme_actions)]:
-            for text, slot in actions:
+        for menu, actions in [(file_menu, file_actions), (edit_menu, edit_actions),
+                              (view_menu, theme_actions)]:
+            for text, slot, *shortcut in actions:
                 if text is None:
                     menu.addSeparator()
                 else:
-                    menu.addAction(text, slot)
+                    action = menu.addAction(text, slot)
+                    if shortcut:
+                        action.setShortcut(shortcut[0])
 
     def apply_NurOS_dark_theme(self):
         self.setStyleSheet("""
@@ -181,6 +219,55 @@ class NotePad(QMainWindow):
                 background-color: #2d2d2d;
                 color: white;
             }
+            
+            QTabWidget::pane {
+                border: none;
+            }
+            
+            QTabBar::tab {
+                background-color: #3d3d3d;
+                color: white;
+                border-radius: 5px;
+                padding: 6px 12px;
+                margin-right: 4px;
+            }
+            
+            QTabBar::tab:selected {
+                background-color: #5c90ff;
+            }
+            
+            #findbar {
+                background-color: #2d2d2d;
+                border-radius: 5px;
+            }
+            
+            #findbar QLineEdit {
+                background-color: #3d3d3d;
+                border: 1px solid #3d3d3d;
+                border-radius: 5px;
+                padding: 5px;
+                color: white;
+            }
+            
+            #findbar QLineEdit:focus {
+                border: 1px solid #5c90ff;
+            }
+            
+            #findbar QPushButton {
+                background-color: #3d3d3d;
+                border: none;
+                border-radius: 5px;
+                padding: 5px 10px;
+                color: white;
+            }
+            
+            #findbar QPushButton:hover {
+                background-color: #4a7ae0;
+            }
+            
+            #findbar QCheckBox, #findcount {
+                color: white;
+            }
         """)
 
     def apply_NurOS_light_theme(self):
@@ -248,38 +335,125 @@ class NotePad(QMainWindow):
                 background-color: white;
                 color: #333333;
             }
+            
+            QTabWidget::pane {
+                border: none;
+            }
+            
+            QTabBar::tab {
+                background-color: #f5f5f5;
+                color: #333333;
+                border-radius: 5px;
+                padding: 6px 12px;
+                margin-right: 4px;
+            }
+            
+            QTabBar::tab:selected {
+                background-color: #5c90ff;
+                color: white;
+            }
+            
+            #findbar {
+                background-color: white;
+                border-radius: 5px;
+            }
+            
+            #findbar QLineEdit {
+                background-color: #f5f5f5;
+                border: 1px solid #e0e0e0;
+                border-radius: 5px;
+                padding: 5px;
+                color: #333333;
+            }
+            
+            #findbar QLineEdit:focus {
+                border: 1px solid #5c90ff;
+            }
+            
+            #findbar QPushButton {
+                background-color: #f5f5f5;
+                border: none;
+                border-radius: 5px;
+                padding: 5px 10px;
+                color: #333333;
+            }
+            
+            #findbar QPushButton:hover {
+                background-color: #e0e0e0;
+            }
+            
+            #findbar QCheckBox, #findcount {
+                color: #333333;
+            }
         """)
 
+    def search_bar(self):
+        """Панель поиска; создаётся при первом обращении, а не до первой отрисовки"""
+        if self.find_bar is None:
+            self.find_bar = FindReplaceBar(self.text_edit)
+            self.tabs.current_editor_changed.connect(self.find_bar.set_editor)
+            self.find_bar.message.connect(self.status_bar.showMessage)
+            self.card_layout.addWidget(self.find_bar)
+        return self.find_bar
+
+    @property
+    def text_edit(self):
+        return self.tabs.current_editor()
+
     # Остальные методы остаются без изменений
     def file_dialog(self, save=False):
-        dialog = QFileDialog.getSaveFileName if save else QFileDialog.getOpenFileName
-        return dialog(self, "Сохранить файл" if save else "Открыть файл", "", "Текстовые файлы (*.txt);;Все файлы (*)")[0]
+        file_filter = "Текстовые файлы (*.txt);;Все файлы (*)"
+        if save:
+            return QFileDialog.getSaveFileName(self, "Сохранить файл", "", file_filter)[0]
+        return QFileDialog.getOpenFileNames(self, "Открыть файл", "", file_filter)[0]
+
+    def new_file(self):
+        self.tabs.add_document()
 
     def open_file(self):
-        if path := self.file_dialog():
-            try:
-                with open(path, "r", encoding="utf-8") as file:
-                    self.text_edit.setPlainText(file.read())
-                    self.current_file = path
-                    self.status_bar.showMessage(f"Файл открыт: {path}", 5000)
-            except Exception as e:
-                QMessageBox.critical(self, "Ошибка", f"Не удалось открыть файл: {e}")
+        self.open_paths(self.file_dialog())
+
+    def open_path(self, path, activate=True):
+        path = os.path.abspath(path)
+        for tab in self.tabs.all_tabs():
+            if tab.path == path:
+                if activate:
+                    self.tabs.activate(tab)
+                return tab
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                text = file.read()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось открыть файл: {e}")
+            return None
+        blank = self.tabs.current_tab()
+        tab = self.tabs.add_document(path, text, activate=activate)
+        if activate and blank is not None and blank.is_blank():
+            self.tabs.close_document(blank)
+        self.status_bar.showMessage(f"Файл открыт: {path}", 5000)
+        return tab
 
-    def save_file(self):
-        if not self.current_file:
-            self.save_file_as()
+    def save_file(self, tab=None):
+        tab = tab or self.tabs.current_tab()
+        if not tab.path:
+            self.save_file_as(tab)
         else:
             try:
-                with open(self.current_file, "w", encoding="utf-8") as file:
-                    file.write(self.text_edit.toPlainText())
-                    self.status_bar.showMessage(f"Файл сохранён: {self.current_file}", 5000)
+                with open(tab.path, "w", encoding="utf-8") as file:
+                    file.write(tab.text())
+                tab.set_modified(False)
+                # Сохранённый файл становится новой базой журнала
+                tab.journal.start(tab.path)
+                self.tabs.update_title(tab)
+                self.status_bar.showMessage(f"Файл сохранён: {tab.path}", 5000)
             except Exception as e:
                 QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл: {e}")
 
-    def save_file_as(self):
+    def save_file_as(self, tab=None):
+        tab = tab or self.tabs.current_tab()
         if path := self.file_dialog(save=True):
-            self.current_file = path
-            self.save_file()
+            tab.path = path
+            self.save_file(tab)
 
     def choose_font(self):
         if (font := QFontDialog.getFont(self.text_edit.currentFont(), self))[1]:
@@ -289,25 +463,135 @@ class NotePad(QMainWindow):
         if (color := QColorDialog.getColor(self.text_edit.textColor(), self)).isValid():
             self.text_edit.setTextColor(color)
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.restore_pending:
+            # Предлагаем восстановить то, что осталось после сбоя. Не в __init__:
+            # прогретое окно демона строится заранее и до показа ни о чём не спрашивает
+            self.restore_pending = False
+            QTimer.singleShot(0, self.restore_autosave)
+            # Первое оформление текста строит перечисления Qt (~30 мс) — уже после отрисовки
+            QTimer.singleShot(0, self.tabs.start_highlighting)
+
+    def open_paths(self, paths):
+        for index, path in enumerate(paths):
+            # Показываем только первый файл: остальные вкладки создадут редактор при показе
+            self.open_path(path, activate=index == 0)
+
+    def restore_autosave(self):
+        blank = self.tabs.current_tab()
+        restored = None
+        for journal in find_orphans():
+            try:
+                file_path, text, changed = replay(journal)
+            except BaseChangedError as e:
+                restored = self.resolve_changed_base(journal, e) or restored
+                continue
+            except (OSError, ValueError) as e:
+                self.keep_journal(journal, f"Не удалось восстановить несохранённые изменения: {e}")
+                continue
+            if not changed:
+                remove_journal(journal)
+                continue
+            reply = QMessageBox.question(self, "Автосохранение",
+                f"Найдены несохранённые изменения ({file_path or 'без имени'}). Восстановить?")
+            if reply == QMessageBox.StandardButton.Yes:
+                restored = self.tabs.add_document(file_path, text, modified=True, activate=False)
+            remove_journal(journal)
+        if restored is not None:
+            self.tabs.activate(restored)
+            if blank is not None and blank.is_blank():
+                self.tabs.close_document(blank)
+            self.status_bar.showMessage("Изменения восстановлены", 5000)
+
+    def resolve_changed_base(self, journal, error):
+        """Файл изменился после начала журнала: правки удаляются только по явному выбору.
+
+        Возвращает вкладку с применёнными правками или None.
+        """
+        box = QMessageBox(QMessageBox.Icon.Warning, "Автосохранение",
+            f"{error}.\nНесохранённые изменения можно применить к текущей версии файла "
+            "(позиции правок могут сместиться), отложить или удалить.", parent=self)
+        apply_button = box.addButton("Применить", QMessageBox.ButtonRole.AcceptRole)
+        discard_button = box.addButton("Удалить", QMessageBox.ButtonRole.DestructiveRole)
+        box.addButton("Отложить", QMessageBox.ButtonRole.RejectRole)
+        box.exec()
+        if box.clickedButton() is discard_button:
+            remove_journal(journal)
+            return None
+        if box.clickedButton() is apply_button:
+            try:
+                file_path, text, _ = replay(journal, ignore_base_change=True)
+            except (OSError, ValueError) as e:
+                self.keep_journal(journal, f"Не удалось применить изменения: {e}")
+                return None
+            # Вкладка без пути: применённые к другой версии правки не должны
+            # случайно перезаписать файл по Ctrl+S
+            tab = self.tabs.add_document(None, text, modified=True, activate=False)
+            self.keep_journal(journal, f"Изменения для {file_path} открыты в новой вкладке.")
+            return tab
+        self.keep_journal(journal, "Изменения отложены.")
+        return None
+
+    def keep_journal(self, journal, message):
+        """Откладывает журнал и сообщает, где он лежит"""
+        try:
+            kept = set_aside(journal)
+        except OSError as e:
+            kept = journal
+            message += f"\nНе удалось переместить журнал: {e}"
+        QMessageBox.warning(self, "Автосохранение", f"{message}\nЖурнал сохранён: {kept}")
+
+    def close_tab(self, page=None):
+        tab = self.tabs.documents.get(page) if page else self.tabs.current_tab()
+        if tab is None or not self.maybe_save(tab):
+            return
+        self.tabs.close_document(tab)
+        if not self.tabs.count():
+            self.tabs.add_document()
+
     def closeEvent(self, event):
-        if self.text_edit.document().isModified():
-            reply = QMessageBox.question(self, "Выход", 
-                "У вас есть несохранённые изменения. Сохранить?",
-                QMessageBox.StandardButton.Save | 
-                QMessageBox.StandardButton.Discard | 
-                QMessageBox.StandardButton.Cancel)
-            if reply == QMessageBox.StandardButton.Save:
-                self.save_file()
-                event.accept()
-            elif reply == QMessageBox.StandardButton.Discard:
-                event.accept()
-            else:
+        for tab in self.tabs.all_tabs():
+            if not self.maybe_save(tab):
                 event.ignore()
-        else:
-            event.accept()
+                return
+        event.accept()
+        if self.find_bar is not None:
+            self.find_bar.shutdown()
+        for tab in self.tabs.all_tabs():
+            if tab.is_modified():
+                # Сохранить не удалось — журнал остаётся для восстановления
+                tab.journal.flush()
+            else:
+                tab.journal.discard()
+
+    def maybe_save(self, tab):
+        """Спрашивает о несохранённых изменениях; False — пользователь передумал закрывать"""
+        if not tab.is_modified():
+            return True
+        self.tabs.activate(tab)
+        reply = QMessageBox.question(self, "Выход",
+            f"В документе «{tab.title().lstrip('• ')}» есть несохранённые изменения. Сохранить?",
+            QMessageBox.StandardButton.Save |
+            QMessageBox.StandardButton.Discard |
+            QMessageBox.StandardButton.Cancel)
+        if reply == QMessageBox.StandardButton.Save:
+            self.save_file(tab)
+            return True
+        if reply == QMessageBox.StandardButton.Discard:
+            tab.set_modified(False)
+            return True
+        return False
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    notepad = NotePad()
-    notepad.show()
+    if AUTOSTART_FLAG in sys.argv:
+        print(install_autostart("notepad", "NurOS NotePad", __file__))
+        sys.exit(0)
+    setup_logging("notepad")
+    with profiler.phase("QApplication"):
+        app = QApplication(sys.argv)
+    profiler.watch_first_paint("notepad")
+    with profiler.phase("NotePad"):
+        host = InstanceHost.from_argv("notepad", NotePad, NotePad.open_paths, sys.argv)
+        host.start(file_arguments(sys.argv))
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,490 @@
+"""Поиск и замена для NotePad: поиск в рабочем потоке, подсветка видимых совпадений."""
+import bisect
+import re
+
+from PyQt6.QtCore import QObject, QPoint, QThread, QTimer, Qt, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QColor, QTextCharFormat, QTextCursor
+from PyQt6.QtWidgets import (
+    QCheckBox, QFrame, QHBoxLayout, QLabel, QLineEdit, QPushButton, QTextEdit
+)
+
+# Сколько совпадений отправлять в GUI-поток за один сигнал
+BATCH_SIZE = 2000
+# Больше выделений на экране всё равно не поместится
+MAX_VISIBLE_SELECTIONS = 2000
+# Задержка повторного поиска после правки документа, мс
+RESEARCH_DELAY = 300
+
+_ASTRAL = re.compile("[\U00010000-\U0010FFFF]")
+
+
+def compile_pattern(text, regex=False, case_sensitive=False, whole_word=False):
+    """Собирает re.Pattern из строки поиска; при ошибке бросает re.error"""
+    source = text if regex else re.escape(text)
+    if whole_word:
+        source = rf"\b(?:{source})\b"
+    flags = re.MULTILINE
+    if not case_sensitive:
+        flags |= re.IGNORECASE
+    return re.compile(source, flags)
+
+
+class Utf16Map:
+    """Перевод позиций Python-строки в позиции QTextDocument (UTF-16).
+
+    Символы вне BMP занимают в документе две позиции, поэтому для каждой
+    позиции добавляется число таких символов перед ней. Для текста без них
+    перевод тождественный и ничего не стоит.
+    """
+
+    def __init__(self, text):
+        self.astral = [] if text.isascii() else [m.start() for m in _ASTRAL.finditer(text)]
+
+    def __call__(self, pos):
+        if not self.astral:
+            return pos
+        return pos + bisect.bisect_left(self.astral, pos)
+
+
+class SearchWorker(QObject):
+    """Выполняет поиск и замену по снимку текста вне GUI-потока"""
+    matches_found = pyqtSignal(int, list)               # поколение, [(начало, длина), ...]
+    search_finished = pyqtSignal(int, int)              # поколение, всего совпадений
+    replace_ready = pyqtSignal(int, int, int, str, int)  # поколение, начало, конец, текст, замен
+    search_failed = pyqtSignal(int, str)
+
+    def __init__(self):
+        super().__init__()
+        # Записывается из GUI-потока; устаревшие задания прекращаются сами
+        self.latest = 0
+
+    @pyqtSlot(int, str, object)
+    def search(self, generation, text, pattern):
+        to_doc = Utf16Map(text)
+        batch = []
+        total = 0
+        try:
+            for match in pattern.finditer(text):
+                if self.latest != generation:
+                    return
+                start, end = match.span()
+                if start == end:
+                    continue
+                doc_start = to_doc(start)
+                batch.append((doc_start, to_doc(end) - doc_start))
+                if len(batch) >= BATCH_SIZE:
+                    total += len(batch)
+                    self.matches_found.emit(generation, batch)
+                    batch = []
+        except Exception as e:
+            self.search_failed.emit(generation, str(e))
+            return
+        if batch:
+            total += len(batch)
+            self.matches_found.emit(generation, batch)
+        self.search_finished.emit(generation, total)
+
+    @pyqtSlot(int, str, object, str, bool)
+    def replace_all(self, generation, text, pattern, replacement, expand):
+        # Собираем новый текст только для участка от первого до последнего
+        # совпадения: в документ он вставится одной правкой
+        parts = []
+        first = last = None
+        count = 0
+        try:
+            for match in pattern.finditer(text):
+                if self.latest != generation:
+                    return
+                start, end = match.span()
+                if start == end:
+                    continue
+                if first is None:
+                    first = start
+                else:
+                    parts.append(text[last:start])
+                parts.append(match.expand(replacement) if expand else replacement)
+                last = end
+                count += 1
+        except Exception as e:
+            self.search_failed.emit(generation, str(e))
+            return
+        if first is None:
+            self.replace_ready.emit(generation, 0, 0, "", 0)
+            return
+        to_doc = Utf16Map(text)
+        self.replace_ready.emit(generation, to_doc(first), to_doc(last), "".join(parts), count)
+
+
+class MatchHighlighter:
+    """Хранит найденные совпадения и подсвечивает только видимые из них"""
+
+    def __init__(self):
+        self.editor = None
+        self.starts = []
+        self.lengths = []
+        self.current = -1
+
+        self.match_format = QTextCharFormat()
+        self.match_format.setBackground(QColor.fromString("#4a7ae0"))
+        self.match_format.setForeground(QColor.fromString("#ffffff"))
+        self.current_format = QTextCharFormat()
+        self.current_format.setBackground(QColor.fromString("#ffb347"))
+        self.current_format.setForeground(QColor.fromString("#1a1a1a"))
+
+        # Прокрутка и пачки совпадений приходят часто: перерисовка одна на цикл событий
+        self.refresh_timer = QTimer()
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(0)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def set_editor(self, editor):
+        if self.editor is not None:
+            self.editor.setExtraSelections([])
+            self.editor.verticalScrollBar().valueChanged.disconnect(self.schedule_refresh)
+            self.editor.horizontalScrollBar().valueChanged.disconnect(self.schedule_refresh)
+            self.editor.verticalScrollBar().rangeChanged.disconnect(self.schedule_refresh)
+        self.editor = editor
+        if editor is not None:
+            editor.verticalScrollBar().valueChanged.connect(self.schedule_refresh)
+            editor.horizontalScrollBar().valueChanged.connect(self.schedule_refresh)
+            editor.verticalScrollBar().rangeChanged.connect(self.schedule_refresh)
+        self.clear()
+
+    def clear(self):
+        self.starts = []
+        self.lengths = []
+        self.current = -1
+        self.schedule_refresh()
+
+    def extend(self, matches):
+        for start, length in matches:
+            self.starts.append(start)
+            self.lengths.append(length)
+        self.schedule_refresh()
+
+    def count(self):
+        return len(self.starts)
+
+    def schedule_refresh(self, *args):
+        self.refresh_timer.start()
+
+    def visible_range(self):
+        viewport = self.editor.viewport()
+        top = self.editor.cursorForPosition(QPoint(0, 0)).position()
+        bottom = self.editor.cursorForPosition(
+            QPoint(viewport.width() - 1, viewport.height() - 1)).position()
+        return top, bottom
+
+    def refresh(self):
+        if self.editor is None:
+            return
+        if not self.starts:
+            self.editor.setExtraSelections([])
+            return
+        top, bottom = self.visible_range()
+        lo = bisect.bisect_left(self.starts, top)
+        if lo > 0 and self.starts[lo - 1] + self.lengths[lo - 1] > top:
+            lo -= 1
+        hi = min(bisect.bisect_right(self.starts, bottom), lo + MAX_VISIBLE_SELECTIONS)
+
+        selections = []
+        document = self.editor.document()
+        for i in range(lo, hi):
+            selection = QTextEdit.ExtraSelection()
+            cursor = QTextCursor(document)
+            cursor.setPosition(self.starts[i])
+            cursor.setPosition(self.starts[i] + self.lengths[i], QTextCursor.MoveMode.KeepAnchor)
+            selection.cursor = cursor
+            selection.format = self.current_format if i == self.current else self.match_format
+            selections.append(selection)
+        self.editor.setExtraSelections(selections)
+
+    def index_from(self, position, backward=False):
+        """Индекс ближайшего совпадения после (или до) позиции, по кругу"""
+        if not self.starts:
+            return -1
+        if backward:
+            index = bisect.bisect_left(self.starts, position) - 1
+            return index % len(self.starts)
+        index = bisect.bisect_left(self.starts, position)
+        return index if index < len(self.starts) else 0
+
+    def select(self, index):
+        self.current = index
+        cursor = self.editor.textCursor()
+        cursor.setPosition(self.starts[index])
+        cursor.setPosition(self.starts[index] + self.lengths[index], QTextCursor.MoveMode.KeepAnchor)
+        self.editor.setTextCursor(cursor)
+        self.editor.ensureCursorVisible()
+        self.schedule_refresh()
+
+
+class FindReplaceBar(QFrame):
+    """Панель поиска и замены под редактором"""
+    _search_requested = pyqtSignal(int, str, object)
+    _replace_requested = pyqtSignal(int, str, object, str, bool)
+    # Сообщения для строки состояния
+    message = pyqtSignal(str, int)
+
+    def __init__(self, editor=None, parent=None):
+        super().__init__(parent)
+        self.setObjectName("findbar")
+        self.editor = None
+        self.generation = 0
+        self.searching = False
+        self.pattern = None
+
+        # Рабочий поток запускается при первом поиске и живёт до закрытия окна
+        self.thread = QThread()
+        self.worker = SearchWorker()
+        self.worker.moveToThread(self.thread)
+        self._search_requested.connect(self.worker.search)
+        self._replace_requested.connect(self.worker.replace_all)
+        self.worker.matches_found.connect(self.on_matches_found)
+        self.worker.search_finished.connect(self.on_search_finished)
+        self.worker.replace_ready.connect(self.on_replace_ready)
+        self.worker.search_failed.connect(self.on_search_failed)
+
+        self.highlighter = MatchHighlighter()
+
+        self.research_timer = QTimer(self)
+        self.research_timer.setSingleShot(True)
+        self.research_timer.setInterval(RESEARCH_DELAY)
+        self.research_timer.timeout.connect(self.start_search)
+
+        self.create_ui()
+        self.set_editor(editor)
+        self.hide()
+
+    def create_ui(self):
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(10, 5, 10, 5)
+
+        self.find_input = QLineEdit()
+        self.find_input.setPlaceholderText("Найти")
+        self.replace_input = QLineEdit()
+        self.replace_input.setPlaceholderText("Заменить на")
+        self.case_box = QCheckBox("Aa")
+        self.case_box.setToolTip("Учитывать регистр")
+        self.word_box = QCheckBox("Слово")
+        self.word_box.setToolTip("Только целые слова")
+        self.regex_box = QCheckBox(".*")
+        self.regex_box.setToolTip("Регулярное выражение")
+        self.count_label = QLabel()
+        self.count_label.setObjectName("findcount")
+
+        buttons = [
+            ("↑", "Предыдущее", self.find_previous),
+            ("↓", "Следующее", self.find_next),
+            ("Заменить", "Заменить текущее", self.replace_current),
+            ("Заменить все", "Заменить все совпадения", self.replace_all),
+            ("✕", "Закрыть", self.close_bar),
+        ]
+
+        layout.addWidget(self.find_input, 2)
+        layout.addWidget(self.replace_input, 2)
+        for box in [self.case_box, self.word_box, self.regex_box]:
+            layout.addWidget(box)
+            box.toggled.connect(self.start_search)
+        layout.addWidget(self.count_label)
+        for text, tooltip, slot in buttons:
+            button = QPushButton(text)
+            button.setToolTip(tooltip)
+            button.clicked.connect(slot)
+            layout.addWidget(button)
+
+        self.find_input.textChanged.connect(self.research_timer.start)
+        self.find_input.returnPressed.connect(self.find_next)
+        self.replace_input.returnPressed.connect(self.replace_current)
+
+    def set_editor(self, editor):
+        """Переключает панель на другой редактор (например, при смене вкладки)"""
+        if self.editor is not None:
+            self.editor.document().contentsChanged.disconnect(self.on_document_changed)
+        self.editor = editor
+        self.highlighter.set_editor(editor)
+        if editor is not None:
+            editor.document().contentsChanged.connect(self.on_document_changed)
+            if self.isVisible():
+                self.start_search()
+
+    def open_bar(self, replace=False):
+        self.replace_input.setVisible(replace)
+        self.show()
+        selected = self.editor.textCursor().selectedText() if self.editor else ""
+        if selected and " " not in selected:
+            self.find_input.setText(selected)
+        self.find_input.setFocus()
+        self.find_input.selectAll()
+        self.start_search()
+
+    def close_bar(self):
+        self.cancel()
+        self.highlighter.clear()
+        self.hide()
+        if self.editor is not None:
+            self.editor.setFocus()
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key.Key_Escape:
+            self.close_bar()
+        else:
+            super().keyPressEvent(event)
+
+    def cancel(self):
+        self.generation += 1
+        self.worker.latest = self.generation
+        self.searching = False
+
+    def current_pattern(self):
+        text = self.find_input.text()
+        if not text:
+            return None
+        try:
+            return compile_pattern(
+                text, self.regex_box.isChecked(),
+                self.case_box.isChecked(), self.word_box.isChecked()
+            )
+        except re.error as e:
+            self.count_label.setText("Ошибка")
+            self.count_label.setToolTip(str(e))
+            return None
+
+    def start_search(self):
+        self.research_timer.stop()
+        self.cancel()
+        self.highlighter.clear()
+        self.count_label.setText("")
+        self.count_label.setToolTip("")
+        if self.editor is None or not self.isVisible():
+            return
+        self.pattern = self.current_pattern()
+        if self.pattern is None:
+            return
+        self.searching = True
+        self.ensure_thread()
+        self._search_requested.emit(
+            self.generation, self.editor.document().toPlainText(), self.pattern)
+
+    def on_document_changed(self):
+        if not self.isVisible():
+            return
+        # Старые позиции больше не соответствуют тексту
+        self.cancel()
+        self.highlighter.clear()
+        self.research_timer.start()
+
+    def on_matches_found(self, generation, matches):
+        if generation != self.generation:
+            return
+        self.highlighter.extend(matches)
+        self.update_count()
+
+    def on_search_finished(self, generation, total):
+        if generation != self.generation:
+            return
+        self.searching = False
+        self.update_count()
+
+    def on_search_failed(self, generation, error):
+        if generation != self.generation:
+            return
+        self.searching = False
+        self.count_label.setText("Ошибка")
+        self.count_label.setToolTip(error)
+
+    def update_count(self):
+        total = self.highlighter.count()
+        suffix = "…" if self.searching else ""
+        if self.highlighter.current >= 0:
+            self.count_label.setText(f"{self.highlighter.current + 1} из {total}{suffix}")
+        else:
+            self.count_label.setText(f"{total}{suffix}")
+
+    def find_next(self):
+        self.move_to_match(backward=False)
+
+    def find_previous(self):
+        self.move_to_match(backward=True)
+
+    def move_to_match(self, backward):
+        if self.editor is None:
+            return
+        if not self.isVisible():
+            self.open_bar()
+            return
+        cursor = self.editor.textCursor()
+        position = cursor.selectionStart() if backward else cursor.selectionEnd()
+        index = self.highlighter.index_from(position, backward)
+        if index >= 0:
+            self.highlighter.select(index)
+            self.update_count()
+
+    def replace_current(self):
+        if self.editor is None or self.pattern is None:
+            return
+        if not self.replace_input.isVisible():
+            self.open_bar(replace=True)
+            return
+        cursor = self.editor.textCursor()
+        selected = cursor.selectedText()
+        match = self.pattern.fullmatch(selected) if selected else None
+        if match is None:
+            self.find_next()
+            return
+        replacement = self.replace_input.text()
+        if self.regex_box.isChecked():
+            replacement = match.expand(replacement)
+        end = cursor.selectionStart() + len(replacement.encode("utf-16-le")) // 2
+        cursor.insertText(replacement)
+        # Продолжаем с позиции после вставки, когда поиск перезапустится
+        cursor.setPosition(end)
+        self.editor.setTextCursor(cursor)
+
+    def replace_all(self):
+        if self.editor is None:
+            return
+        if not self.replace_input.isVisible():
+            self.open_bar(replace=True)
+            return
+        self.pattern = self.current_pattern()
+        if self.pattern is None:
+            return
+        self.cancel()
+        self.replace_revision = self.editor.document().revision()
+        self.message.emit("Замена...", 0)
+        self.ensure_thread()
+        self._replace_requested.emit(
+            self.generation, self.editor.document().toPlainText(), self.pattern,
+            self.replace_input.text(), self.regex_box.isChecked()
+        )
+
+    def on_replace_ready(self, generation, start, end, text, count):
+        if generation != self.generation or self.editor is None:
+            return
+        if count == 0:
+            self.message.emit("Совпадений не найдено", 3000)
+            return
+        document = self.editor.document()
+        if document.revision() != self.replace_revision:
+            # Пока шла замена, текст правили: результат устарел
+            self.message.emit("Документ изменился, замена отменена", 5000)
+            return
+        # Весь участок заменяется одной вставкой — одна запись в истории отмены
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(text)
+        cursor.endEditBlock()
+        self.message.emit(f"Заменено: {count}", 5000)
+
+    def ensure_thread(self):
+        if not self.thread.isRunning():
+            self.thread.start()
+
+    def shutdown(self):
+        """Останавливает рабочий поток; вызывать при закрытии окна"""
+        self.cancel()
+        self.thread.quit()
+        self.thread.wait()
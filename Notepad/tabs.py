@@ -0,0 +1,170 @@
+"""Вкладки NotePad: редактор и подсветка создаются при первом показе вкладки."""
+import os
+import time
+
+from PyQt6.QtCore import QTimer, pyqtSignal
+from PyQt6.QtWidgets import QTabWidget, QTextEdit, QVBoxLayout, QWidget
+
+from autosave import AutosaveJournal
+
+# Через сколько секунд простоя скрытая вкладка отдаёт редактор
+IDLE_RELEASE_AFTER = 30 * 60
+# Как часто проверять простаивающие вкладки, мс
+IDLE_CHECK_INTERVAL = 60 * 1000
+
+
+class DocumentTab:
+    """Документ во вкладке.
+
+    Пока вкладку не показали (или после долгого простоя), документ хранится
+    только строкой в buffer: без QTextEdit, раскладки текста и подсветки.
+    При освобождении редактора теряется история отмены и оформление —
+    сохраняется всё равно только текст.
+    """
+
+    def __init__(self, page, path=None, text="", modified=False):
+        self.page = page
+        self.path = path
+        self.buffer = text
+        self.modified = modified
+        self.editor = None
+        self.highlighter = None
+        self.journal = AutosaveJournal(None, parent=page)
+        self.journal.start(path, text if modified else None)
+        self.last_active = time.monotonic()
+
+    def title(self):
+        name = os.path.basename(self.path) if self.path else "Без имени"
+        return f"• {name}" if self.is_modified() else name
+
+    def text(self):
+        return self.editor.toPlainText() if self.editor else self.buffer
+
+    def is_modified(self):
+        return self.editor.document().isModified() if self.editor else self.modified
+
+    def set_modified(self, modified):
+        if self.editor:
+            self.editor.document().setModified(modified)
+        else:
+            self.modified = modified
+
+    def is_blank(self):
+        """Пустая вкладка без файла — её можно занять открываемым файлом"""
+        return not self.path and not self.is_modified() and not self.text()
+
+
+class EditorTabs(QTabWidget):
+    """Набор вкладок с документами, редакторы создаются лениво"""
+    current_editor_changed = pyqtSignal(object)
+
+    def __init__(self, highlighter_factory, parent=None):
+        super().__init__(parent)
+        self.highlighter_factory = highlighter_factory
+        # Подсветка включается после первой отрисовки окна (start_highlighting)
+        self.highlighting = False
+        self.documents = {}  # страница вкладки -> DocumentTab
+        self.active = None
+        self.setTabsClosable(True)
+        self.setMovable(True)
+        self.setDocumentMode(True)
+        self.currentChanged.connect(self.on_current_changed)
+
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setInterval(IDLE_CHECK_INTERVAL)
+        self.idle_timer.timeout.connect(self.release_idle)
+        self.idle_timer.start()
+
+    def add_document(self, path=None, text="", modified=False, activate=True):
+        page = QWidget()
+        layout = QVBoxLayout(page)
+        layout.setContentsMargins(0, 0, 0, 0)
+        tab = DocumentTab(page, path, text, modified)
+        self.documents[page] = tab
+        index = self.addTab(page, tab.title())
+        self.setTabToolTip(index, path or "")
+        if activate:
+            self.setCurrentIndex(index)
+        return tab
+
+    def all_tabs(self):
+        return [self.documents[self.widget(i)] for i in range(self.count())]
+
+    def current_tab(self):
+        page = self.currentWidget()
+        return self.documents.get(page) if page is not None else None
+
+    def current_editor(self):
+        tab = self.current_tab()
+        return tab.editor if tab else None
+
+    def activate(self, tab):
+        self.setCurrentWidget(tab.page)
+
+    def update_title(self, tab):
+        index = self.indexOf(tab.page)
+        if index >= 0:
+            self.setTabText(index, tab.title())
+            self.setTabToolTip(index, tab.path or "")
+
+    def materialize(self, tab):
+        """Создаёт редактор и подсветку для вкладки из её буфера"""
+        editor = QTextEdit()
+        editor.setObjectName("editor")
+        with tab.journal.suspend():
+            tab.journal.attach(editor.document())
+            editor.setPlainText(tab.buffer)
+        editor.document().setModified(tab.modified)
+        editor.document().modificationChanged.connect(lambda _: self.update_title(tab))
+        if self.highlighting:
+            tab.highlighter = self.highlighter_factory(editor.document())
+        tab.editor = editor
+        tab.buffer = None
+        tab.page.layout().addWidget(editor)
+
+    def start_highlighting(self):
+        """Подключает подсветку к уже созданным редакторам и ко всем следующим"""
+        self.highlighting = True
+        for tab in self.all_tabs():
+            if tab.editor is not None and tab.highlighter is None:
+                tab.highlighter = self.highlighter_factory(tab.editor.document())
+
+    def release(self, tab):
+        """Возвращает документ в буфер и удаляет редактор вместе с раскладкой текста"""
+        editor = tab.editor
+        tab.buffer = editor.toPlainText()
+        tab.modified = editor.document().isModified()
+        tab.journal.attach(None)
+        if tab.highlighter is not None:
+            tab.highlighter.setDocument(None)
+            tab.highlighter.deleteLater()
+            tab.highlighter = None
+        tab.editor = None
+        editor.deleteLater()
+
+    def release_idle(self):
+        now = time.monotonic()
+        for tab in self.all_tabs():
+            if tab is not self.active and tab.editor and now - tab.last_active > IDLE_RELEASE_AFTER:
+                self.release(tab)
+
+    def on_current_changed(self, index):
+        now = time.monotonic()
+        if self.active is not None:
+            self.active.last_active = now
+        tab = self.current_tab()
+        self.active = tab
+        if tab is not None:
+            tab.last_active = now
+            if tab.editor is None:
+                self.materialize(tab)
+        self.current_editor_changed.emit(tab.editor if tab else None)
+
+    def close_document(self, tab):
+        """Закрывает вкладку; несохранённые изменения к этому моменту уже учтены"""
+        if tab is self.active:
+            self.active = None
+        self.removeTab(self.indexOf(tab.page))
+        del self.documents[tab.page]
+        tab.journal.discard()
+        tab.page.deleteLater()
@@ -0,0 +1,162 @@
+"""Воспроизведение анимированных GIF и WebP в PhotoViewer.
+
+Кадры декодируются по одному по таймеру (QImageReader, для WebP без
+плагина Qt — Pillow) и сразу уменьшаются до размера панели: в памяти
+живёт не исходный кадр, а готовый к показу QPixmap. Если весь цикл в
+таком размере помещается в FRAME_CACHE_BUDGET, кадры кэшируются и со
+второго круга ничего не декодируется; иначе кэш сбрасывается, и
+длинная анимация играет потоково с постоянным расходом памяти.
+"""
+from PyQt6.QtCore import QObject, QTimer, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+
+# Бюджет памяти на уменьшенные кадры одной анимации, байт
+FRAME_CACHE_BUDGET = 64 * 1024 * 1024
+# Задержка кадра, если файл её не указал, мс
+DEFAULT_DELAY = 100
+# Задержки до 10 мс браузеры считают неуказанными и показывают по 100 мс; мы тоже
+FAST_DELAY = 10
+
+
+def isAnimated(fileName):
+    """Больше одного кадра (Qt или, для WebP без плагина, Pillow)"""
+    reader = QImageReader(fileName)
+    if reader.canRead():
+        return reader.supportsAnimation() and reader.imageCount() != 1
+    if fileName.lower().endswith(".webp"):
+        try:
+            from PIL import Image
+            with Image.open(fileName) as image:
+                return getattr(image, "n_frames", 1) > 1
+        except Exception:
+            return False
+    return False
+
+
+class QtFrames:
+    """Кадры через QImageReader; по кругу — открытием файла заново"""
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.reader = None
+        self.rewind()
+
+    def rewind(self):
+        self.reader = QImageReader(self.fileName)
+        # Кадры поворачиваются по тегу EXIF Orientation, как и статичные снимки
+        self.reader.setAutoTransform(True)
+
+    def next(self):
+        """(QImage, задержка мс) или (None, 0) в конце цикла"""
+        if not self.reader.canRead():
+            return None, 0
+        image = self.reader.read()
+        if image.isNull():
+            return None, 0
+        return image, self.reader.nextImageDelay()
+
+
+class PilFrames:
+    """Кадры анимированного WebP через Pillow, если в Qt нет плагина"""
+
+    def __init__(self, fileName):
+        from PIL import Image
+        self.image = Image.open(fileName)
+        self.count = getattr(self.image, "n_frames", 1)
+        self.index = 0
+
+    def rewind(self):
+        self.index = 0
+
+    def next(self):
+        from PIL import ImageOps
+        if self.index >= self.count:
+            return None, 0
+        self.image.seek(self.index)
+        self.index += 1
+        rgba = ImageOps.exif_transpose(self.image.convert("RGBA"))
+        image = QImage(rgba.tobytes(), rgba.width, rgba.height, rgba.width * 4,
+                       QImage.Format.Format_RGBA8888).copy()
+        return image, self.image.info.get("duration", 0)
+
+
+class AnimationPlayer(QObject):
+    frameChanged = pyqtSignal(QPixmap)
+
+    def __init__(self, fileName, parent=None):
+        super().__init__(parent)
+        self.frames = QtFrames(fileName) if QImageReader(fileName).canRead() else PilFrames(fileName)
+        self.targetSize = None
+        # Уменьшенные кадры цикла и их задержки; None — цикл не влез в бюджет
+        self.cache = []
+        self.cacheBytes = 0
+        self.complete = False
+        self.index = 0
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.advance)
+
+        # Первый кадр в исходном размере — для информации и полноэкранного режима
+        image, _ = self.frames.next()
+        self.firstFrame = image if image is not None else QImage()
+        self.frames.rewind()
+
+    def setTargetSize(self, size):
+        """Размер, под который масштабируются кадры; смена сбрасывает кэш"""
+        if size == self.targetSize:
+            return
+        self.targetSize = size
+        self.restart()
+
+    def restart(self):
+        self.timer.stop()
+        self.frames.rewind()
+        self.cache = []
+        self.cacheBytes = 0
+        self.complete = False
+        self.index = 0
+        self.advance()
+
+    def stop(self):
+        self.timer.stop()
+
+    def advance(self):
+        if self.complete:
+            pixmap, delay = self.cache[self.index]
+            self.index = (self.index + 1) % len(self.cache)
+        else:
+            pixmap, delay = self.decodeNext()
+            if pixmap is None:
+                return
+        self.frameChanged.emit(pixmap)
+        if self.complete and len(self.cache) == 1:
+            # Единственный кадр уже показан
+            return
+        self.timer.start(delay if delay > FAST_DELAY else DEFAULT_DELAY)
+
+    def decodeNext(self):
+        image, delay = self.frames.next()
+        if image is None:
+            # Конец цикла: если все кадры в кэше, дальше только он
+            if self.cache is not None and self.cache:
+                self.complete = True
+                self.index = 1 % len(self.cache)
+                return self.cache[0]
+            self.frames.rewind()
+            image, delay = self.frames.next()
+            if image is None:
+                return None, 0
+        if self.targetSize is not None and not self.targetSize.isEmpty():
+            # Масштабируем один раз на кадр, а не при каждой отрисовке
+            image = image.scaled(self.targetSize, Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+        pixmap = QPixmap.fromImage(image)
+        if self.cache is not None:
+            self.cacheBytes += pixmap.width() * pixmap.height() * 4
+            if self.cacheBytes > FRAME_CACHE_BUDGET:
+                # Цикл не помещается: играем потоково, кадры не храним
+                self.cache = None
+            else:
+                self.cache.append((pixmap, delay))
+        return pixmap, delay
@@ -0,0 +1,241 @@
+"""Пакетная обработка выбранных снимков PhotoViewer.
+
+Каждый файл — отдельная задача пула процессов (см. imageops.py): процессы
+сами читают и пишут файлы, обратно приходит только короткий итог, поэтому
+обработка масштабируется по ядрам. Пулом управляет рабочий QThread; окно
+задания показывает прогресс и может отменить его — уже начатые файлы
+дописываются, остальные не запускаются.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+from PyQt6.QtWidgets import (QAbstractItemView, QCheckBox, QComboBox, QDialog, QDoubleSpinBox,
+                             QFileDialog, QFormLayout, QHBoxLayout, QLabel, QLineEdit,
+                             QListWidget, QProgressBar, QPushButton, QSpinBox, QVBoxLayout)
+
+from imageops import JPEGTRAN, BatchJob, processFile
+
+# Классы ImageEnhance и их подписи в окне
+ENHANCEMENTS = (("Brightness", "Brightness"), ("Contrast", "Contrast"),
+                ("Color", "Saturation"), ("Sharpness", "Sharpness"))
+DEFAULT_QUALITY = 90
+
+
+class BatchWorker(QObject):
+    progress = pyqtSignal(int, int)        # обработано, всего
+    finished = pyqtSignal(list, bool)      # BatchResult, отменено ли
+    failed = pyqtSignal(str)
+    stopped = pyqtSignal()                 # задание закончено или отменено; поток можно останавливать
+
+    def __init__(self):
+        super().__init__()
+        # Записывается из GUI-потока
+        self.cancelled = False
+
+    @pyqtSlot(list, object)
+    def run(self, paths, job):
+        try:
+            results = self.process(paths, job)
+            self.finished.emit(results, self.cancelled)
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            self.stopped.emit()
+
+    def process(self, paths, job):
+        results = []
+        futures = []
+        # spawn, а не fork: форк процесса с потоками Qt небезопасен
+        pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+        try:
+            futures.extend(pool.submit(processFile, path, job) for path in paths)
+            for future in as_completed(futures):
+                if self.cancelled:
+                    break
+                results.append(future.result())
+                self.progress.emit(len(results), len(paths))
+        finally:
+            # Очередь отменяем сами: cancel_futures не срабатывает, если пул
+            # собран сборщиком мусора раньше, чем его поток разобрал очередь
+            for future in futures:
+                future.cancel()
+            # При отмене не ждём: запущенные файлы допишутся сами
+            pool.shutdown(wait=not self.cancelled)
+        return results
+
+
+class BatchDialog(QDialog):
+    """Параметры задания, затем его прогресс; по завершении вызывает on_finished"""
+    _run_requested = pyqtSignal(list, object)
+
+    def __init__(self, paths, on_finished, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Batch Processing")
+        self.resize(520, 600)
+        self.paths = list(paths)
+        self.on_finished = on_finished
+        self.thread = None
+        self.worker = None
+
+        layout = QVBoxLayout(self)
+        self.fileList = QListWidget()
+        self.fileList.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.fileList.addItems([os.path.basename(path) for path in self.paths])
+        self.fileList.selectAll()
+        self.fileList.itemSelectionChanged.connect(self.selectionChanged)
+
+        form = QFormLayout()
+        self.maxSide = QSpinBox()
+        self.maxSide.setRange(0, 20000)
+        self.maxSide.setSingleStep(100)
+        self.maxSide.setSuffix(" px")
+        self.maxSide.setSpecialValueText("Original")
+        self.rotate = QComboBox()
+        for text, angle in (("None", 0), ("90° clockwise", 90), ("180°", 180),
+                            ("90° counter-clockwise", 270)):
+            self.rotate.addItem(text, angle)
+        self.autoOrient = QCheckBox("Apply EXIF orientation")
+        self.format = QComboBox()
+        self.format.addItem("Keep", None)
+        for name in ("JPEG", "PNG", "WEBP"):
+            self.format.addItem(name, name)
+        self.quality = QSpinBox()
+        self.quality.setRange(1, 100)
+        self.quality.setValue(DEFAULT_QUALITY)
+        self.quality.setToolTip("Only when re-encoding: with format Keep, a JPEG that is only "
+                                "rotated is copied as is; choose JPEG to apply the quality")
+        form.addRow("Max side:", self.maxSide)
+        form.addRow("Rotate:", self.rotate)
+        form.addRow("", self.autoOrient)
+        if JPEGTRAN is None:
+            note = QLabel("jpegtran не найден: поворот JPEG без других изменений записывается "
+                          "только в тег EXIF Orientation, пиксели остаются прежними. Программы, "
+                          "которые тег не читают, покажут снимок неповёрнутым. Автоповорот "
+                          "в этом случае перекодирует файл.")
+            note.setWordWrap(True)
+            form.addRow("", note)
+        form.addRow("Format:", self.format)
+        form.addRow("Quality:", self.quality)
+        self.enhancements = []
+        for name, text in ENHANCEMENTS:
+            spin = QDoubleSpinBox()
+            spin.setRange(0.0, 3.0)
+            spin.setSingleStep(0.1)
+            spin.setValue(1.0)
+            form.addRow(f"{text}:", spin)
+            self.enhancements.append((name, spin))
+
+        folder = QHBoxLayout()
+        directory = os.path.dirname(self.paths[0]) if self.paths else os.getcwd()
+        self.outputDir = QLineEdit(os.path.join(directory, "processed"))
+        browseButton = QPushButton("...")
+        browseButton.clicked.connect(self.browse)
+        folder.addWidget(self.outputDir, 1)
+        folder.addWidget(browseButton)
+        form.addRow("Output:", folder)
+
+        self.statusLabel = QLabel()
+        self.progressBar = QProgressBar()
+        self.progressBar.hide()
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        self.startButton = QPushButton("Start")
+        self.startButton.clicked.connect(self.start)
+        self.cancelButton = QPushButton("Cancel")
+        self.cancelButton.clicked.connect(self.reject)
+        buttons.addWidget(self.startButton)
+        buttons.addWidget(self.cancelButton)
+
+        layout.addWidget(self.fileList, 1)
+        layout.addLayout(form)
+        layout.addWidget(self.statusLabel)
+        layout.addWidget(self.progressBar)
+        layout.addLayout(buttons)
+        self.selectionChanged()
+
+    def selectionChanged(self):
+        count = len(self.fileList.selectedIndexes())
+        self.statusLabel.setText(f"Выбрано файлов: {count}")
+        self.startButton.setEnabled(count > 0)
+
+    def browse(self):
+        directory = QFileDialog.getExistingDirectory(self, "Output Folder", self.outputDir.text())
+        if directory:
+            self.outputDir.setText(directory)
+
+    def job(self):
+        return BatchJob(
+            output_dir=os.path.abspath(self.outputDir.text()),
+            max_side=self.maxSide.value() or None,
+            rotate=self.rotate.currentData(),
+            auto_orient=self.autoOrient.isChecked(),
+            format=self.format.currentData(),
+            quality=self.quality.value(),
+            enhance=tuple((name, spin.value()) for name, spin in self.enhancements
+                          if spin.value() != 1.0),
+        )
+
+    def start(self):
+        job = self.job()
+        try:
+            os.makedirs(job.output_dir, exist_ok=True)
+        except OSError as e:
+            self.statusLabel.setText(f"Ошибка: {e}")
+            return
+        rows = sorted(index.row() for index in self.fileList.selectedIndexes())
+        paths = [self.paths[row] for row in rows]
+
+        for widget in self.findChildren((QListWidget, QSpinBox, QDoubleSpinBox, QComboBox,
+                                         QCheckBox, QLineEdit, QPushButton)):
+            if widget is not self.cancelButton:
+                widget.setEnabled(False)
+        self.progressBar.setRange(0, len(paths))
+        self.progressBar.setValue(0)
+        self.progressBar.show()
+        self.statusLabel.setText(f"Обработка: 0 из {len(paths)}")
+
+        self.thread = QThread()
+        self.worker = BatchWorker()
+        self.worker.moveToThread(self.thread)
+        self._run_requested.connect(self.worker.run)
+        self.worker.progress.connect(self.showProgress)
+        self.worker.finished.connect(self.showResults)
+        self.worker.failed.connect(self.showError)
+        # Поток останавливается сам, когда воркер закончил, и тогда же удаляется
+        self.worker.stopped.connect(self.thread.quit)
+        self.thread.finished.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self.thread.deleteLater)
+        self.thread.start()
+        self._run_requested.emit(paths, job)
+
+    def showProgress(self, done, total):
+        self.progressBar.setValue(done)
+        self.statusLabel.setText(f"Обработка: {done} из {total}")
+
+    def showResults(self, results, cancelled):
+        self.progressBar.hide()
+        self.cancelButton.setText("Close")
+        errors = [result for result in results if result.error is not None]
+        lossless = sum(1 for result in results if result.lossless)
+        # Без jpegtran «без перекодирования» значит: повёрнут только тег
+        kind = "без перекодирования" if JPEGTRAN is not None else "поворот только в теге EXIF"
+        text = (f"{'Отменено' if cancelled else 'Готово'}: {len(results) - len(errors)}, "
+                f"{kind}: {lossless}, ошибок: {len(errors)}")
+        if errors:
+            text += "\n" + "\n".join(f"{os.path.basename(result.source)}: {result.error}"
+                                     for result in errors[:5])
+        self.statusLabel.setText(text)
+        self.on_finished([result.output for result in results if result.error is None])
+
+    def showError(self, message):
+        self.progressBar.hide()
+        self.cancelButton.setText("Close")
+        self.statusLabel.setText(f"Ошибка: {message}")
+
+    def done(self, result):
+        # Окно не ждёт воркер: тот заметит флаг, отменит очередь пула и остановит поток
+        if self.worker is not None:
+            self.worker.cancelled = True
+        super().done(result)
@@ -0,0 +1,240 @@
+"""Поиск дубликатов и почти-дубликатов (серии, пересохранения) в папке PhotoViewer.
+
+Хэши считаются в пуле процессов по уменьшенным при декодировании копиям
+(см. perceptual.py) и кэшируются в SQLite вместе с размером и mtime файла:
+повторный поиск пересчитывает только новые и изменённые снимки. Пулом
+управляет рабочий QThread, окно получает только прогресс и готовые группы.
+"""
+import multiprocessing
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PyQt6.QtCore import QObject, QThread, Qt, pyqtSignal, pyqtSlot
+from PyQt6.QtWidgets import (QDialog, QHBoxLayout, QLabel, QProgressBar, QPushButton,
+                             QTreeWidget, QTreeWidgetItem, QVBoxLayout)
+
+from perceptual import findGroups, hashFile
+
+# Сколько файлов отдавать процессу пула за раз
+POOL_CHUNK = 32
+# Как часто сообщать о прогрессе, с
+PROGRESS_INTERVAL = 0.1
+# Хэши сохраняются в кэш пачками
+COMMIT_EVERY = 1000
+# Параметров в одном запросе к кэшу (предел SQLite — 999 в старых версиях)
+LOOKUP_BATCH = 900
+
+
+def cacheDir():
+    """Каталог кэша в XDG cache dir"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    path = os.path.join(base, "nuros-photoviewer")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def toSigned(value):
+    """SQLite хранит только знаковые 64-битные числа"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def toUnsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+class HashCache:
+    """path -> (размер, mtime, pHash, dHash); запись устаревает вместе с файлом"""
+
+    def __init__(self, path=None):
+        self.connection = sqlite3.connect(path or os.path.join(cacheDir(), "hashes.sqlite"))
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS hashes (path TEXT PRIMARY KEY, size INTEGER, "
+            "mtime INTEGER, phash INTEGER, dhash INTEGER)")
+
+    def lookup(self, entries):
+        """{путь: (pHash, dHash)} для файлов, чьи размер и mtime совпали с кэшем"""
+        signatures = dict(entries)
+        paths = list(signatures)
+        found = {}
+        for start in range(0, len(paths), LOOKUP_BATCH):
+            batch = paths[start:start + LOOKUP_BATCH]
+            rows = self.connection.execute(
+                "SELECT path, size, mtime, phash, dhash FROM hashes WHERE path IN (%s)"
+                % ",".join("?" * len(batch)), batch)
+            for path, size, mtime, phash, dhash in rows:
+                if signatures[path] == (size, mtime):
+                    found[path] = (toUnsigned(phash), toUnsigned(dhash))
+        return found
+
+    def store(self, rows):
+        """rows: (путь, (размер, mtime), (pHash, dHash))"""
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+            [(path, size, mtime, toSigned(phash), toSigned(dhash))
+             for path, (size, mtime), (phash, dhash) in rows])
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+class DuplicateWorker(QObject):
+    progress = pyqtSignal(int, int)        # обработано, всего
+    groups_found = pyqtSignal(list)        # списки путей, крупные группы первыми
+    failed = pyqtSignal(str)
+    stopped = pyqtSignal()                 # поиск завершён или отменён; поток можно останавливать
+
+    def __init__(self):
+        super().__init__()
+        # Записывается из GUI-потока
+        self.cancelled = False
+
+    @pyqtSlot(list)
+    def search(self, paths):
+        try:
+            groups = self.findDuplicates(paths)
+            if groups is not None:
+                self.groups_found.emit(groups)
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            self.stopped.emit()
+
+    def findDuplicates(self, paths):
+        entries = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, (stat.st_size, stat.st_mtime_ns)))
+
+        cache = HashCache()
+        try:
+            hashes = cache.lookup(entries)
+            missing = [(path, signature) for path, signature in entries if path not in hashes]
+            total = len(entries)
+            self.progress.emit(len(hashes), total)
+            if missing and not self.hashFiles(missing, hashes, cache, total):
+                return None
+        finally:
+            cache.close()
+
+        known = [path for path, _ in entries if path in hashes]
+        groups = findGroups([hashes[path][0] for path in known],
+                            [hashes[path][1] for path in known])
+        return [[known[index] for index in group] for group in groups]
+
+    def hashFiles(self, missing, hashes, cache, total):
+        """Хэши новых файлов в пуле процессов; False — поиск отменён"""
+        done = total - len(missing)
+        pending = []
+        last_progress = time.monotonic()
+        # spawn, а не fork: форк процесса с потоками Qt небезопасен
+        pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+        try:
+            results = pool.map(hashFile, [path for path, _ in missing], chunksize=POOL_CHUNK)
+            for (path, signature), result in zip(missing, results):
+                if self.cancelled:
+                    break
+                done += 1
+                if result is not None:
+                    hashes[path] = result
+                    pending.append((path, signature, result))
+                if len(pending) >= COMMIT_EVERY:
+                    cache.store(pending)
+                    pending = []
+                if time.monotonic() - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = time.monotonic()
+                    self.progress.emit(done, total)
+        finally:
+            # При отмене не ждём: процессы доделают текущие пачки и выйдут сами
+            pool.shutdown(wait=not self.cancelled, cancel_futures=True)
+        # Посчитанное до отмены тоже пригодится в следующий раз
+        if pending:
+            cache.store(pending)
+        return not self.cancelled
+
+
+class DuplicatesDialog(QDialog):
+    """Прогресс поиска, затем группы похожих снимков; двойной клик открывает снимок"""
+    _search_requested = pyqtSignal(list)
+
+    def __init__(self, paths, open_image, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Duplicates")
+        self.resize(600, 500)
+        self.open_image = open_image
+
+        layout = QVBoxLayout(self)
+        self.statusLabel = QLabel("Вычисление хэшей...")
+        self.progressBar = QProgressBar()
+        self.tree = QTreeWidget()
+        self.tree.setHeaderHidden(True)
+        self.tree.itemDoubleClicked.connect(self.itemOpened)
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        self.cancelButton = QPushButton("Cancel")
+        self.cancelButton.clicked.connect(self.reject)
+        buttons.addWidget(self.cancelButton)
+
+        layout.addWidget(self.statusLabel)
+        layout.addWidget(self.progressBar)
+        layout.addWidget(self.tree, 1)
+        layout.addLayout(buttons)
+
+        self.thread = QThread()
+        self.worker = DuplicateWorker()
+        self.worker.moveToThread(self.thread)
+        self._search_requested.connect(self.worker.search)
+        self.worker.progress.connect(self.showProgress)
+        self.worker.groups_found.connect(self.showGroups)
+        self.worker.failed.connect(self.showError)
+        # Поток останавливается сам, когда воркер закончил, и тогда же удаляется
+        self.worker.stopped.connect(self.thread.quit)
+        self.thread.finished.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self.thread.deleteLater)
+        self.thread.start()
+        self._search_requested.emit(list(paths))
+
+    def showProgress(self, done, total):
+        self.progressBar.setRange(0, total)
+        self.progressBar.setValue(done)
+        self.statusLabel.setText(f"Вычисление хэшей: {done} из {total}")
+
+    def showGroups(self, groups):
+        self.progressBar.hide()
+        self.cancelButton.setText("Close")
+        if not groups:
+            self.statusLabel.setText("Похожих изображений не найдено")
+            return
+        files = sum(len(group) for group in groups)
+        self.statusLabel.setText(f"Групп: {len(groups)}, файлов в них: {files}")
+        items = []
+        for number, group in enumerate(groups, 1):
+            item = QTreeWidgetItem([f"Группа {number} ({len(group)})"])
+            for path in group:
+                child = QTreeWidgetItem([os.path.basename(path)])
+                child.setToolTip(0, path)
+                child.setData(0, Qt.ItemDataRole.UserRole, path)
+                item.addChild(child)
+            items.append(item)
+        self.tree.addTopLevelItems(items)
+        self.tree.expandAll()
+
+    def showError(self, message):
+        self.progressBar.hide()
+        self.cancelButton.setText("Close")
+        self.statusLabel.setText(f"Ошибка: {message}")
+
+    def itemOpened(self, item):
+        path = item.data(0, Qt.ItemDataRole.UserRole)
+        if path:
+            self.open_image(path)
+
+    def done(self, result):
+        # Окно не ждёт воркер: тот заметит флаг, выйдет из пула и остановит поток
+        self.worker.cancelled = True
+        super().done(result)
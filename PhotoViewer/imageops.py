@@ -0,0 +1,257 @@
+"""Операции пакетной обработки: уменьшение, конвертация, поворот, улучшение.
+
+Модуль не зависит от Qt: processFile выполняется в процессах пула.
+
+Поворот и автоповорот JPEG без других операций и без смены формата
+делаются без перекодирования; явно выбранный JPEG перекодируется с
+заданным качеством. Если установлен jpegtran (libjpeg-turbo), он
+переставляет блоки DCT, и пиксели становятся ровными; тег Orientation
+затем сбрасывается в 1. Без jpegtran поворот записывается в тег
+Orientation: сжатые данные не меняются вовсе. Так же поступаем, если
+jpegtran -perfect отказывается (край не кратен блоку): -trim обрезал бы
+изображение. Выпрямить пиксели без jpegtran нельзя, поэтому автоповорот
+тогда перекодирует файл с исходными таблицами квантования.
+
+Всё остальное идёт через Pillow. При уменьшении JPEG декодер сразу читает
+копию в 1/2–1/8 размера (draft), и полный кадр в память не попадает.
+"""
+import math
+import os
+import shutil
+import subprocess
+from collections import namedtuple
+
+# Параметры задания; max_side None — не уменьшать, format None — как у исходника,
+# rotate — градусы по часовой стрелке, enhance — пары (класс ImageEnhance, множитель)
+BatchJob = namedtuple("BatchJob", "output_dir max_side rotate auto_orient format quality enhance")
+# Итог по файлу; error None — успех, lossless — без перекодирования
+BatchResult = namedtuple("BatchResult", "source output lossless error")
+
+FORMATS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+JPEGTRAN = shutil.which("jpegtran")
+# Сегменты APP, в том числе Exif, лежат в начале файла и не длиннее 64 КБ
+HEADER_BYTES = 256 * 1024
+ORIENTATION_TAG = 0x0112
+
+# Значение тега Orientation -> преобразование координат (x, y) хранимого
+# изображения в показываемое (ось y направлена вниз)
+ORIENTATIONS = {
+    1: ((1, 0), (0, 1)),
+    2: ((-1, 0), (0, 1)),    # отражение по горизонтали
+    3: ((-1, 0), (0, -1)),   # 180°
+    4: ((1, 0), (0, -1)),    # отражение по вертикали
+    5: ((0, 1), (1, 0)),     # транспонирование
+    6: ((0, -1), (1, 0)),    # 90° по часовой
+    7: ((0, -1), (-1, 0)),   # поперечное транспонирование
+    8: ((0, 1), (-1, 0)),    # 270° по часовой
+}
+MATRIX_ORIENTATIONS = {matrix: value for value, matrix in ORIENTATIONS.items()}
+ROTATIONS = {0: 1, 90: 6, 180: 3, 270: 8}
+JPEGTRAN_ARGS = {
+    2: ["-flip", "horizontal"],
+    3: ["-rotate", "180"],
+    4: ["-flip", "vertical"],
+    5: ["-transpose"],
+    6: ["-rotate", "90"],
+    7: ["-transverse"],
+    8: ["-rotate", "270"],
+}
+
+
+def combine(first, then):
+    """Ориентация, равная повороту first, а затем then"""
+    (a, b), (c, d) = ORIENTATIONS[then]
+    (e, f), (g, h) = ORIENTATIONS[first]
+    return MATRIX_ORIENTATIONS[((a * e + b * g, a * f + b * h), (c * e + d * g, c * f + d * h))]
+
+
+def exifOffset(header):
+    """Смещение TIFF-заголовка в сегменте APP1 Exif или None"""
+    position = 2
+    while position + 4 <= len(header) and header[position] == 0xFF:
+        marker = header[position + 1]
+        # За SOS начинаются сжатые данные
+        if marker in (0xD9, 0xDA):
+            break
+        if marker == 0xE1 and header[position + 4:position + 10] == b"Exif\0\0":
+            return position + 10
+        position += 2 + int.from_bytes(header[position + 2:position + 4], "big")
+    return None
+
+
+def orientationField(header):
+    """(смещение значения тега Orientation, порядок байт) или None"""
+    tiff = exifOffset(header)
+    if tiff is None:
+        return None
+    order = "little" if header[tiff:tiff + 2] == b"II" else "big"
+    ifd = tiff + int.from_bytes(header[tiff + 4:tiff + 8], order)
+    count = int.from_bytes(header[ifd:ifd + 2], order)
+    for index in range(count):
+        entry = ifd + 2 + 12 * index
+        if entry + 12 > len(header):
+            break
+        if int.from_bytes(header[entry:entry + 2], order) == ORIENTATION_TAG:
+            return entry + 8, order
+    return None
+
+
+def readOrientation(header):
+    field = orientationField(header)
+    if field is None:
+        return 1
+    offset, order = field
+    value = int.from_bytes(header[offset:offset + 2], order)
+    return value if value in ORIENTATIONS else 1
+
+
+def exifSegment(orientation):
+    """Минимальный APP1 Exif с одним тегом Orientation"""
+    tiff = (b"II*\0" + (8).to_bytes(4, "little") + (1).to_bytes(2, "little")
+            + ORIENTATION_TAG.to_bytes(2, "little") + (3).to_bytes(2, "little")
+            + (1).to_bytes(4, "little") + orientation.to_bytes(2, "little") + b"\0\0"
+            + (0).to_bytes(4, "little"))
+    body = b"Exif\0\0" + tiff
+    return b"\xff\xe1" + (len(body) + 2).to_bytes(2, "big") + body
+
+
+def writeOrientation(path, orientation):
+    """Записывает тег Orientation, не трогая сжатые данные; False — некуда записать"""
+    with open(path, "r+b") as f:
+        header = f.read(HEADER_BYTES)
+        field = orientationField(header)
+        if field is not None:
+            offset, order = field
+            f.seek(offset)
+            f.write(orientation.to_bytes(2, order))
+            return True
+        if orientation == 1:
+            return True
+        if exifOffset(header) is not None:
+            # Добавить тег в чужой Exif — значит переписать все смещения в нём
+            return False
+        data = header + f.read()
+        # JFIF (APP0) по стандарту идёт сразу за SOI
+        position = 2
+        if data[2:4] == b"\xff\xe0":
+            position = 4 + int.from_bytes(data[4:6], "big")
+        f.seek(0)
+        f.write(data[:position] + exifSegment(orientation) + data[position:])
+        return True
+
+
+def outputPath(source, job):
+    stem, extension = os.path.splitext(os.path.basename(source))
+    if job.format is not None:
+        extension = FORMATS[job.format]
+    return os.path.join(job.output_dir, stem + extension)
+
+
+def rotateLossless(source, temporary, job, header):
+    """Поворот JPEG без перекодирования; False — без перекодирования не выйдет"""
+    target = combine(readOrientation(header), ROTATIONS[job.rotate])
+    if target != 1 and JPEGTRAN is not None:
+        # -perfect отказывается, если край не кратен блоку. -trim отрезал бы
+        # неполный блок, а это уже потеря: тогда действуем как без jpegtran
+        command = [JPEGTRAN, "-copy", "all", "-perfect"] + JPEGTRAN_ARGS[target]
+        if subprocess.run(command + ["-outfile", temporary, source],
+                          capture_output=True).returncode == 0:
+            # Пиксели теперь ровные; тег из скопированного Exif больше не нужен
+            writeOrientation(temporary, 1)
+            return True
+    if job.auto_orient and target != 1:
+        return False
+    shutil.copyfile(source, temporary)
+    return writeOrientation(temporary, target)
+
+
+def convertMode(image, format):
+    """Режим, который умеет сохранять формат; прозрачность JPEG — на белом фоне"""
+    from PIL import Image
+
+    transparent = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    if format == "JPEG":
+        if image.mode in ("RGB", "L", "CMYK"):
+            return image
+        if transparent:
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            return background
+        return image.convert("RGB")
+    if image.mode in ("RGB", "RGBA", "L"):
+        return image
+    return image.convert("RGBA" if transparent else "RGB")
+
+
+def reencode(source, temporary, job):
+    """Обработка пикселей через Pillow"""
+    from PIL import Image, ImageEnhance, ImageOps, JpegImagePlugin
+
+    with Image.open(source) as original:
+        if getattr(original, "n_frames", 1) > 1:
+            raise ValueError("анимация не поддерживается")
+        format = job.format or original.format
+        icc = original.info.get("icc_profile")
+        if job.max_side and original.format == "JPEG":
+            scale = job.max_side / max(original.size)
+            if scale < 1:
+                original.draft(original.mode, (math.ceil(original.width * scale),
+                                               math.ceil(original.height * scale)))
+        # Пиксели выпрямляются всегда: иначе поворот и тег Orientation сложились бы
+        image = ImageOps.exif_transpose(original)
+        exif = image.info.get("exif")
+        params = {}
+        pixelsKept = not job.max_side and not job.enhance
+        if job.format is None and original.format == "JPEG" and pixelsKept:
+            # Только поворот: те же таблицы квантования, потери минимальны
+            params["qtables"] = original.quantization
+            sampling = JpegImagePlugin.get_sampling(original)
+            if sampling != -1:
+                params["subsampling"] = sampling
+
+    if job.rotate:
+        image = image.transpose({90: Image.Transpose.ROTATE_270,
+                                 180: Image.Transpose.ROTATE_180,
+                                 270: Image.Transpose.ROTATE_90}[job.rotate])
+    if image.mode in ("P", "1", "PA", "LA", "I", "F"):
+        image = convertMode(image, None)
+    if job.max_side and max(image.size) > job.max_side:
+        image.thumbnail((job.max_side, job.max_side), Image.Resampling.LANCZOS)
+    for name, factor in job.enhance:
+        image = getattr(ImageEnhance, name)(image).enhance(factor)
+
+    image = convertMode(image, format)
+    if format in ("JPEG", "WEBP") and "qtables" not in params:
+        params["quality"] = job.quality
+    if exif:
+        params["exif"] = exif
+    if icc:
+        params["icc_profile"] = icc
+    image.save(temporary, format, **params)
+
+
+def processFile(source, job):
+    """Обрабатывает один файл; вызывается в пуле, исключения возвращает в BatchResult"""
+    output = outputPath(source, job)
+    # Пишем рядом и подменяем: отмена или ошибка не оставят полфайла
+    temporary = output + ".part"
+    try:
+        with open(source, "rb") as f:
+            header = f.read(HEADER_BYTES)
+        isJpeg = header[:3] == b"\xff\xd8\xff"
+        # Явный формат JPEG — это просьба перекодировать с заданным качеством
+        lossless = (isJpeg and job.format is None and not job.max_side
+                    and not job.enhance and rotateLossless(source, temporary, job, header))
+        if not lossless:
+            reencode(source, temporary, job)
+        if os.path.exists(output) and os.path.samefile(source, output):
+            shutil.copymode(source, temporary)
+        os.replace(temporary, output)
+        return BatchResult(source, output, lossless, None)
+    except Exception as e:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        return BatchResult(source, output, False, str(e) or type(e).__name__)
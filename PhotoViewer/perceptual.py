@@ -0,0 +1,152 @@
+"""Перцептивные хэши и поиск похожих изображений без попарного сравнения.
+
+Модуль не зависит от Qt: hashFile выполняется в процессах пула, а
+дочерним процессам незачем импортировать PyQt6.
+
+pHash — знаки низкочастотных коэффициентов DCT уменьшенной копии 32×32,
+dHash — знаки разностей соседних пикселей копии 9×8; оба по 64 бита.
+Похожими считаются снимки, у которых pHash отличается не больше чем на
+PHASH_DISTANCE бит и dHash — не больше чем на DHASH_DISTANCE.
+
+Поиск — multi-index hashing: pHash режется на CHUNKS частей по 16 бит.
+Если хэши отличаются не больше чем на 7 бит, то хотя бы в одной части
+отличие не больше одного бита (иначе было бы 4 × 2 = 8). Поэтому
+кандидаты — пары, у которых какая-то часть совпадает точно или с одним
+перевёрнутым битом; они находятся через таблицу корзин по значению части
+целиком в NumPy, а полное сравнение нужно только для кандидатов.
+"""
+import numpy as np
+
+PHASH_DISTANCE = 7
+DHASH_DISTANCE = 12
+CHUNKS = 4
+CHUNK_BITS = 64 // CHUNKS
+# Стороны уменьшенных копий
+PHASH_SIZE = 32
+PHASH_LOW = 8
+# Декодер JPEG уменьшает в 2/4/8 раз прямо при чтении — до этого размера
+DRAFT_SIZE = 2 * PHASH_SIZE
+
+_dct = None
+
+
+def dctMatrix(size):
+    """Матрица DCT-II: коэффициенты изображения X — M @ X @ M.T"""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    return np.cos(np.pi * (2 * n + 1) * k / (2 * size))
+
+
+def packBits(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def imageHashes(image):
+    """(pHash, dHash) изображения PIL"""
+    global _dct
+    from PIL import Image
+
+    gray = image.convert("L")
+    pixels = np.asarray(gray.resize((PHASH_SIZE, PHASH_SIZE), Image.Resampling.LANCZOS),
+                        dtype=np.float32)
+    if _dct is None:
+        _dct = dctMatrix(PHASH_SIZE).astype(np.float32)
+    low = (_dct @ pixels @ _dct.T)[:PHASH_LOW, :PHASH_LOW].ravel()
+    # Медиана без постоянной составляющей: она на порядки больше остальных
+    phash = packBits(low > np.median(low[1:]))
+
+    small = np.asarray(gray.resize((9, 8), Image.Resampling.LANCZOS), dtype=np.int16)
+    dhash = packBits(small[:, 1:] > small[:, :-1])
+    return phash, dhash
+
+
+def hashFile(path):
+    """(pHash, dHash) файла или None, если его не удалось прочитать; вызывается в пуле"""
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(path) as image:
+            image.draft("L", (DRAFT_SIZE, DRAFT_SIZE))
+            # Повёрнутый тегом EXIF и повёрнутый по-настоящему снимок — одно и то же
+            return imageHashes(ImageOps.exif_transpose(image))
+    except Exception:
+        return None
+
+
+def popcount(values):
+    """Число единичных бит в каждом элементе массива uint64"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    return table[values.view(np.uint8)].reshape(len(values), 8).sum(axis=1)
+
+
+def candidatePairs(chunk):
+    """Пары (i, j), i < j, у которых часть совпадает или отличается одним битом"""
+    # Части по 16 бит: корзины — просто таблица на 65536 значений
+    order = np.argsort(chunk, kind="stable")
+    sizes = np.bincount(chunk, minlength=1 << CHUNK_BITS)
+    starts = np.cumsum(sizes) - sizes
+    firsts, seconds = [], []
+    for flip in [0] + [1 << bit for bit in range(CHUNK_BITS)]:
+        probes = chunk ^ flip
+        counts = sizes[probes]
+        total = int(counts.sum())
+        if not total:
+            continue
+        # Разворачиваем корзины в пары без цикла по элементам
+        first = np.repeat(np.arange(len(chunk)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = order[np.repeat(starts[probes], counts) + offsets]
+        keep = first < second
+        firsts.append(first[keep])
+        seconds.append(second[keep])
+    if not firsts:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+def findGroups(phashes, dhashes):
+    """Группы индексов похожих изображений (по две и больше), крупные первыми"""
+    hashes = np.stack([np.asarray(phashes, dtype=np.uint64),
+                       np.asarray(dhashes, dtype=np.uint64)], axis=1).reshape(-1, 2)
+    if len(hashes) < 2:
+        return []
+    # Точные копии схлопываются заранее: тысяча одинаковых хэшей иначе дала бы
+    # миллион пар-кандидатов в одной корзине
+    distinct, inverse = np.unique(hashes, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    phashes, dhashes = distinct[:, 0], distinct[:, 1]
+    count = len(distinct)
+
+    mask = np.uint64((1 << CHUNK_BITS) - 1)
+    firsts, seconds = [], []
+    for part in range(CHUNKS):
+        chunk = ((phashes >> np.uint64(part * CHUNK_BITS)) & mask).astype(np.int64)
+        first, second = candidatePairs(chunk)
+        close = ((popcount(phashes[first] ^ phashes[second]) <= PHASH_DISTANCE)
+                 & (popcount(dhashes[first] ^ dhashes[second]) <= DHASH_DISTANCE))
+        firsts.append(first[close])
+        seconds.append(second[close])
+    firsts = np.concatenate(firsts)
+    seconds = np.concatenate(seconds)
+
+    # Объединение в группы: система непересекающихся множеств
+    parent = list(range(count))
+
+    def root(item):
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    for first, second in zip(firsts.tolist(), seconds.tolist()):
+        a, b = root(first), root(second)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    groups = {}
+    for index, item in enumerate(inverse.tolist()):
+        groups.setdefault(root(item), []).append(index)
+    groups = [group for group in groups.values() if len(group) > 1]
+    return sorted(groups, key=lambda group: (-len(group), group[0]))
@@ -1,16 +1,28 @@
 import sys
 import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.applog import setup_logging, timed
+from common.single_instance import AUTOSTART_FLAG, file_arguments, handoff, install_autostart
+from common.startup import profiler
+
+# До импорта PyQt6: если просмотрщик уже запущен, отдаём ему файлы и выходим
+if __name__ == '__main__' and handoff("photoviewer", sys.argv):
+    sys.exit(0)
+
 import json
 import logging
 from datetime import datetime
-from PyQt6.QtWidgets import (
-    QApplication, QLabel, QMainWindow, QFileDialog, QVBoxLayout, QHBoxLayout,
-    QWidget, QPushButton, QSpacerItem, QSizePolicy, QScrollArea, QGridLayout, QDialog,
-    QFrame
-)
-from PyQt6.QtGui import QPixmap, QPalette, QColor, QFont, QAction
-from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve
-from PIL import Image, ImageEnhance, ExifTags
+
+with profiler.phase("import PyQt6"):
+    from PyQt6.QtWidgets import (
+        QApplication, QLabel, QMainWindow, QFileDialog, QVBoxLayout, QHBoxLayout,
+        QWidget, QPushButton, QScrollArea, QGridLayout, QDialog, QFrame
+    )
+    from PyQt6.QtGui import QPixmap, QImage, QImageReader, QAction
+    from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QTimer
+
+from common.instance_host import InstanceHost
 
 # Цвета из вашего дизайна
 PRIMARY_DARK = '#1a1a1a'
@@ -21,15 +33,22 @@ HOVER_DARK = '#454545'
 BUTTON_HOVER = '#4a7ae0'
 BUTTON_PRESSED = '#3e68c7'
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("app_log.log", mode='a', encoding='utf-8')
-    ]
-)
+def loadPixmap(fileName):
+    """QPixmap из файла с учётом тега EXIF Orientation; PIL импортируется,
+    только если Qt не смог декодировать WebP"""
+    reader = QImageReader(fileName)
+    # QPixmap(fileName) тег не применяет, а пакетный поворот без jpegtran пишет именно его
+    reader.setAutoTransform(True)
+    qimage = reader.read()
+    if qimage.isNull() and fileName.lower().endswith(".webp"):
+        from PIL import Image, ImageOps
+        with Image.open(fileName) as image:
+            rgba = ImageOps.exif_transpose(image).convert("RGBA")
+            data = rgba.tobytes()
+            qimage = QImage(data, rgba.width, rgba.height, rgba.width * 4,
+                            QImage.Format.Format_RGBA8888)
+            return QPixmap.fromImage(qimage)
+    return QPixmap.fromImage(qimage)
 
 class PhotoViewer(QMainWindow):
     CONFIG_FILE = "config.json"
@@ -43,6 +62,9 @@ class PhotoViewer(QMainWindow):
         self.current_index = -1
         self.image_files = []
         self.scale_factor = 1.0
+        self.pixmap = None
+        # Проигрыватель текущего анимированного GIF/WebP
+        self.animation = None
 
         # Создаем центральный виджет с карточкой
         central_widget = QWidget()
@@ -62,7 +84,8 @@ class PhotoViewer(QMainWindow):
         
         # Создаем виджет для изображения
         self.label = QLabel()
-        self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        # Выравнивание задано в стиле: перечисления Qt строятся ~30 мс,
+        # и обращаться к ним до первой отрисовки дорого
         self.label.setObjectName("imageLabel")
         photo_layout.addWidget(self.label)
         
@@ -116,9 +139,20 @@ class PhotoViewer(QMainWindow):
         # Применяем стили
         self.applyStyles()
         
-        # Создаем меню и загружаем последнее изображение
+        # Создаем меню; последнее изображение загрузим после первой отрисовки
         self.createMenu()
-        self.loadLastOpenedImage()
+        self.restorePending = True
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.restorePending:
+            self.restorePending = False
+            QTimer.singleShot(0, self.restoreLastImage)
+
+    def restoreLastImage(self):
+        # Окно, которому уже передали файл, открыло его само
+        if self.current_index < 0:
+            self.loadLastOpenedImage()
 
     def createStyledButton(self, text):
         button = QPushButton(text)
@@ -169,6 +203,7 @@ class PhotoViewer(QMainWindow):
             }}
             
             #imageLabel {{
+                qproperty-alignment: AlignCenter;
                 color: white;
                 font-size: 14px;
             }}
@@ -197,8 +232,9 @@ class PhotoViewer(QMainWindow):
                 width: 0px;
             }}
         """)
-        def connectSignals(self):
-            self.prevButton.clicked.connect(self.showPrevImage)
+
+    def connectSignals(self):
+        self.prevButton.clicked.connect(self.showPrevImage)
         self.nextButton.clicked.connect(self.showNextImage)
         self.zoomInButton.clicked.connect(self.zoomIn)
         self.zoomOutButton.clicked.connect(self.zoomOut)
@@ -223,6 +259,18 @@ class PhotoViewer(QMainWindow):
         exitAction.triggered.connect(self.close)
         fileMenu.addAction(exitAction)
 
+        toolsMenu = menubar.addMenu("Tools")
+        toolsMenu.setObjectName("menu")
+
+        duplicatesAction = QAction("Find Duplicates", self)
+        duplicatesAction.triggered.connect(self.findDuplicates)
+        toolsMenu.addAction(duplicatesAction)
+
+        batchAction = QAction("Batch Process", self)
+        batchAction.setShortcut("Ctrl+B")
+        batchAction.triggered.connect(self.batchProcess)
+        toolsMenu.addAction(batchAction)
+
         # Добавляем информацию о времени и пользователе в строку состояния
         self.statusBar = self.statusBar()
         self.statusBar.setObjectName("statusBar")
@@ -267,107 +315,177 @@ class PhotoViewer(QMainWindow):
         self.setStyleSheet(self.styleSheet() + additional_styles)
 
     def openImage(self, fileName=None):
-        logging.info("Открытие изображения...")
+        logging.debug("Открытие изображения")
         if not fileName:
-            options = QFileDialog.Options()
             fileName, _ = QFileDialog.getOpenFileName(
                 self, 
                 "Open Image", 
                 "", 
-                "Images (*.png *.jpg *.jpeg *.bmp *.gif *.webp);;All Files (*)",
-                options=options
+                "Images (*.png *.jpg *.jpeg *.bmp *.gif *.webp);;All Files (*)"
             )
         if fileName:
-            logging.info(f"Изображение выбрано: {fileName}")
+            logging.info("Изображение выбрано: %s", fileName)
+            # Путь из командной строки может быть относительным: dirname дал бы ""
+            fileName = os.path.abspath(fileName)
             directory = os.path.dirname(fileName)
+            try:
+                names = os.listdir(directory)
+            except OSError as e:
+                logging.error("Не удалось прочитать папку %s: %s", directory, e)
+                names = []
             self.image_files = [
-                os.path.abspath(os.path.join(directory, f))
-                for f in os.listdir(directory)
+                os.path.join(directory, f)
+                for f in names
                 if f.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".gif", ".webp"))
             ]
-            fileName = os.path.abspath(fileName)
+            # Файл с другим расширением (из командной строки или от другого экземпляра) тоже показываем
+            if fileName not in self.image_files:
+                self.image_files.append(fileName)
             self.current_index = self.image_files.index(fileName)
             self.showImage(fileName)
             self.updateThumbnails()
             self.saveLastOpenedImage(fileName)
 
     def showImage(self, fileName):
-        logging.info(f"Отображение изображения: {fileName}")
+        logging.debug("Отображение изображения: %s", fileName)
         try:
-            self.pixmap = QPixmap(fileName)
-            if self.pixmap.isNull() and fileName.lower().endswith(".webp"):
-                image = Image.open(fileName)
-                image.save("temp.png")
-                self.pixmap = QPixmap("temp.png")
-
-            # Масштабируем изображение с сохранением пропорций
-            label_size = self.photoPanel.size()
-            scaled_pixmap = self.pixmap.scaled(
-                label_size, 
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.label.setPixmap(scaled_pixmap)
+            if self.animation is not None:
+                self.animation.stop()
+                self.animation.deleteLater()
+                self.animation = None
+            # Модуль нужен только для анимаций, но isAnimated проверяет каждый файл
+            from animation import AnimationPlayer, isAnimated
+            if isAnimated(fileName):
+                self.animation = AnimationPlayer(fileName, self)
+                self.animation.frameChanged.connect(self.label.setPixmap)
+                # Первый кадр в исходном размере: для информации и полноэкранного режима
+                self.pixmap = QPixmap.fromImage(self.animation.firstFrame)
+            else:
+                self.pixmap = loadPixmap(fileName)
+
+            self.scale_factor = 1.0
+            self.updateScaledPixmap()
             self.updateImageInfo(fileName, self.pixmap)
         except Exception as e:
-            logging.error(f"Ошибка при загрузке изображения: {e}")
+            logging.error("Ошибка при загрузке изображения %s: %s", fileName, e)
+
+    def updateScaledPixmap(self):
+        if self.pixmap is None or self.pixmap.isNull():
+            return
+        # Масштабируем изображение с сохранением пропорций
+        label_size = self.photoPanel.size() * self.scale_factor
+        if self.animation is not None:
+            # Кадры анимации масштабирует проигрыватель, по разу на кадр
+            self.animation.setTargetSize(label_size)
+            return
+        scaled_pixmap = self.pixmap.scaled(
+            label_size, 
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        )
+        self.label.setPixmap(scaled_pixmap)
+
+    def updateImageInfo(self, fileName, pixmap):
+        if pixmap.isNull():
+            self.infoLabel.setText(os.path.basename(fileName))
+            return
+        image = pixmap.toImage()
+        width, height = pixmap.width(), pixmap.height()
+        modified = datetime.fromtimestamp(os.path.getmtime(fileName))
+        dpi = round(image.dotsPerMeterX() * 0.0254)
+        self.infoLabel.setText(
+            f"{os.path.basename(fileName)}  |  {width}×{height} px  |  "
+            f"{width / height:.2f}:1  |  {image.depth()} bit  |  {dpi} DPI  |  "
+            f"{os.path.getsize(fileName)} B  |  {modified:%Y-%m-%d %H:%M}"
+        )
+
+    def showPrevImage(self):
+        if self.image_files:
+            self.current_index = (self.current_index - 1) % len(self.image_files)
+            self.showImage(self.image_files[self.current_index])
+
+    def showNextImage(self):
+        if self.image_files:
+            self.current_index = (self.current_index + 1) % len(self.image_files)
+            self.showImage(self.image_files[self.current_index])
+
+    def zoomIn(self):
+        self.scale_factor = min(self.scale_factor * 1.25, 5.0)
+        self.updateScaledPixmap()
+
+    def zoomOut(self):
+        self.scale_factor = max(self.scale_factor * 0.8, 0.2)
+        self.updateScaledPixmap()
+
+    def loadLastOpenedImage(self):
+        try:
+            with open(self.CONFIG_FILE, "r", encoding="utf-8") as f:
+                last_image = json.load(f).get("last_image")
+        except (OSError, ValueError):
+            return
+        if last_image and os.path.exists(last_image):
+            self.openImage(last_image)
+
+    def saveLastOpenedImage(self, fileName):
+        try:
+            with open(self.CONFIG_FILE, "w", encoding="utf-8") as f:
+                json.dump({"last_image": fileName}, f)
+        except OSError as e:
+            logging.error("Не удалось сохранить настройки: %s", e)
 
     def updateThumbnails(self):
-        logging.info("Обновление миниатюр")
-        # Очищаем текущие миниатюры
-        for i in reversed(range(self.thumbnailGrid.count())):
-            widget = self.thumbnailGrid.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
-
-        # Создаем новые миниатюры
-        for index, fileName in enumerate(self.image_files):
-            frame = QFrame()
-            frame.setObjectName("thumbnailFrame")
-            frame_layout = QVBoxLayout(frame)
+        # Все миниатюры декодируются здесь же, в GUI-потоке: время идёт в журнал
+        with timed(logging.getLogger(), "Обновление миниатюр", logging.INFO):
+            # Очищаем текущие миниатюры
+            for i in reversed(range(self.thumbnailGrid.count())):
+                widget = self.thumbnailGrid.itemAt(i).widget()
+                if widget:
+                    widget.setParent(None)
+
+            # Создаем новые миниатюры
+            for index, fileName in enumerate(self.image_files):
+                frame = QFrame()
+                frame.setObjectName("thumbnailFrame")
+                frame_layout = QVBoxLayout(frame)
             
-            thumbnail = QLabel()
-            thumbnail.setObjectName("thumbnail")
-            pixmap = QPixmap(fileName)
-            if pixmap.isNull() and fileName.lower().endswith(".webp"):
-                image = Image.open(fileName)
-                image.save("temp_thumb.png")
-                pixmap = QPixmap("temp_thumb.png")
+                thumbnail = QLabel()
+                thumbnail.setObjectName("thumbnail")
+                pixmap = loadPixmap(fileName)
             
-            scaled_pixmap = pixmap.scaled(
-                100, 100, 
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            thumbnail.setPixmap(scaled_pixmap)
+                scaled_pixmap = pixmap.scaled(
+                    100, 100, 
+                    Qt.AspectRatioMode.KeepAspectRatio,
+                    Qt.TransformationMode.SmoothTransformation
+                )
+                thumbnail.setPixmap(scaled_pixmap)
             
-            frame_layout.addWidget(thumbnail)
+                frame_layout.addWidget(thumbnail)
             
-            # Добавляем стили для миниатюр
-            frame.setStyleSheet(f"""
-                #thumbnailFrame {{
-                    background-color: {SURFACE_DARK};
-                    border-radius: 5px;
-                    padding: 5px;
-                }}
-                #thumbnailFrame:hover {{
-                    background-color: {HOVER_DARK};
-                }}
-                #thumbnail {{
-                    border: none;
-                }}
-            """)
+                # Добавляем стили для миниатюр
+                frame.setStyleSheet(f"""
+                    #thumbnailFrame {{
+                        background-color: {SURFACE_DARK};
+                        border-radius: 5px;
+                        padding: 5px;
+                    }}
+                    #thumbnailFrame:hover {{
+                        background-color: {HOVER_DARK};
+                    }}
+                    #thumbnail {{
+                        border: none;
+                    }}
+                """)
             
-            # Добавляем обработчик клика
-            frame.mousePressEvent = lambda e, idx=index: self.thumbnailClicked(idx)
+                # Добавляем обработчик клика
+                frame.mousePressEvent = lambda e, idx=index: self.thumbnailClicked(idx)
             
-            # Добавляем миниатюру в сетку
-            row = index // 6  # 6 миниатюр в ряд
-            col = index % 6
-            self.thumbnailGrid.addWidget(frame, row, col)
+                # Добавляем миниатюру в сетку
+                row = index // 6  # 6 миниатюр в ряд
+                col = index % 6
+                self.thumbnailGrid.addWidget(frame, row, col)
 
     def thumbnailClicked(self, index):
-        logging.info(f"Клик по миниатюре: {index}")
+        logging.debug("Клик по миниатюре: %d", index)
         if 0 <= index < len(self.image_files):
             self.current_index = index
             self.showImage(self.image_files[self.current_index])
@@ -381,6 +499,39 @@ class PhotoViewer(QMainWindow):
             animation.setEndValue(start_geometry)
             animation.start()
 
+    def findDuplicates(self):
+        """Группы похожих снимков текущей папки в отдельном окне"""
+        if not self.image_files:
+            return
+        # Модуль тянет NumPy и пул процессов — импортируем только по запросу
+        from duplicates import DuplicatesDialog
+        logging.info("Поиск дубликатов среди %d изображений", len(self.image_files))
+        self.duplicatesDialog = DuplicatesDialog(self.image_files, self.showImageFile, self)
+        self.duplicatesDialog.show()
+
+    def batchProcess(self):
+        """Окно пакетной обработки снимков текущей папки"""
+        if not self.image_files:
+            return
+        # Модуль тянет Pillow и пул процессов — импортируем только по запросу
+        from batch import BatchDialog
+        self.batchDialog = BatchDialog(self.image_files, self.batchFinished, self)
+        self.batchDialog.show()
+
+    def batchFinished(self, outputs):
+        # Результаты в текущей папке: перечитываем список и миниатюры
+        if not self.image_files or self.current_index < 0:
+            return
+        directory = os.path.dirname(self.image_files[self.current_index])
+        if any(os.path.dirname(output) == directory for output in outputs):
+            logging.info("Пакетная обработка изменила папку: %s", directory)
+            self.openImage(self.image_files[self.current_index])
+
+    def showImageFile(self, fileName):
+        if fileName in self.image_files:
+            self.current_index = self.image_files.index(fileName)
+            self.showImage(fileName)
+
     # Остальные методы остаются без изменений, но с обновленным визуальным стилем
     def showFullScreenImage(self):
         if self.pixmap and not self.pixmap.isNull():
@@ -420,7 +571,18 @@ class FullScreenDialog(QDialog):
         self.close()
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    viewer = PhotoViewer()
-    viewer.show()
+    if AUTOSTART_FLAG in sys.argv:
+        print(install_autostart("photoviewer", "Modern Photo Viewer", __file__))
+        sys.exit(0)
+    setup_logging("photoviewer")
+    with profiler.phase("QApplication"):
+        app = QApplication(sys.argv)
+    profiler.watch_first_paint("photoviewer")
+    with profiler.phase("PhotoViewer"):
+        # Каждый запрос на открытие получает своё окно
+        host = InstanceHost.from_argv(
+            "photoviewer", PhotoViewer, lambda viewer, files: viewer.openImage(files[0]),
+            sys.argv, reuse_window=False
+        )
+        host.start(file_arguments(sys.argv))
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1 @@
+"""Общий код приложений Aether Apps."""
@@ -0,0 +1,149 @@
+"""Общий журнал приложений: запись в файл вне GUI-потока.
+
+setup_logging() вешает на корневой логгер QueueHandler: вызов logging.*
+в GUI-потоке только кладёт запись в очередь, а форматирование в JSON,
+запись и ротацию файла выполняет поток QueueListener. Файл — по строке
+JSON на запись, в XDG state dir, с ротацией по размеру. Каждое место
+вызова пишет не больше RATE_LIMIT записей за RATE_WINDOW секунд; о
+пропущенных сообщает поле suppressed следующей записи оттуда же.
+
+Уровень задаётся переменной окружения AETHER_LOG_LEVEL (по умолчанию INFO).
+"""
+import atexit
+import contextlib
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LEVEL_ENV = "AETHER_LOG_LEVEL"
+MAX_BYTES = 1024 * 1024
+BACKUP_COUNT = 3
+# Не больше RATE_LIMIT записей из одного места за RATE_WINDOW секунд
+RATE_LIMIT = 20
+RATE_WINDOW = 10.0
+CONSOLE_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+_listener = None
+
+
+def log_dir():
+    """Каталог журналов в XDG state dir"""
+    base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    path = os.path.join(base, "aether", "logs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class JsonFormatter(logging.Formatter):
+    """Строка JSON на запись; lag_ms — сколько запись ждала в очереди"""
+
+    def __init__(self, app_id):
+        super().__init__()
+        self.app_id = app_id
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "app": self.app_id,
+            "level": record.levelname,
+            "logger": record.name,
+            "site": f"{record.module}:{record.lineno}",
+            "thread": record.threadName,
+            "message": record.getMessage(),
+            "uptime_ms": round(record.relativeCreated, 1),
+            "lag_ms": round((time.time() - record.created) * 1000, 2),
+        }
+        for field in ("duration_ms", "suppressed"):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """Ограничивает число записей из одного места вызова (файл и строка)"""
+
+    def __init__(self, limit=RATE_LIMIT, window=RATE_WINDOW):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        # (путь, строка) -> [начало окна, записано, пропущено]
+        self.sites = {}
+
+    def filter(self, record):
+        # Без блокировки: под GIL гонка может лишь сдвинуть счётчик на единицу
+        key = (record.pathname, record.lineno)
+        site = self.sites.get(key)
+        if site is None or record.created - site[0] >= self.window:
+            self.sites[key] = [record.created, 1, 0]
+            if site is not None and site[2]:
+                record.suppressed = site[2]
+            return True
+        if site[1] < self.limit:
+            site[1] += 1
+            return True
+        site[2] += 1
+        return False
+
+
+def setup_logging(app_id, level=None):
+    """Настраивает корневой логгер приложения; повторный вызов ничего не делает"""
+    global _listener
+    if _listener is not None:
+        return
+    level = level or os.environ.get(LEVEL_ENV, "INFO").upper()
+
+    handlers = []
+    try:
+        file_handler = RotatingFileHandler(
+            os.path.join(log_dir(), f"{app_id}.log"), maxBytes=MAX_BYTES,
+            backupCount=BACKUP_COUNT, encoding="utf-8", delay=True
+        )
+        file_handler.setFormatter(JsonFormatter(app_id))
+        handlers.append(file_handler)
+    except OSError as e:
+        print(f"Журнал недоступен: {e}", file=sys.stderr)
+    console = logging.StreamHandler()
+    console.setLevel(logging.WARNING)
+    console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+    handlers.append(console)
+
+    records = queue.SimpleQueue()
+    handler = QueueHandler(records)
+    # Лишние записи отбрасываются ещё до постановки в очередь
+    handler.addFilter(RateLimitFilter())
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Дописывает остаток очереди и останавливает поток журнала"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+@contextlib.contextmanager
+def timed(logger, message, level=logging.DEBUG):
+    """Пишет message с полем duration_ms — временем выполнения блока"""
+    if not logger.isEnabledFor(level):
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        logger.log(level, message, stacklevel=3,
+                   extra={"duration_ms": round((time.perf_counter() - start) * 1000, 2)})
@@ -0,0 +1,120 @@
+"""Серверная часть режима одного экземпляра: QLocalServer и прогретые окна."""
+import json
+
+from PyQt6.QtCore import QObject, Qt, QTimer, pyqtSignal
+from PyQt6.QtNetwork import QLocalServer
+from PyQt6.QtWidgets import QApplication
+
+from common.single_instance import DAEMON_FLAG, is_alive, socket_path
+
+
+class InstanceHost(QObject):
+    """Принимает запросы на открытие файлов и раздаёт их окнам приложения.
+
+    window_factory создаёт окно, open_files(window, files) открывает в нём
+    файлы. При reuse_window запросы уходят в уже открытое окно (вкладки),
+    иначе каждый запрос получает новое окно. В режиме демона (--daemon)
+    процесс не завершается после закрытия окон и держит наготове одно
+    скрытое окно, так что открытие файла не ждёт ни импорта, ни построения UI.
+    """
+    files_requested = pyqtSignal(list)
+
+    def __init__(self, app_id, window_factory, open_files, reuse_window=True, daemon=False):
+        super().__init__()
+        self.window_factory = window_factory
+        self.open_files = open_files
+        self.reuse_window = reuse_window
+        self.daemon = daemon
+        self.windows = []
+        self.spare = None
+
+        self.server = self.listen(socket_path(app_id))
+        self.files_requested.connect(self.open)
+
+        if daemon:
+            QApplication.instance().setQuitOnLastWindowClosed(False)
+            self.prepare_spare()
+
+    @classmethod
+    def from_argv(cls, app_id, window_factory, open_files, argv, reuse_window=True):
+        return cls(app_id, window_factory, open_files, reuse_window, DAEMON_FLAG in argv)
+
+    def listen(self, path):
+        server = QLocalServer(self)
+        server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        if not server.listen(path):
+            if is_alive(path):
+                # Сокет занят живым (но не ответившим) экземпляром — работаем сами по себе
+                return None
+            # Остался от упавшего процесса
+            QLocalServer.removeServer(path)
+            if not server.listen(path):
+                return None
+        server.newConnection.connect(self.accept)
+        return server
+
+    def accept(self):
+        while self.server.hasPendingConnections():
+            connection = self.server.nextPendingConnection()
+            buffer = bytearray()
+            connection.readyRead.connect(
+                lambda connection=connection, buffer=buffer: self.read(connection, buffer))
+            connection.disconnected.connect(connection.deleteLater)
+
+    def read(self, connection, buffer):
+        buffer.extend(connection.readAll().data())
+        if not buffer.endswith(b"\n"):
+            return
+        try:
+            files = json.loads(buffer).get("files", [])
+        except ValueError:
+            connection.disconnectFromServer()
+            return
+        # Отвечаем сразу: клиенту незачем ждать, пока откроется окно
+        connection.write(b"1")
+        connection.flush()
+        connection.disconnectFromServer()
+        self.files_requested.emit(files)
+
+    def create_window(self):
+        window = self.window_factory()
+        window.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        window.destroyed.connect(lambda _=None, window=window: self.forget(window))
+        return window
+
+    def forget(self, window):
+        if window in self.windows:
+            self.windows.remove(window)
+
+    def prepare_spare(self):
+        if self.spare is None:
+            self.spare = self.create_window()
+
+    def take_window(self):
+        if self.reuse_window:
+            for window in reversed(self.windows):
+                if window.isVisible():
+                    return window
+        window, self.spare = self.spare, None
+        if window is None:
+            window = self.create_window()
+        self.windows.append(window)
+        if self.daemon:
+            # Следующее окно строим, когда текущее уже показано
+            QTimer.singleShot(0, self.prepare_spare)
+        return window
+
+    def start(self, files):
+        """Первый запуск процесса: демон без файлов остаётся скрытым"""
+        if self.daemon and not files:
+            return
+        self.open(files)
+
+    def open(self, files):
+        """Открывает файлы; без файлов просто показывает окно"""
+        window = self.take_window()
+        if files:
+            self.open_files(window, files)
+        window.show()
+        window.raise_()
+        window.activateWindow()
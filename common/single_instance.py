@@ -0,0 +1,82 @@
+"""Режим одного экземпляра: повторный запуск передаёт файлы уже работающему процессу.
+
+Модуль не импортирует PyQt6: проверка выполняется до тяжёлых импортов
+приложения и занимает единицы миллисекунд. Серверная часть — в instance_host.
+"""
+import json
+import os
+import socket
+import sys
+
+# Сколько ждать ответа работающего экземпляра, с
+CONNECT_TIMEOUT = 0.5
+DAEMON_FLAG = "--daemon"
+AUTOSTART_FLAG = "--install-autostart"
+
+
+def socket_path(app_id):
+    """Путь к сокету QLocalServer в XDG runtime dir"""
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if not runtime:
+        runtime = os.path.join("/tmp", f"nuros-{os.getuid()}")
+        os.makedirs(runtime, mode=0o700, exist_ok=True)
+    return os.path.join(runtime, f"nuros-{app_id}.sock")
+
+
+def is_alive(path):
+    """Слушает ли кто-нибудь сокет (или это остаток упавшего процесса)"""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(CONNECT_TIMEOUT)
+    try:
+        client.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        client.close()
+
+
+def forward_to_running(app_id, paths):
+    """Передаёт пути работающему экземпляру. False — никто не слушает"""
+    message = json.dumps({"files": [os.path.abspath(path) for path in paths]}) + "\n"
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(CONNECT_TIMEOUT)
+    try:
+        client.connect(socket_path(app_id))
+        client.sendall(message.encode("utf-8"))
+        # Ждём подтверждения: без него запрос мог потеряться
+        return client.recv(1) == b"1"
+    except OSError:
+        return False
+    finally:
+        client.close()
+
+
+def file_arguments(argv):
+    """Аргументы командной строки без служебных флагов"""
+    return [arg for arg in argv[1:] if arg not in (DAEMON_FLAG, AUTOSTART_FLAG)]
+
+
+def handoff(app_id, argv):
+    """Вызывается до импорта PyQt6: True — файлы переданы, процессу можно завершаться"""
+    if DAEMON_FLAG in argv or AUTOSTART_FLAG in argv:
+        return False
+    return forward_to_running(app_id, file_arguments(argv))
+
+
+def install_autostart(app_id, name, script):
+    """Кладёт в ~/.config/autostart запуск прогретого демона при входе в систему"""
+    config = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    directory = os.path.join(config, "autostart")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"nuros-{app_id}.desktop")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(
+            "[Desktop Entry]\n"
+            "Type=Application\n"
+            f"Name={name}\n"
+            f'Exec="{sys.executable}" "{os.path.abspath(script)}" {DAEMON_FLAG}\n'
+            "NoDisplay=true\n"
+            "X-GNOME-Autostart-enabled=true\n"
+        )
+    return path
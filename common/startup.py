@@ -0,0 +1,105 @@
+"""Замер запуска приложений: время импортов и этапов до первой отрисовки.
+
+Включается переменной окружения AETHER_STARTUP_PROFILE (1 или путь к
+отчёту). Выключенный профилировщик ничего не делает и PyQt6 не импортирует.
+Отчёт в JSON пишется после первого события Paint.
+"""
+import contextlib
+import json
+import os
+import sys
+import time
+
+ENV_VAR = "AETHER_STARTUP_PROFILE"
+
+
+def process_age():
+    """Сколько секунд назад ядро запустило процесс (включая старт интерпретатора)"""
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # Имя процесса в скобках может содержать пробелы
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class StartupProfiler:
+    def __init__(self):
+        setting = os.environ.get(ENV_VAR, "")
+        self.enabled = bool(setting) and setting != "0"
+        self.report_path = setting if os.sep in setting else None
+        self.origin = time.perf_counter()
+        self.before_origin = process_age() if self.enabled else 0.0
+        self.phases = []
+        self.marks = {}
+        self.filter = None
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.origin + self.before_origin) * 1000
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Замеряет блок кода и модули, импортированные внутри него"""
+        if not self.enabled:
+            yield
+            return
+        modules = set(sys.modules)
+        start = self.elapsed_ms()
+        try:
+            yield
+        finally:
+            self.phases.append({
+                "name": name,
+                "start_ms": round(start, 2),
+                "duration_ms": round(self.elapsed_ms() - start, 2),
+                "imported": sorted(m for m in set(sys.modules) - modules if "." not in m),
+            })
+
+    def mark(self, name):
+        if self.enabled:
+            self.marks[name] = round(self.elapsed_ms(), 2)
+
+    def watch_first_paint(self, app_id):
+        """После первой отрисовки любого виджета пишет отчёт"""
+        if not self.enabled:
+            return
+        from PyQt6.QtCore import QEvent, QObject
+        from PyQt6.QtWidgets import QApplication
+
+        profiler = self
+
+        class FirstPaintFilter(QObject):
+            def eventFilter(self, obj, event):
+                if event.type() == QEvent.Type.Paint:
+                    QApplication.instance().removeEventFilter(self)
+                    profiler.mark("first_paint")
+                    profiler.write_report(app_id)
+                return False
+
+        self.filter = FirstPaintFilter()
+        QApplication.instance().installEventFilter(self.filter)
+
+    def report(self, app_id):
+        return {
+            "app": app_id,
+            "interpreter_ms": round(self.before_origin * 1000, 2),
+            "phases": self.phases,
+            "marks": self.marks,
+        }
+
+    def write_report(self, app_id):
+        path = self.report_path
+        if path is None:
+            base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+            directory = os.path.join(base, "aether", "startup")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{app_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(app_id), f, ensure_ascii=False, indent=2)
+        print(f"[startup] {app_id}: первая отрисовка через {self.marks.get('first_paint')} мс, "
+              f"отчёт: {path}", file=sys.stderr)
+
+
+profiler = StartupProfiler()
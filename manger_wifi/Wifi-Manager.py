@@ -1,48 +1,83 @@
+import os
+import socket
 import sys
-from PyQt6.QtWidgets import *
-from PyQt6.QtCore import Qt, QTimer
-import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.applog import setup_logging
+from common.startup import profiler
+
+with profiler.phase("import PyQt6"):
+    from PyQt6.QtWidgets import (
+        QApplication, QCheckBox, QComboBox, QFileDialog, QHBoxLayout, QHeaderView, QInputDialog,
+        QLabel, QLineEdit, QMainWindow, QMessageBox, QPushButton, QScrollArea, QSpinBox,
+        QTableView, QTableWidget, QTableWidgetItem, QTabWidget, QVBoxLayout, QWidget
+    )
+    from PyQt6.QtCore import QProcess, QTimer, Qt
+
+import netinfo
+from connections import ConnectionsMonitor
+from firewall import FirewallError, Rule, describe, detect_backend, parse_rule_spec
+from jobs import Job, JobListWidget, JobRunner
+from nmclient import NetworkManagerClient
+from processes import owns_socket
+from statsclient import StatsClient
 
 class NetworkManager(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Network Manager")
         self.setFixedSize(800, 700)
-        self.setup_ui()
-        
-        self.prev_rx_bytes = self.get_network_bytes('rx')
-        self.prev_tx_bytes = self.get_network_bytes('tx')
-        self.monitor_timer = QTimer()
-        self.monitor_timer.timeout.connect(self.update_monitoring)
 
-    def get_network_bytes(self, direction):
-        try:
-            with open('/proc/net/dev', 'r') as f:
-                total_bytes = 0
-                for line in f.readlines()[2:]:
-                    if not line.strip().startswith('lo:'):
-                        values = line.split(':')[1].split()
-                        total_bytes += int(values[0] if direction == 'rx' else values[8])
-                return total_bytes
-        except: return 0
+        # Замеры, учёт трафика и список сокетов ведёт сборщик statsd.py — общий для всех окон
+        self.stats = StatsClient(parent=self)
+        self.stats.error.connect(self.show_stats_error)
+        self.stats.start()
+        self.traffic_panel = None
+        self.last_sample_time = None
+        self.connections = None
+        self.nm = None
+        # Привилегированные команды выполняются в фоне, по очереди
+        self.jobs = JobRunner(self)
+
+        self.setup_ui()
 
     def setup_ui(self):
         central = QWidget()
         self.setCentralWidget(central)
         layout = QVBoxLayout(central)
 
+        # Вкладки строятся при первом показе: у скрытых нет ни виджетов, ни вызовов ip/ufw/netstat
         self.tab_widget = QTabWidget()
         tabs = [
-            (self.create_network_tab(), "Сеть"),
-            (self.create_firewall_tab(), "Брандмауэр"),
-            (self.create_connections_tab(), "Подключения"),
-            (self.create_monitoring_tab(), "Мониторинг")
+            (self.create_network_tab, "Сеть"),
+            (self.create_wifi_tab, "Wi-Fi"),
+            (self.create_firewall_tab, "Брандмауэр"),
+            (self.create_connections_tab, "Подключения"),
+            (self.create_monitoring_tab, "Мониторинг")
         ]
-        for tab, name in tabs:
-            self.tab_widget.addTab(tab, name)
+        self.tab_factories = []
+        for factory, name in tabs:
+            page = QWidget()
+            page_layout = QVBoxLayout(page)
+            page_layout.setContentsMargins(0, 0, 0, 0)
+            self.tab_widget.addTab(page, name)
+            self.tab_factories.append(factory)
+        self.tab_widget.currentChanged.connect(self.ensure_tab)
+        self.ensure_tab(self.tab_widget.currentIndex())
         layout.addWidget(self.tab_widget)
+
+        self.jobs_list = JobListWidget(self.jobs)
+        self.jobs_list.setMaximumHeight(90)
+        layout.addWidget(self.jobs_list)
         self.apply_styles()
 
+    def ensure_tab(self, index):
+        factory = self.tab_factories[index]
+        if factory is None:
+            return
+        self.tab_factories[index] = None
+        self.tab_widget.widget(index).layout().addWidget(factory())
+
     def create_network_tab(self):
         tab = QWidget()
         layout = QVBoxLayout(tab)
@@ -76,18 +111,133 @@ class NetworkManager(QMainWindow):
             QHeaderView.ResizeMode.Stretch
         )
         layout.addWidget(self.interfaces_table)
-        
-        self.refresh_network_status()
+
+        # Таблица и статус обновляются по событиям ядра, которые пересылает сборщик
+        self.stats.interfaces_changed.connect(self.show_interfaces)
+        self.stats.subscribe("interfaces")
+        if self.stats.list():
+            self.show_interfaces()
         return tab
 
+    def create_wifi_tab(self):
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+
+        self.wifi_status = QLabel("Поиск Wi-Fi адаптера...")
+        layout.addWidget(self.wifi_status)
+
+        self.wifi_table = QTableWidget()
+        self.wifi_table.setColumnCount(4)
+        self.wifi_table.setHorizontalHeaderLabels(["Сеть", "Сигнал", "Частота", "Защита"])
+        self.wifi_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.wifi_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.wifi_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.wifi_table.itemDoubleClicked.connect(self.connect_wifi)
+        layout.addWidget(self.wifi_table)
+
+        btn_layout = QHBoxLayout()
+        buttons = [
+            ("Сканировать", self.scan_wifi),
+            ("Подключиться", self.connect_wifi),
+            ("Отключиться", self.disconnect_wifi)
+        ]
+        for text, slot in buttons:
+            btn = QPushButton(text)
+            btn.clicked.connect(slot)
+            btn_layout.addWidget(btn)
+        layout.addLayout(btn_layout)
+
+        # Точки доступа и уровень сигнала приходят сигналами NetworkManager, без опроса
+        nm = self.ensure_nm()
+        nm.access_points_changed.connect(self.show_access_points)
+        nm.active_access_point_changed.connect(self.show_access_points)
+        nm.activation_finished.connect(self.on_wifi_activation)
+        nm.error.connect(self.wifi_status.setText)
+        QTimer.singleShot(0, nm.start)
+        return tab
+
+    def ensure_nm(self):
+        if self.nm is None:
+            self.nm = NetworkManagerClient(parent=self)
+            # Ошибки D-Bus, в том числе включения и выключения сети, — как у заданий
+            self.nm.error.connect(self.show_nm_error)
+        return self.nm
+
+    def show_nm_error(self, message):
+        QMessageBox.critical(self, "Ошибка", message)
+
+    def show_access_points(self):
+        selected = self.selected_access_point()
+        access_points = self.nm.sorted_access_points()
+        self.wifi_table.setRowCount(len(access_points))
+        for row, access_point in enumerate(access_points):
+            active = access_point.ssid == self.active_ssid()
+            values = [
+                ("● " if active else "") + (access_point.ssid or "(скрытая сеть)"),
+                f"{access_point.strength}%",
+                f"{access_point.frequency / 1000:.1f} ГГц" if access_point.frequency else "",
+                "WPA" if access_point.secured else "Открытая",
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                item.setData(Qt.ItemDataRole.UserRole, access_point)
+                self.wifi_table.setItem(row, column, item)
+            if selected is not None and access_point.ssid == selected.ssid:
+                self.wifi_table.selectRow(row)
+        self.wifi_status.setText(f"Сетей найдено: {len(access_points)}")
+
+    def active_ssid(self):
+        active = self.nm.access_points.get(self.nm.active_access_point)
+        return active.ssid if active else None
+
+    def selected_access_point(self):
+        items = self.wifi_table.selectedItems()
+        return items[0].data(Qt.ItemDataRole.UserRole) if items else None
+
+    def scan_wifi(self):
+        self.nm.request_scan()
+
+    def connect_wifi(self):
+        access_point = self.selected_access_point()
+        if access_point is None:
+            return
+        password = ""
+        if access_point.secured:
+            password, ok = QInputDialog.getText(
+                self, access_point.ssid, "Пароль (пусто — сохранённое подключение):",
+                QLineEdit.EchoMode.Password)
+            if not ok:
+                return
+            password = password or None
+        self.wifi_status.setText(f"Подключение к {access_point.ssid}...")
+        self.nm.connect_access_point(access_point, password)
+
+    def on_wifi_activation(self, ok, message):
+        if ok:
+            self.wifi_status.setText(f"Подключение к {message} запущено")
+        else:
+            QMessageBox.critical(self, "Ошибка", message)
+
+    def disconnect_wifi(self):
+        self.nm.disconnect_device()
+
     def create_firewall_tab(self):
         tab = QWidget()
         layout = QVBoxLayout(tab)
 
         self.firewall_status = QLabel("Статус: проверка...")
-        layout.addWidget(self.firewall_status)
+        # Правила читаются без прав; если их не хватило — по кнопке, через pkexec
+        self.firewall_reader = None
+        self.privileged_read_btn = QPushButton("Прочитать с правами администратора")
+        self.privileged_read_btn.clicked.connect(self.read_firewall_privileged)
+        self.privileged_read_btn.hide()
+        status_row = QHBoxLayout()
+        status_row.addWidget(self.firewall_status, 1)
+        status_row.addWidget(self.privileged_read_btn)
+        layout.addLayout(status_row)
 
         # Таблица правил
+        self.firewall = detect_backend()
         self.rules_table = QTableWidget()
         self.rules_table.setColumnCount(5)
         self.rules_table.setHorizontalHeaderLabels(
@@ -108,9 +258,11 @@ class NetworkManager(QMainWindow):
         
         add_btn = QPushButton("Добавить")
         add_btn.clicked.connect(self.add_firewall_rule)
+        import_btn = QPushButton("Импорт...")
+        import_btn.clicked.connect(self.import_firewall_rules)
 
         for w in [self.port_input, self.protocol_combo, 
-                 self.direction_combo, self.action_combo, add_btn]:
+                 self.direction_combo, self.action_combo, add_btn, import_btn]:
             controls.addWidget(w)
         layout.addLayout(controls)
 
@@ -121,20 +273,33 @@ class NetworkManager(QMainWindow):
         tab = QWidget()
         layout = QVBoxLayout(tab)
 
-        self.connections_table = QTableWidget()
-        self.connections_table.setColumnCount(5)
-        self.connections_table.setHorizontalHeaderLabels(
-            ["Протокол", "Локальный", "Удаленный", "Статус", "PID"]
-        )
-        layout.addWidget(self.connections_table)
+        self.connections = ConnectionsMonitor(self.stats, self)
+        self.connection_filter = QLineEdit()
+        self.connection_filter.setPlaceholderText("Фильтр: адрес, порт, статус, PID")
+        self.connection_filter.textChanged.connect(self.connections.set_filter)
+        layout.addWidget(self.connection_filter)
+
+        self.connections_view = QTableView()
+        self.connections_view.setModel(self.connections.proxy)
+        # Сортировка по щелчку на заголовке; до этого — порядок ядра, первый снимок не сортируется
+        self.connections_view.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.connections_view.setSortingEnabled(True)
+        self.connections_view.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.connections_view.verticalHeader().hide()
+        self.connections_view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.connections_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.connections_view)
 
         btn_layout = QHBoxLayout()
         refresh_btn = QPushButton("Обновить")
         kill_btn = QPushButton("Завершить")
+        auto_refresh = QCheckBox("Обновлять каждую секунду")
         refresh_btn.clicked.connect(self.refresh_connections)
         kill_btn.clicked.connect(self.kill_connection)
+        auto_refresh.toggled.connect(self.connections.set_auto_refresh)
         btn_layout.addWidget(refresh_btn)
         btn_layout.addWidget(kill_btn)
+        btn_layout.addWidget(auto_refresh)
         layout.addLayout(btn_layout)
 
         self.refresh_connections()
@@ -151,18 +316,28 @@ class NetworkManager(QMainWindow):
         for label in [self.download_speed, self.upload_speed, self.total_traffic]:
             layout.addWidget(label)
 
+        # NumPy нужен только мониторингу — загружаем его при первом открытии вкладки
+        from traffic import TrafficPanel
+        self.traffic_panel = TrafficPanel(self.format_bytes)
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setWidget(self.traffic_panel)
+        layout.addWidget(scroll)
+
         # Настройки
         settings = QHBoxLayout()
         self.auto_refresh = QCheckBox("Автообновление")
         self.auto_refresh.setChecked(True)
         self.refresh_interval = QSpinBox()
         self.refresh_interval.setRange(1, 60)
-        self.refresh_interval.setValue(5)
+        self.refresh_interval.setValue(1)
+        self.refresh_interval.setSuffix(" с")
         settings.addWidget(self.auto_refresh)
         settings.addWidget(self.refresh_interval)
         layout.addLayout(settings)
 
-        self.start_monitoring()
+        self.stats.traffic_received.connect(self.update_monitoring)
+        self.stats.subscribe("traffic")
         return tab
 
     def apply_styles(self):
@@ -176,7 +351,7 @@ class NetworkManager(QMainWindow):
                 border-radius: 5px;
                 padding: 10px;
             }
-            QTableWidget {
+            QTableView {
                 background-color: #2d2d2d;
                 color: white;
                 border: none;
@@ -194,144 +369,217 @@ class NetworkManager(QMainWindow):
 
     # Методы управления сетью
     def refresh_network_status(self):
-        try:
-            result = subprocess.run(['ip', 'addr'], capture_output=True, text=True)
-            if 'inet ' in result.stdout:
-                self.ip_address.setText(f"IP: {result.stdout.split('inet ')[1].split('/')[0]}")
-            
-            result = subprocess.run(['nmcli', 'connection', 'show', '--active'], 
-                                 capture_output=True, text=True)
-            self.connection_status.setText(
-                "Статус: Подключено" if result.stdout.strip() else "Статус: Отключено"
-            )
-            
-            # Обновление таблицы интерфейсов
-            self.update_interfaces_table()
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+        self.stats.resync()
 
-    def update_interfaces_table(self):
-        try:
-            result = subprocess.run(['ip', 'addr'], capture_output=True, text=True)
-            self.interfaces_table.setRowCount(0)
-            current_interface = None
-            
-            for line in result.stdout.split('\n'):
-                if not line.startswith(' '):
-                    if ': ' in line:
-                        current_interface = line.split(': ')[1].split('@')[0]
-                elif current_interface and 'inet ' in line:
-                    ip = line.split('inet ')[1].split('/')[0]
-                    row = self.interfaces_table.rowCount()
-                    self.interfaces_table.insertRow(row)
-                    self.interfaces_table.setItem(row, 0, QTableWidgetItem(current_interface))
-                    self.interfaces_table.setItem(row, 2, QTableWidgetItem(ip))
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+    def show_stats_error(self, message):
+        QMessageBox.critical(self, "Ошибка", message)
+
+    def show_interfaces(self):
+        interfaces = self.stats.list()
+        self.update_connection_status(interfaces)
+        self.update_interfaces_table(interfaces)
+
+    def update_connection_status(self, interfaces):
+        # Подключены, если есть маршрут по умолчанию; IP — адрес его интерфейса
+        uplinks = self.stats.uplinks
+        self.connection_status.setText(
+            "Статус: Подключено" if uplinks else "Статус: Отключено"
+        )
+        candidates = [i for i in interfaces if i.name in uplinks] or \
+            [i for i in interfaces if not i.flags & netinfo.IFF_LOOPBACK]
+        ipv4 = [a.address for i in candidates for a in i.addresses if a.family == socket.AF_INET]
+        self.ip_address.setText(f"IP: {ipv4[0] if ipv4 else '—'}")
+
+    def update_interfaces_table(self, interfaces):
+        self.interfaces_table.setRowCount(len(interfaces))
+        for row, interface in enumerate(interfaces):
+            values = [
+                interface.name,
+                interface.state.upper(),
+                ", ".join(netinfo.format_address(a) for a in interface.addresses),
+                interface.mac,
+            ]
+            for column, value in enumerate(values):
+                self.interfaces_table.setItem(row, column, QTableWidgetItem(value))
 
     def enable_network(self):
-        try:
-            subprocess.run(['sudo', 'nmcli', 'networking', 'on'], check=True)
-            self.refresh_network_status()
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+        self.set_networking(True)
 
     def disable_network(self):
-        try:
-            subprocess.run(['sudo', 'nmcli', 'networking', 'off'], check=True)
-            self.refresh_network_status()
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+        self.set_networking(False)
+
+    def set_networking(self, enabled):
+        # Через D-Bus права проверяет polkit; без шины — nmcli в фоне
+        nm = self.ensure_nm()
+        if nm.available():
+            nm.set_networking_enabled(enabled)
+        else:
+            self.jobs.submit("Включение сети" if enabled else "Выключение сети",
+                             [['nmcli', 'networking', 'on' if enabled else 'off']],
+                             on_finished=self.job_finished)
+
+    def job_finished(self, job):
+        """Ошибку показываем так же, как раньше; интерфейсы обновит NetlinkWatcher"""
+        if job.state == Job.FAILED:
+            QMessageBox.critical(self, "Ошибка", job.output.strip() or f"Не удалось: {job.name}")
+
+    def firewall_job_finished(self, job):
+        self.job_finished(job)
+        self.refresh_firewall_status()
 
     def refresh_firewall_status(self):
-        try:
-            result = subprocess.run(['ufw', 'status'], capture_output=True, text=True)
-            self.firewall_status.setText(f"Статус: {result.stdout.split()[0]}")
-            self.update_firewall_rules()
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+        """Читает правила в фоновом процессе; окно не ждёт ufw или nft"""
+        if self.firewall is None:
+            self.firewall_status.setText("Статус: брандмауэр (ufw или nftables) не найден")
+            return
+        if self.firewall_reader is not None:
+            return
+        self.firewall_reader = QProcess(self)
+        self.firewall_reader.finished.connect(self.on_firewall_read)
+        self.firewall_reader.errorOccurred.connect(self.on_firewall_read_error)
+        command = self.firewall.read_command
+        self.firewall_reader.start(command[0], command[1:])
+
+    def on_firewall_read_error(self, error):
+        if error == QProcess.ProcessError.FailedToStart:
+            self.firewall_status.setText(
+                f"Статус: не удалось запустить {self.firewall.name}: {self.firewall_reader.errorString()}")
+            self.firewall_reader.deleteLater()
+            self.firewall_reader = None
+
+    def on_firewall_read(self, exit_code, exit_status):
+        process, self.firewall_reader = self.firewall_reader, None
+        process.deleteLater()
+        output = process.readAllStandardOutput().data().decode(errors="replace")
+        if exit_status == QProcess.ExitStatus.NormalExit and exit_code == 0:
+            self.show_firewall_state(output)
+        elif os.geteuid() != 0:
+            # И ufw status, и nft list ruleset без root не работают
+            self.firewall_status.setText(f"Статус: для чтения правил {self.firewall.name} нужны права администратора")
+            self.privileged_read_btn.show()
+        else:
+            error = process.readAllStandardError().data().decode(errors="replace").strip()
+            self.firewall_status.setText(f"Статус: ошибка {self.firewall.name}: {error or exit_code}")
+
+    def read_firewall_privileged(self):
+        self.jobs.submit("Чтение правил брандмауэра", [self.firewall.read_command],
+                         on_finished=self.firewall_read_finished)
+
+    def firewall_read_finished(self, job):
+        if job.state == Job.FAILED:
+            self.job_finished(job)
+            return
+        self.show_firewall_state(job.output)
 
-    def update_firewall_rules(self):
+    def show_firewall_state(self, output):
         try:
-            result = subprocess.run(['ufw', 'status', 'numbered'], 
-                                 capture_output=True, text=True)
-            self.rules_table.setRowCount(0)
-            for rule in result.stdout.split('\n')[1:]:
-                if rule.strip():
-                    parts = rule.split()
-                    if len(parts) >= 4:
-                        row = self.rules_table.rowCount()
-                        self.rules_table.insertRow(row)
-                        self.rules_table.setItem(row, 0, QTableWidgetItem(parts[1]))
-                        self.rules_table.setItem(row, 1, QTableWidgetItem(parts[2]))
-                        self.rules_table.setItem(row, 3, QTableWidgetItem(parts[3]))
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+            state = self.firewall.parse(output)
+        except (FirewallError, ValueError) as e:
+            self.firewall_status.setText(f"Статус: не удалось разобрать вывод {self.firewall.name}: {e}")
+            return
+        self.privileged_read_btn.hide()
+        status = "активен" if state.enabled else "выключен"
+        self.firewall_status.setText(f"Статус: {status} ({self.firewall.name})")
+        self.update_firewall_rules(state.rules)
+
+    def update_firewall_rules(self, rules):
+        directions = {"in": "Входящий", "out": "Исходящий"}
+        self.rules_table.setRowCount(len(rules))
+        for row, rule in enumerate(rules):
+            values = [rule.port or "любой", rule.protocol.upper() or "любой",
+                      directions.get(rule.direction, rule.direction), rule.action.upper(),
+                      describe(rule)]
+            for column, value in enumerate(values):
+                self.rules_table.setItem(row, column, QTableWidgetItem(value))
 
     def add_firewall_rule(self):
+        if self.firewall is None:
+            return
+        rule = Rule(
+            'allow' if self.action_combo.currentText() == "Разрешить" else 'deny',
+            'in' if self.direction_combo.currentText() == "Входящий" else 'out',
+            str(self.port_input.value()),
+            self.protocol_combo.currentText().lower()
+        )
+        # Правила, добавленные подряд, уходят в брандмауэр одним вызовом помощника
+        self.jobs.submit(f"{self.firewall.name}: {rule.action} {rule.direction} {rule.port}/{rule.protocol}",
+                         self.firewall.apply_commands([rule]),
+                         batch_key="firewall", on_finished=self.firewall_job_finished)
+
+    def import_firewall_rules(self):
+        """Правила из текстового файла, по одному в строке: allow in 22/tcp # ssh"""
+        if self.firewall is None:
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Импорт правил", "", "Текстовые файлы (*.txt);;Все файлы (*)")
+        if not path:
+            return
         try:
-            cmd = [
-                'sudo', 'ufw',
-                'allow' if self.action_combo.currentText() == "Разрешить" else 'deny',
-                'in' if self.direction_combo.currentText() == "Входящий" else 'out',
-                str(self.port_input.value()),
-                'proto',
-                self.protocol_combo.currentText().lower()
-            ]
-            subprocess.run(cmd, check=True)
-            self.refresh_firewall_status()
-        except Exception as e:
+            with open(path, "r", encoding="utf-8") as f:
+                rules = [parse_rule_spec(line) for line in f
+                         if line.strip() and not line.lstrip().startswith("#")]
+        except (OSError, FirewallError) as e:
             QMessageBox.critical(self, "Ошибка", str(e))
+            return
+        if rules:
+            self.jobs.submit(f"Импорт правил: {len(rules)}", self.firewall.apply_commands(rules),
+                             on_finished=self.firewall_job_finished)
 
     def refresh_connections(self):
-        try:
-            result = subprocess.run(['netstat', '-tunapl'], capture_output=True, text=True)
-            self.connections_table.setRowCount(0)
-            for line in result.stdout.split('\n')[2:]:
-                if line.strip():
-                    parts = line.split()
-                    if len(parts) >= 7:
-                        row = self.connections_table.rowCount()
-                        self.connections_table.insertRow(row)
-                        for i, val in enumerate([parts[0], parts[3], parts[4], parts[5], parts[6]]):
-                            self.connections_table.setItem(row, i, QTableWidgetItem(val))
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+        self.connections.refresh()
 
     def kill_connection(self):
-        selected = self.connections_table.selectedItems()
+        selected = self.connections_view.selectionModel().selectedRows()
         if not selected:
             return
-        try:
-            pid = self.connections_table.item(selected[0].row(), 4).text()
-            if pid and pid.isdigit():
-                subprocess.run(['sudo', 'kill', '-9', pid], check=True)
-                self.refresh_connections()
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+        row = self.connections.source_row(selected[0])
+        model = self.connections.model
+        pid = model.pid(row)
+        if not pid:
+            return
+        # Строка могла устареть: PID мог выйти или достаться другому процессу
+        if not owns_socket(pid, model.inode(row)):
+            QMessageBox.warning(self, "Ошибка", f"Процесс {pid} больше не владеет этим сокетом")
+            self.refresh_connections()
+            return
+        self.jobs.submit(f"Завершение процесса {model.process_name(row)} ({pid})",
+                         [['kill', '-9', str(pid)]], on_finished=self.connection_job_finished)
 
-    def start_monitoring(self):
-        self.monitor_timer.start(self.refresh_interval.value() * 1000)
+    def connection_job_finished(self, job):
+        self.job_finished(job)
+        self.refresh_connections()
 
-    def update_monitoring(self):
-        if not self.auto_refresh.isChecked():
-            return
+    def update_monitoring(self, sample):
+        """Замер от сборщика: {"time", "counters", "today", "month"}"""
         try:
-            curr_rx = self.get_network_bytes('rx')
-            curr_tx = self.get_network_bytes('tx')
-            
-            rx_speed = (curr_rx - self.prev_rx_bytes) / self.refresh_interval.value()
-            tx_speed = (curr_tx - self.prev_tx_bytes) / self.refresh_interval.value()
-            
+            if not self.auto_refresh.isChecked():
+                return
+            # Сборщик меряет каждую секунду; окно берёт замеры с выбранным интервалом
+            if self.last_sample_time is not None and \
+                    sample["time"] - self.last_sample_time < self.refresh_interval.value() - 0.5:
+                return
+            self.last_sample_time = sample["time"]
+            counters = sample["counters"]
+            # Время замера — монотонные часы демона, общие для всех процессов
+            self.traffic_panel.sample(counters, sample["time"])
+            rx_speed, tx_speed = self.traffic_panel.total_rates()
+
             self.download_speed.setText(f"Загрузка: {self.format_bytes(rx_speed)}/s")
             self.upload_speed.setText(f"Отдача: {self.format_bytes(tx_speed)}/s")
-            self.total_traffic.setText(f"Всего: {self.format_bytes(curr_rx + curr_tx)}")
-            
-            self.prev_rx_bytes = curr_rx
-            self.prev_tx_bytes = curr_tx
+            total = sum(rx + tx for name, (rx, tx) in counters.items() if name != 'lo')
+            today = sum(rx + tx for rx, tx in sample["today"].values())
+            month = sum(rx + tx for rx, tx in sample["month"].values())
+            self.total_traffic.setText(
+                f"Всего: {self.format_bytes(total)}, сегодня: {self.format_bytes(today)}, "
+                f"за месяц: {self.format_bytes(month)}")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", str(e))
 
+    def closeEvent(self, event):
+        if self.connections is not None:
+            self.connections.shutdown()
+        self.stats.close()
+        super().closeEvent(event)
+
     def format_bytes(self, bytes_value):
         for unit in ['B', 'KB', 'MB', 'GB']:
             if bytes_value < 1024:
@@ -340,9 +588,13 @@ class NetworkManager(QMainWindow):
         return f"{bytes_value:.2f} TB"
 
 def main():
-    app = QApplication(sys.argv)
-    window = NetworkManager()
-    window.show()
+    setup_logging("wifi-manager")
+    with profiler.phase("QApplication"):
+        app = QApplication(sys.argv)
+    profiler.watch_first_paint("wifi-manager")
+    with profiler.phase("NetworkManager"):
+        window = NetworkManager()
+        window.show()
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+"""Учёт трафика по интерфейсам в SQLite, переживающий перезапуск и перезагрузку.
+
+Каждый замер превращается в приращения rx/tx, которые сразу добавляются в
+корзины четырёх разрешений: секунда, минута, час и сутки (по местному
+времени). Поэтому запрос «за сегодня» или «за месяц» суммирует десятки
+строк, а не сырые замеры. Мелкие разрешения со временем удаляются.
+Модуль не зависит от Qt.
+"""
+import os
+import sqlite3
+import time
+
+SECOND, MINUTE, HOUR, DAY = 1, 60, 3600, 86400
+# Сколько хранить корзины каждого разрешения, с; суточные — всегда
+RETENTION = {SECOND: HOUR, MINUTE: 2 * DAY, HOUR: 90 * DAY}
+# Как часто сбрасывать накопленное на диск, с
+FLUSH_INTERVAL = 30
+COUNTER_32BIT = 2 ** 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    interface TEXT PRIMARY KEY,
+    boot_id TEXT NOT NULL,
+    rx INTEGER NOT NULL,
+    tx INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS usage (
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    interface TEXT NOT NULL,
+    rx INTEGER NOT NULL,
+    tx INTEGER NOT NULL,
+    PRIMARY KEY (resolution, bucket, interface)
+) WITHOUT ROWID;
+"""
+
+
+def database_path():
+    base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "nuros-wifi-manager", "traffic.db")
+
+
+def boot_id():
+    try:
+        with open("/proc/sys/kernel/random/boot_id", "r") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def bucket_start(timestamp, resolution):
+    """Начало корзины по местному времени (сутки — с полуночи)"""
+    offset = time.localtime(timestamp).tm_gmtoff
+    return int(timestamp - (timestamp + offset) % resolution)
+
+
+def counter_delta(current, previous):
+    """Приращение счётчика с учётом переполнения и сброса.
+
+    32-битный счётчик, бывший в верхней половине диапазона и ставший меньше,
+    считаем переполнившимся; иначе уменьшение — это сброс (интерфейс
+    пересоздан), и всё текущее значение набрано после него.
+    """
+    if current >= previous:
+        return current - previous
+    if COUNTER_32BIT // 2 <= previous < COUNTER_32BIT:
+        return current + COUNTER_32BIT - previous
+    return current
+
+
+class TrafficAccounting:
+    def __init__(self, path=None):
+        self.path = path or database_path()
+        self.db = None
+        self.boot_id = boot_id()
+        self.last = {}
+        self.pending = {}
+        self.last_flush = time.monotonic()
+
+    def open(self):
+        if self.db is not None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        # Счётчики прошлого запуска действительны, только если не было перезагрузки
+        for interface, boot, rx, tx in self.db.execute("SELECT interface, boot_id, rx, tx FROM counters"):
+            self.last[interface] = (rx, tx) if boot == self.boot_id else (0, 0)
+
+    def record(self, counters, timestamp=None):
+        """Учитывает замер {имя: (rx, tx)}; на диск пишет раз в FLUSH_INTERVAL"""
+        self.open()
+        timestamp = time.time() if timestamp is None else timestamp
+        buckets = [(resolution, bucket_start(timestamp, resolution))
+                   for resolution in (SECOND, MINUTE, HOUR, DAY)]
+        for interface, (rx, tx) in counters.items():
+            if interface == "lo":
+                continue
+            # Новый интерфейс: всё, что он набрал с момента появления, ещё не учтено
+            last_rx, last_tx = self.last.get(interface, (0, 0))
+            delta = (counter_delta(rx, last_rx), counter_delta(tx, last_tx))
+            self.last[interface] = (rx, tx)
+            if delta == (0, 0):
+                continue
+            for resolution, bucket in buckets:
+                key = (resolution, bucket, interface)
+                old = self.pending.get(key, (0, 0))
+                self.pending[key] = (old[0] + delta[0], old[1] + delta[1])
+        if time.monotonic() - self.last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if self.db is None:
+            return
+        pending, self.pending = self.pending, {}
+        self.last_flush = time.monotonic()
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO usage VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT DO UPDATE SET rx = rx + excluded.rx, tx = tx + excluded.tx",
+                [(*key, rx, tx) for key, (rx, tx) in pending.items()])
+            self.db.executemany(
+                "INSERT OR REPLACE INTO counters VALUES (?, ?, ?, ?)",
+                [(interface, self.boot_id, rx, tx) for interface, (rx, tx) in self.last.items()])
+            now = time.time()
+            for resolution, keep in RETENTION.items():
+                self.db.execute("DELETE FROM usage WHERE resolution = ? AND bucket < ?",
+                                (resolution, int(now - keep)))
+
+    def usage(self, resolution, start, end=None):
+        """Корзины [(начало, интерфейс, rx, tx)] с учётом ещё не сброшенных"""
+        self.open()
+        end = float("inf") if end is None else end
+        totals = {}
+        for bucket, interface, rx, tx in self.db.execute(
+                "SELECT bucket, interface, rx, tx FROM usage "
+                "WHERE resolution = ? AND bucket >= ? AND bucket < ?",
+                (resolution, int(start), min(end, 2 ** 62))):
+            totals[bucket, interface] = (rx, tx)
+        for (res, bucket, interface), (rx, tx) in self.pending.items():
+            if res == resolution and start <= bucket < end:
+                old = totals.get((bucket, interface), (0, 0))
+                totals[bucket, interface] = (old[0] + rx, old[1] + tx)
+        return sorted((bucket, interface, rx, tx) for (bucket, interface), (rx, tx) in totals.items())
+
+    def totals(self, start, end=None):
+        """{интерфейс: (rx, tx)} по суточным корзинам — мгновенно для любых периодов"""
+        result = {}
+        for _bucket, interface, rx, tx in self.usage(DAY, bucket_start(start, DAY), end):
+            old = result.get(interface, (0, 0))
+            result[interface] = (old[0] + rx, old[1] + tx)
+        return result
+
+    def today(self):
+        return self.totals(time.time())
+
+    def this_month(self):
+        now = time.localtime()
+        return self.totals(time.mktime((now.tm_year, now.tm_mon, 1, 0, 0, 0, 0, 0, -1)))
+
+    def close(self):
+        if self.db is not None:
+            self.flush()
+            self.db.close()
+            self.db = None
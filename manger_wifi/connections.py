@@ -0,0 +1,179 @@
+"""Модель таблицы подключений с построчным обновлением.
+
+Снимок сокетов собирается в рабочем потоке сборщика статистики (statsd.py)
+из /proc/net, а модель окна применяет к себе только разницу со старым
+снимком: удалённые строки, изменившиеся ячейки и новые строки в конце.
+Выделение и прокрутка при этом сохраняются, а десятки тысяч сокетов
+обновляются без пересоздания таблицы.
+"""
+from PyQt6.QtCore import (
+    QAbstractTableModel, QModelIndex, QObject, QSortFilterProxyModel, Qt, pyqtSignal, pyqtSlot
+)
+
+import netinfo
+from processes import SocketOwnerResolver
+
+COLUMNS = ["Протокол", "Локальный", "Удаленный", "Статус", "PID", "Процесс"]
+PID_COLUMN = 4
+PROCESS_COLUMN = 5
+# За колонками в строке хранится командная строка — для подсказки
+CMDLINE_FIELD = 6
+AUTO_REFRESH_INTERVAL = 1000
+
+
+def runs(rows):
+    """Возрастающие номера строк -> диапазоны подряд идущих [(первая, последняя)]"""
+    result = []
+    for row in rows:
+        if result and result[-1][1] == row - 1:
+            result[-1][1] = row
+        else:
+            result.append([row, row])
+    return result
+
+
+class SnapshotWorker(QObject):
+    """Собирает снимок сокетов с владельцами из кэша SocketOwnerResolver"""
+    snapshot_ready = pyqtSignal(list)
+
+    def __init__(self):
+        super().__init__()
+        self.resolver = SocketOwnerResolver()
+
+    @pyqtSlot()
+    def snapshot(self):
+        sockets = netinfo.list_sockets()
+        owners = self.resolver.resolve({sock.inode for sock in sockets})
+        rows = []
+        for sock in sockets:
+            pid = owners.get(sock.inode)
+            info = self.resolver.process(pid) if pid else None
+            key = (sock.proto, sock.local, sock.remote, sock.inode)
+            rows.append((key, (sock.proto, sock.local, sock.remote, sock.state, pid,
+                               info.name if info else "", info.cmdline if info else "")))
+        self.snapshot_ready.emit(rows)
+
+
+class ConnectionsModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.keys = []
+        self.rows = []
+        self.positions = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        value = row[index.column()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return "" if value is None else str(value)
+        if role == Qt.ItemDataRole.ToolTipRole and index.column() == PROCESS_COLUMN:
+            return row[CMDLINE_FIELD] or None
+        if role == Qt.ItemDataRole.UserRole:
+            # Ключ сортировки: PID — числом, сокеты без владельца — в начале
+            if index.column() == PID_COLUMN:
+                return -1 if value is None else value
+            return value
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def pid(self, row):
+        return self.rows[row][PID_COLUMN]
+
+    def process_name(self, row):
+        return self.rows[row][PROCESS_COLUMN]
+
+    def inode(self, row):
+        return self.keys[row][3]
+
+    def apply_snapshot(self, snapshot):
+        """Приводит модель к снимку [(ключ, значения)] минимальным набором изменений"""
+        new = dict(snapshot)
+
+        removed = sorted((row for key, row in self.positions.items() if key not in new), reverse=True)
+        # Соседние строки удаляем одним диапазоном, с конца — индексы выше не сдвигаются
+        for first, last in runs(removed[::-1])[::-1]:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.keys[first:last + 1]
+            del self.rows[first:last + 1]
+            self.endRemoveRows()
+        if removed:
+            self.positions = {key: row for row, key in enumerate(self.keys)}
+
+        changed = [row for row, key in enumerate(self.keys) if new[key] != self.rows[row]]
+        for row in changed:
+            self.rows[row] = new[self.keys[row]]
+        # Один сигнал на весь разброс заставил бы прокси перечитать почти всю таблицу
+        for first, last in runs(changed):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(COLUMNS) - 1))
+
+        added = [(key, values) for key, values in snapshot if key not in self.positions]
+        if added:
+            first = len(self.rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            for key, values in added:
+                self.positions[key] = len(self.keys)
+                self.keys.append(key)
+                self.rows.append(values)
+            self.endInsertRows()
+
+
+class ConnectionsMonitor(QObject):
+    """Модель, прокси для сортировки и фильтра; снимки присылает сборщик статистики"""
+
+    def __init__(self, stats, parent=None):
+        super().__init__(parent)
+        self.stats = stats
+        self.model = ConnectionsModel(self)
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setSortRole(Qt.ItemDataRole.UserRole)
+        self.proxy.setFilterKeyColumn(-1)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.proxy.setDynamicSortFilter(True)
+        self.busy = False
+        self.stats.connections_received.connect(self.on_snapshot)
+        # Ответ может не прийти вовсе: тогда следующий refresh запросит снимок заново
+        self.stats.disconnected.connect(self.on_request_failed)
+
+    def refresh(self):
+        # Пока предыдущий снимок не применён, новый не запрашиваем
+        if self.busy:
+            return
+        self.busy = True
+        self.stats.request_connections(self.on_snapshot, self.on_request_failed)
+
+    def on_snapshot(self, rows):
+        self.busy = False
+        self.model.apply_snapshot(rows)
+
+    def on_request_failed(self, _message=None):
+        self.busy = False
+
+    def set_auto_refresh(self, enabled):
+        # Демон присылает снимок раз в секунду, пока есть подписчики
+        if enabled:
+            self.stats.subscribe("connections")
+        else:
+            self.stats.unsubscribe("connections")
+
+    def set_filter(self, text):
+        self.proxy.setFilterFixedString(text)
+
+    def source_row(self, proxy_index):
+        return self.proxy.mapToSource(proxy_index).row()
+
+    def shutdown(self):
+        """Отписывается от снимков; вызывать при закрытии окна"""
+        self.set_auto_refresh(False)
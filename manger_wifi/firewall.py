@@ -0,0 +1,283 @@
+"""Брандмауэр: правила в виде объектов и сменные бэкенды ufw и nftables.
+
+Состояние читается одним вызовом и разбирается в Rule. Изменения бэкенд
+не выполняет сам, а возвращает команды для JobRunner: добавление пачки
+правил — одно задание. У nftables оно атомарно (весь набор — одна
+транзакция nft -f). ufw пачку сначала записывает только в свои файлы
+правил, а в ядро загружает их одной транзакцией iptables-restore на
+семейство адресов (IPv4 и IPv6 — по отдельности); при первой ошибке файлы
+восстанавливаются из копии.
+Модуль не зависит от Qt.
+"""
+import json
+import re
+import shutil
+import subprocess
+from collections import namedtuple
+
+# port и protocol пустые — любой; source пустой — откуда угодно
+Rule = namedtuple("Rule", "action direction port protocol source destination comment v6",
+                  defaults=("", "", "", "", "", False))
+
+FirewallState = namedtuple("FirewallState", "enabled rules")
+
+ACTIONS = ("allow", "deny", "reject", "limit")
+DIRECTIONS = ("in", "out")
+
+
+class FirewallError(Exception):
+    pass
+
+
+def parse_rule_spec(line):
+    """Правило из строки вида «allow in 22/tcp from 10.0.0.0/8 # ssh»"""
+    spec, _, comment = line.partition("#")
+    words = spec.split()
+    if not words or words[0].lower() not in ACTIONS:
+        raise FirewallError(f"Неизвестное действие: {line.strip()}")
+    action = words.pop(0).lower()
+    direction = words.pop(0).lower() if words and words[0].lower() in DIRECTIONS else "in"
+    port = protocol = source = ""
+    while words:
+        word = words.pop(0)
+        if word == "from" and words:
+            source = words.pop(0)
+            continue
+        match = re.fullmatch(r"([\d,:]+)(?:/(tcp|udp))?", word)
+        if match is None:
+            raise FirewallError(f"Не удалось разобрать «{word}»: {line.strip()}")
+        port, protocol = match.group(1), match.group(2) or ""
+    return Rule(action, direction, port, protocol, source, comment=comment.strip())
+
+
+class UfwBackend:
+    name = "ufw"
+    RULE_LINE = re.compile(
+        r"^(?P<to>.+?)\s+(?P<action>ALLOW|DENY|REJECT|LIMIT)(?:\s+(?P<direction>IN|OUT|FWD))?"
+        r"\s+(?P<source>.+?)(?:\s+#\s?(?P<comment>.*))?$")
+
+    # verbose даёт и статус, и правила — второй вызов ufw не нужен
+    read_command = ["ufw", "status", "verbose"]
+
+    def read(self):
+        result = subprocess.run(self.read_command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise FirewallError(result.stderr.strip() or result.stdout.strip())
+        return self.parse(result.stdout)
+
+    def parse(self, text):
+        lines = text.splitlines()
+        enabled = any(line.strip() == "Status: active" for line in lines)
+        rules = []
+        # Правила начинаются после строки «-- ------ ----» под заголовком
+        start = next((i + 1 for i, line in enumerate(lines) if line.startswith("--")), len(lines))
+        for line in lines[start:]:
+            match = self.RULE_LINE.match(line.strip())
+            if match is None:
+                continue
+            to, v6 = match.group("to"), False
+            if to.endswith(" (v6)"):
+                to, v6 = to[:-5], True
+            port = protocol = ""
+            words = to.split()
+            port_match = re.fullmatch(r"([\d,:]+)(?:/(tcp|udp))?", words[-1])
+            if port_match:
+                words.pop()
+                port, protocol = port_match.group(1), port_match.group(2) or ""
+            source = match.group("source").replace(" (v6)", "")
+            rules.append(Rule(
+                match.group("action").lower(), (match.group("direction") or "IN").lower(),
+                port, protocol, "" if source == "Anywhere" else source,
+                "" if words == ["Anywhere"] else " ".join(words),
+                (match.group("comment") or "").strip(), v6))
+        return FirewallState(enabled, rules)
+
+    def rule_command(self, rule):
+        command = ["ufw", rule.action, rule.direction]
+        if rule.protocol:
+            command += ["proto", rule.protocol]
+        command += ["from", rule.source or "any", "to", rule.destination or "any"]
+        if rule.port:
+            command += ["port", rule.port]
+        if rule.comment:
+            command += ["comment", rule.comment]
+        return command
+
+    def apply_commands(self, rules):
+        """Команды для JobRunner: все правила или ни одного"""
+        if len(rules) == 1:
+            return [self.rule_command(rules[0])]
+        # С ENABLED=no ufw только переписывает user.rules и user6.rules, ядро
+        # не трогает. Готовые файлы загружаются так же, как их перечитывает сам
+        # ufw: каждый одной транзакцией iptables-restore. При ошибке set -e
+        # завершит сценарий, и trap вернёт сохранённые файлы
+        setup = "\n".join([
+            'backup=$(mktemp -d)',
+            'cp -p /etc/ufw/user.rules /etc/ufw/user6.rules /etc/ufw/ufw.conf "$backup"/',
+            'loaded=""',
+            'load_user_rules() { if grep -q "^ENABLED=yes" /etc/ufw/ufw.conf; then '
+            'iptables-restore -n < /etc/ufw/user.rules; '
+            'if grep -q "^IPV6=yes" /etc/default/ufw; then ip6tables-restore -n < /etc/ufw/user6.rules; fi; '
+            'fi; }',
+            'restore() { status=$?; cp -p "$backup"/ufw.conf /etc/ufw/; if [ "$status" -ne 0 ]; then '
+            'cp -p "$backup"/user.rules "$backup"/user6.rules /etc/ufw/; '
+            'if [ -n "$loaded" ]; then load_user_rules; fi; fi; '
+            'rm -rf "$backup"; exit "$status"; }',
+            'trap restore EXIT',
+            # Иначе при прерывании ufw.conf так и остался бы с ENABLED=no
+            'trap "exit 1" HUP INT TERM',
+            "sed -i 's/^ENABLED=yes/ENABLED=no/' /etc/ufw/ufw.conf",
+        ])
+        load = "\n".join([
+            'cp -p "$backup"/ufw.conf /etc/ufw/',
+            'loaded=1',
+            'load_user_rules',
+        ])
+        return [setup] + [self.rule_command(rule) for rule in rules] + [load]
+
+
+class NftablesBackend:
+    """Свои правила держит в таблице inet aether; читает весь набор"""
+    name = "nftables"
+    TABLE = {"family": "inet", "name": "aether"}
+    HOOKS = {"input": "in", "output": "out"}
+    VERDICTS = {"accept": "allow", "drop": "deny", "reject": "reject"}
+
+    read_command = ["nft", "-j", "list", "ruleset"]
+
+    def read(self):
+        result = subprocess.run(self.read_command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise FirewallError(result.stderr.strip())
+        return self.parse(result.stdout)
+
+    def parse(self, text):
+        items = json.loads(text).get("nftables", [])
+        hooks = {}
+        for item in items:
+            chain = item.get("chain")
+            if chain is not None and chain.get("hook") in self.HOOKS:
+                hooks[chain["family"], chain["table"], chain["name"]] = self.HOOKS[chain["hook"]]
+        rules = []
+        for item in items:
+            rule = item.get("rule")
+            if rule is None:
+                continue
+            direction = hooks.get((rule["family"], rule["table"], rule["chain"]))
+            if direction is None:
+                continue
+            parsed = self.parse_expressions(rule.get("expr", []))
+            if parsed is not None:
+                action, port, protocol, source = parsed
+                rules.append(Rule(action, direction, port, protocol, source,
+                                  comment=rule.get("comment", ""), v6=rule["family"] == "ip6"))
+        return FirewallState(bool(hooks), rules)
+
+    def parse_expressions(self, expressions):
+        """(действие, порт, протокол, источник) или None для правил без вердикта"""
+        action = None
+        limited = False
+        port = protocol = source = ""
+        for expression in expressions:
+            limited = limited or "limit" in expression
+            for verdict, name in self.VERDICTS.items():
+                if verdict in expression:
+                    action = name
+            match = expression.get("match")
+            if match is None:
+                continue
+            left, right = match.get("left", {}), match.get("right")
+            payload = left.get("payload", {}) if isinstance(left, dict) else {}
+            if payload.get("field") == "dport":
+                if payload.get("protocol") in ("tcp", "udp"):
+                    protocol = payload["protocol"]
+                port = self.format_value(right)
+            elif payload.get("field") == "saddr":
+                source = self.format_value(right)
+            elif isinstance(left, dict) and left.get("meta", {}).get("key") == "l4proto":
+                protocol = self.format_value(right)
+        if action is None:
+            return None
+        if limited and action == "deny":
+            action = "limit"
+        return action, port, protocol, source
+
+    def format_value(self, value):
+        if isinstance(value, dict):
+            if "set" in value:
+                return ",".join(self.format_value(item) for item in value["set"])
+            if "range" in value:
+                return ":".join(self.format_value(item) for item in value["range"])
+            if "prefix" in value:
+                return f"{value['prefix']['addr']}/{value['prefix']['len']}"
+        return str(value)
+
+    def port_value(self, port):
+        values = []
+        for part in port.split(","):
+            if ":" in part:
+                low, high = part.split(":")
+                values.append({"range": [int(low), int(high)]})
+            else:
+                values.append(int(part))
+        return values[0] if len(values) == 1 else {"set": values}
+
+    def rule_object(self, rule):
+        expressions = []
+        if rule.source:
+            family = "ip6" if ":" in rule.source else "ip"
+            address, _, length = rule.source.partition("/")
+            right = {"prefix": {"addr": address, "len": int(length)}} if length else address
+            expressions.append({"match": {"op": "==", "left": {"payload": {
+                "protocol": family, "field": "saddr"}}, "right": right}})
+        if rule.port:
+            # Без протокола порт проверяется и для TCP, и для UDP
+            expressions.append({"match": {"op": "==", "left": {"payload": {
+                "protocol": rule.protocol or "th", "field": "dport"}}, "right": self.port_value(rule.port)}})
+        elif rule.protocol:
+            expressions.append({"match": {"op": "==", "left": {"meta": {"key": "l4proto"}},
+                                          "right": rule.protocol}})
+        if rule.action == "limit":
+            # Как в ufw: больше 6 попыток в минуту отбрасываются, остальное пропускает политика
+            expressions.append({"limit": {"rate": 6, "per": "minute", "inv": True}})
+        verdict = {"allow": "accept", "limit": "drop", "deny": "drop", "reject": "reject"}[rule.action]
+        expressions.append({verdict: None})
+        rule_object = {"family": "inet", "table": self.TABLE["name"],
+                       "chain": "input" if rule.direction == "in" else "output", "expr": expressions}
+        if rule.comment:
+            rule_object["comment"] = rule.comment
+        return {"add": {"rule": rule_object}}
+
+    def apply_commands(self, rules):
+        """Один документ nft -j -f: ядро применяет его целиком или не применяет вовсе"""
+        commands = [{"add": {"table": self.TABLE}}]
+        for name in ("input", "output"):
+            commands.append({"add": {"chain": {
+                "family": "inet", "table": self.TABLE["name"], "name": name,
+                "type": "filter", "hook": name, "prio": 0, "policy": "accept"}}})
+        commands.extend(self.rule_object(rule) for rule in rules)
+        document = json.dumps({"nftables": commands}, ensure_ascii=False)
+        return [f"nft -j -f - <<'AETHER_NFT'\n{document}\nAETHER_NFT"]
+
+
+def detect_backend():
+    """ufw, если установлен, иначе nftables; None — брандмауэра нет"""
+    if shutil.which("ufw"):
+        return UfwBackend()
+    if shutil.which("nft"):
+        return NftablesBackend()
+    return None
+
+
+def describe(rule):
+    """Текст для колонки «Описание»"""
+    parts = []
+    if rule.source:
+        parts.append(f"из {rule.source}")
+    if rule.destination:
+        parts.append(rule.destination)
+    if rule.v6:
+        parts.append("IPv6")
+    if rule.comment:
+        parts.append(rule.comment)
+    return ", ".join(parts)
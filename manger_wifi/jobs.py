@@ -0,0 +1,168 @@
+"""Асинхронное выполнение привилегированных команд через QProcess.
+
+Команды не блокируют окно: запрос пароля (pkexec) и медленный ufw идут в
+отдельном процессе, а результат приходит сигналом. Задания выполняются по
+очереди; подряд идущие задания с одним batch_key (например, правила ufw)
+сливаются в один вызов помощника — пароль спрашивается один раз.
+"""
+import shlex
+import shutil
+
+from PyQt6.QtCore import QObject, QProcess, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QListWidget, QListWidgetItem
+
+# Сколько ждать перед запуском пакетного задания, чтобы успели подъехать соседние, мс
+BATCH_WINDOW = 300
+# Маркер, который помощник печатает после каждой выполненной команды
+STEP_MARKER = "@@step"
+
+
+def privileged_prefix():
+    """pkexec показывает графический запрос; sudo -n не зависает без терминала"""
+    if shutil.which("pkexec"):
+        return ["pkexec"]
+    return ["sudo", "-n"]
+
+
+class Job:
+    PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+    def __init__(self, name, commands, batch_key=None, on_finished=None):
+        self.names = [name]
+        self.commands = list(commands)
+        self.batch_key = batch_key
+        self.callbacks = [on_finished] if on_finished else []
+        self.state = Job.PENDING
+        self.steps_done = 0
+        self.output = ""
+
+    @property
+    def name(self):
+        if len(self.names) == 1:
+            return self.names[0]
+        return f"{self.names[0]} и ещё {len(self.names) - 1}"
+
+    def merge(self, other):
+        self.names.extend(other.names)
+        self.commands.extend(other.commands)
+        # Одинаковый обработчик у слитых заданий вызывается один раз
+        self.callbacks.extend(c for c in other.callbacks if c not in self.callbacks)
+
+    def script(self):
+        """Скрипт для помощника: останавливается на первой ошибке.
+
+        Команда — список аргументов или готовый фрагмент сценария (строка).
+        """
+        lines = ["set -e"]
+        for command in self.commands:
+            if isinstance(command, str):
+                lines.append(command)
+            else:
+                lines.append(" ".join(shlex.quote(arg) for arg in command))
+            lines.append(f"echo {STEP_MARKER}")
+        return "\n".join(lines) + "\n"
+
+
+class JobRunner(QObject):
+    """Очередь привилегированных заданий"""
+    job_updated = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.queue = []
+        self.current = None
+        self.process = None
+
+        self.start_timer = QTimer(self)
+        self.start_timer.setSingleShot(True)
+        self.start_timer.timeout.connect(self.start_next)
+
+    def submit(self, name, commands, batch_key=None, on_finished=None):
+        job = Job(name, commands, batch_key, on_finished)
+        tail = self.queue[-1] if self.queue else None
+        if batch_key and tail is not None and tail.batch_key == batch_key:
+            tail.merge(job)
+            self.job_updated.emit(tail)
+            return tail
+        self.queue.append(job)
+        self.job_updated.emit(job)
+        if self.current is None and not self.start_timer.isActive():
+            self.start_timer.start(BATCH_WINDOW if batch_key else 0)
+        return job
+
+    def start_next(self):
+        if self.current is not None or not self.queue:
+            return
+        job = self.current = self.queue.pop(0)
+        job.state = Job.RUNNING
+        self.job_updated.emit(job)
+
+        self.process = QProcess(self)
+        self.process.setProcessChannelMode(QProcess.ProcessChannelMode.MergedChannels)
+        self.process.readyReadStandardOutput.connect(self.read_output)
+        self.process.finished.connect(self.on_finished)
+        self.process.errorOccurred.connect(self.on_error)
+        prefix = privileged_prefix()
+        self.process.start(prefix[0], prefix[1:] + ["/bin/sh", "-s"])
+        self.process.write(job.script().encode())
+        self.process.closeWriteChannel()
+
+    def read_output(self):
+        job = self.current
+        text = self.process.readAllStandardOutput().data().decode(errors="replace")
+        for line in text.splitlines(keepends=True):
+            if line.strip() == STEP_MARKER:
+                job.steps_done += 1
+            else:
+                job.output += line
+        self.job_updated.emit(job)
+
+    def on_error(self, error):
+        if error == QProcess.ProcessError.FailedToStart:
+            self.current.output += self.process.errorString()
+            self.finish(False)
+
+    def on_finished(self, exit_code, exit_status):
+        self.finish(exit_status == QProcess.ExitStatus.NormalExit and exit_code == 0)
+
+    def finish(self, ok):
+        job, self.current = self.current, None
+        if job is None:
+            return
+        job.state = Job.DONE if ok else Job.FAILED
+        self.process.deleteLater()
+        self.process = None
+        self.job_updated.emit(job)
+        for callback in job.callbacks:
+            callback(job)
+        if self.queue:
+            self.start_timer.start(0)
+
+
+class JobListWidget(QListWidget):
+    """Список заданий с ходом выполнения и результатом"""
+    ICONS = {Job.PENDING: "⏳", Job.RUNNING: "⚙", Job.DONE: "✔", Job.FAILED: "✖"}
+    MAX_ITEMS = 50
+
+    def __init__(self, runner, parent=None):
+        super().__init__(parent)
+        # Задание -> строка списка; порядок вставки совпадает с порядком строк снизу вверх
+        self.items = {}
+        runner.job_updated.connect(self.update_job)
+
+    def update_job(self, job):
+        item = self.items.get(job)
+        if item is None:
+            item = self.items[job] = QListWidgetItem()
+            self.insertItem(0, item)
+            while self.count() > self.MAX_ITEMS:
+                # Нижняя строка — самое старое задание, первое в словаре
+                self.takeItem(self.count() - 1)
+                del self.items[next(iter(self.items))]
+        text = f"{self.ICONS[job.state]} {job.name}"
+        if job.state == Job.RUNNING and len(job.commands) > 1:
+            text += f" ({job.steps_done}/{len(job.commands)})"
+        if job.state == Job.FAILED and job.output.strip():
+            text += f": {job.output.strip().splitlines()[-1]}"
+        item.setText(text)
+        item.setToolTip(job.output.strip())
@@ -0,0 +1,246 @@
+"""Сведения о сети напрямую из ядра: rtnetlink, /sys/class/net и /proc/net.
+
+Замена вызовам ip/nmcli/netstat: без запуска процессов и разбора их вывода.
+Модуль не зависит от Qt.
+"""
+import os
+import socket
+import struct
+import sys
+from collections import namedtuple
+
+# rtnetlink (linux/rtnetlink.h, linux/netlink.h)
+NETLINK_ROUTE = 0
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+IFLA_ADDRESS = 1
+IFLA_IFNAME = 3
+IFLA_OPERSTATE = 16
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFF_UP = 0x1
+IFF_LOOPBACK = 0x8
+
+NLMSGHDR = struct.Struct("=LHHLL")
+IFINFOMSG = struct.Struct("=BxHiII")
+IFADDRMSG = struct.Struct("=BBBBI")
+RTATTR = struct.Struct("=HH")
+
+OPERSTATES = ["unknown", "notpresent", "down", "lowerlayerdown", "testing", "dormant", "up"]
+
+# Состояния сокетов из /proc/net/tcp (include/net/tcp_states.h)
+TCP_STATES = {
+    "01": "ESTABLISHED", "02": "SYN_SENT", "03": "SYN_RECV", "04": "FIN_WAIT1",
+    "05": "FIN_WAIT2", "06": "TIME_WAIT", "07": "CLOSE", "08": "CLOSE_WAIT",
+    "09": "LAST_ACK", "0A": "LISTEN", "0B": "CLOSING", "0C": "NEW_SYN_RECV",
+}
+
+Interface = namedtuple("Interface", "index name state mac flags addresses")
+Address = namedtuple("Address", "index family address prefixlen")
+Socket = namedtuple("Socket", "proto local remote state uid inode")
+
+
+def _align(length):
+    return (length + 3) & ~3
+
+
+def parse_attrs(data, offset):
+    """Атрибуты rtattr сообщения: {тип: байты}"""
+    attrs = {}
+    while offset + RTATTR.size <= len(data):
+        length, kind = RTATTR.unpack_from(data, offset)
+        if length < RTATTR.size:
+            break
+        attrs[kind] = data[offset + RTATTR.size:offset + length]
+        offset += _align(length)
+    return attrs
+
+
+def parse_messages(data):
+    """Разбирает буфер netlink на (тип, тело сообщения)"""
+    offset = 0
+    while offset + NLMSGHDR.size <= len(data):
+        length, kind, _flags, _seq, _pid = NLMSGHDR.unpack_from(data, offset)
+        if length < NLMSGHDR.size:
+            break
+        yield kind, data[offset + NLMSGHDR.size:offset + length]
+        offset += _align(length)
+
+
+def parse_link(payload):
+    _family, _type, index, flags, _change = IFINFOMSG.unpack_from(payload)
+    attrs = parse_attrs(payload, IFINFOMSG.size)
+    name = attrs.get(IFLA_IFNAME, b"").rstrip(b"\0").decode(errors="replace")
+    mac = attrs.get(IFLA_ADDRESS, b"")
+    operstate = attrs.get(IFLA_OPERSTATE, b"\0")[0]
+    state = OPERSTATES[operstate] if operstate < len(OPERSTATES) else "unknown"
+    return Interface(index, name, state, ":".join(f"{b:02x}" for b in mac), flags, [])
+
+
+def parse_addr(payload):
+    family, prefixlen, _flags, _scope, index = IFADDRMSG.unpack_from(payload)
+    attrs = parse_attrs(payload, IFADDRMSG.size)
+    # Для point-to-point IFA_ADDRESS — адрес собеседника, свой адрес в IFA_LOCAL
+    raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+    if raw is None:
+        return None
+    return Address(index, family, socket.inet_ntop(family, raw), prefixlen)
+
+
+def netlink_dump(request_type, header):
+    """Запрашивает у ядра дамп таблицы и возвращает тела ответов"""
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE) as sock:
+        sock.bind((0, 0))
+        message = NLMSGHDR.pack(NLMSGHDR.size + len(header), request_type,
+                                NLM_F_REQUEST | NLM_F_DUMP, 1, 0) + header
+        sock.send(message)
+        payloads = []
+        while True:
+            data = sock.recv(65536)
+            for kind, payload in parse_messages(data):
+                if kind == NLMSG_DONE:
+                    return payloads
+                if kind == NLMSG_ERROR:
+                    error = -struct.unpack_from("=i", payload)[0]
+                    if error:
+                        raise OSError(error, os.strerror(error))
+                    continue
+                payloads.append((kind, payload))
+
+
+def _interfaces_netlink():
+    links = [parse_link(p) for kind, p in netlink_dump(RTM_GETLINK, IFINFOMSG.pack(0, 0, 0, 0, 0))
+             if kind == RTM_NEWLINK]
+    by_index = {link.index: link for link in links}
+    for kind, payload in netlink_dump(RTM_GETADDR, IFADDRMSG.pack(0, 0, 0, 0, 0)):
+        if kind != RTM_NEWADDR:
+            continue
+        address = parse_addr(payload)
+        if address is not None and address.index in by_index:
+            by_index[address.index].addresses.append(address)
+    return links
+
+
+def _read(path, default=""):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+def _interfaces_sysfs():
+    """Запасной путь без netlink: IPv4-адресов в /sys и /proc нет, только IPv6"""
+    links = {}
+    for name in sorted(os.listdir("/sys/class/net")):
+        base = os.path.join("/sys/class/net", name)
+        index = int(_read(os.path.join(base, "ifindex"), "0"))
+        links[index] = Interface(
+            index, name, _read(os.path.join(base, "operstate"), "unknown"),
+            _read(os.path.join(base, "address")), int(_read(os.path.join(base, "flags"), "0"), 16), []
+        )
+    try:
+        with open("/proc/net/if_inet6", "r") as f:
+            for line in f:
+                raw, index, prefixlen, _scope, _flags, _name = line.split()
+                if int(index, 16) in links:
+                    address = socket.inet_ntop(socket.AF_INET6, bytes.fromhex(raw))
+                    links[int(index, 16)].addresses.append(
+                        Address(int(index, 16), socket.AF_INET6, address, int(prefixlen, 16)))
+    except OSError:
+        pass
+    return list(links.values())
+
+
+def list_interfaces():
+    """Интерфейсы с состоянием, MAC и адресами"""
+    try:
+        return _interfaces_netlink()
+    except OSError:
+        return _interfaces_sysfs()
+
+
+def default_route_interfaces():
+    """Имена интерфейсов, через которые идёт маршрут по умолчанию"""
+    names = set()
+    try:
+        with open("/proc/net/route", "r") as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                if fields[1] == "00000000" and fields[7] == "00000000":
+                    names.add(fields[0])
+    except (OSError, StopIteration):
+        pass
+    try:
+        with open("/proc/net/ipv6_route", "r") as f:
+            for line in f:
+                fields = line.split()
+                if fields[0] == "0" * 32 and fields[1] == "00" and fields[9] != "lo":
+                    names.add(fields[9])
+    except OSError:
+        pass
+    return names
+
+
+def read_interface_counters(path="/proc/net/dev"):
+    """Счётчики байтов по интерфейсам: {имя: (rx, tx)}"""
+    counters = {}
+    with open(path, "r") as f:
+        lines = f.read().splitlines()[2:]
+    for line in lines:
+        name, _, values = line.partition(":")
+        fields = values.split()
+        counters[name.strip()] = (int(fields[0]), int(fields[8]))
+    return counters
+
+
+def _decode_address(raw):
+    host, port = raw.split(":")
+    data = bytes.fromhex(host)
+    # Ядро печатает адрес 32-битными словами в порядке байтов хоста;
+    # на big-endian слова уже идут в сетевом порядке
+    if sys.byteorder == "little":
+        data = b"".join(data[i:i + 4][::-1] for i in range(0, len(data), 4))
+    if len(data) == 4:
+        return f"{socket.inet_ntop(socket.AF_INET, data)}:{int(port, 16)}"
+    return f"[{socket.inet_ntop(socket.AF_INET6, data)}]:{int(port, 16)}"
+
+
+def read_socket_table(proto, path=None):
+    """Разбирает /proc/net/<proto>"""
+    sockets = []
+    try:
+        with open(path or f"/proc/net/{proto}", "r") as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                state = TCP_STATES.get(fields[3], fields[3])
+                if proto.startswith("udp"):
+                    # У UDP «состояние» — только признак connect()
+                    state = "ESTABLISHED" if state == "ESTABLISHED" else ""
+                sockets.append(Socket(proto, _decode_address(fields[1]), _decode_address(fields[2]),
+                                      state, int(fields[7]), int(fields[9])))
+    except (OSError, StopIteration):
+        pass
+    return sockets
+
+
+def list_sockets(protos=("tcp", "tcp6", "udp", "udp6")):
+    sockets = []
+    for proto in protos:
+        sockets.extend(read_socket_table(proto))
+    return sockets
+
+
+def format_address(address):
+    """Адрес с длиной префикса, как в выводе ip addr"""
+    return f"{address.address}/{address.prefixlen}"
@@ -0,0 +1,118 @@
+"""Изменения интерфейсов, адресов и маршрутов по netlink multicast — без опроса."""
+import errno
+import socket
+
+from PyQt6.QtCore import QObject, QSocketNotifier, QTimer, pyqtSignal
+
+import netinfo
+
+# Группы рассылки rtnetlink (linux/rtnetlink.h)
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+RTMGRP_IPV6_IFADDR = 0x100
+RTMGRP_IPV6_ROUTE = 0x400
+RTM_NEWROUTE = 24
+RTM_DELROUTE = 25
+
+GROUPS = RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR | RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_ROUTE
+RECEIVE_BUFFER = 1024 * 1024
+
+
+class NetlinkWatcher(QObject):
+    """Держит актуальный список интерфейсов, применяя события ядра.
+
+    Сокет читается через QSocketNotifier в цикле событий: пока ядро молчит,
+    наблюдатель ничего не стоит, а событие доходит до окна за миллисекунды.
+    Пачка событий (например, при поднятии интерфейса) даёт один сигнал.
+    Если netlink недоступен, работает только ручной resync().
+    """
+    interfaces_changed = pyqtSignal()
+    routes_changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.interfaces = {}
+        self.sock = None
+        self.notifier = None
+        self.pending = set()
+
+        self.emit_timer = QTimer(self)
+        self.emit_timer.setSingleShot(True)
+        self.emit_timer.setInterval(0)
+        self.emit_timer.timeout.connect(self.emit_pending)
+
+        try:
+            self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_NONBLOCK,
+                                      netinfo.NETLINK_ROUTE)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+            # Подписываемся до первого дампа, чтобы не пропустить изменения между ними
+            self.sock.bind((0, GROUPS))
+        except OSError:
+            self.sock = None
+        else:
+            self.notifier = QSocketNotifier(self.sock.fileno(), QSocketNotifier.Type.Read, self)
+            self.notifier.activated.connect(self.read_events)
+
+    def list(self):
+        return sorted(self.interfaces.values(), key=lambda interface: interface.index)
+
+    def resync(self):
+        """Полный дамп состояния — при запуске и после переполнения буфера"""
+        self.interfaces = {interface.index: interface for interface in netinfo.list_interfaces()}
+        self.schedule("interfaces")
+
+    def schedule(self, kind):
+        self.pending.add(kind)
+        self.emit_timer.start()
+
+    def emit_pending(self):
+        pending, self.pending = self.pending, set()
+        if "interfaces" in pending:
+            self.interfaces_changed.emit()
+        if "routes" in pending:
+            self.routes_changed.emit()
+
+    def read_events(self):
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    # Ядро отбросило события: восстанавливаем состояние дампом
+                    self.resync()
+                    continue
+                raise
+            for kind, payload in netinfo.parse_messages(data):
+                self.apply(kind, payload)
+
+    def apply(self, kind, payload):
+        if kind == netinfo.RTM_NEWLINK:
+            link = netinfo.parse_link(payload)
+            old = self.interfaces.get(link.index)
+            self.interfaces[link.index] = link._replace(addresses=old.addresses if old else [])
+            self.schedule("interfaces")
+        elif kind == netinfo.RTM_DELLINK:
+            self.interfaces.pop(netinfo.parse_link(payload).index, None)
+            self.schedule("interfaces")
+        elif kind in (netinfo.RTM_NEWADDR, netinfo.RTM_DELADDR):
+            address = netinfo.parse_addr(payload)
+            interface = self.interfaces.get(address.index) if address else None
+            if interface is None:
+                return
+            addresses = [a for a in interface.addresses
+                         if (a.family, a.address) != (address.family, address.address)]
+            if kind == netinfo.RTM_NEWADDR:
+                addresses.append(address)
+            self.interfaces[address.index] = interface._replace(addresses=addresses)
+            self.schedule("interfaces")
+        elif kind in (RTM_NEWROUTE, RTM_DELROUTE):
+            self.schedule("routes")
+
+    def close(self):
+        if self.sock is not None:
+            self.notifier.setEnabled(False)
+            self.sock.close()
+            self.sock = None
@@ -0,0 +1,221 @@
+"""Клиент NetworkManager по D-Bus (QtDBus): точки доступа Wi-Fi и подключение.
+
+Все вызовы асинхронные — ответ приходит в цикл событий, окно не ждёт.
+Список точек доступа поддерживается сигналами AccessPointAdded/Removed и
+PropertiesChanged: уровень сигнала обновляется без опроса и без nmcli.
+"""
+from collections import namedtuple
+
+from PyQt6.QtCore import QByteArray, QMetaType, QObject, QTimer, pyqtSignal, pyqtSlot
+from PyQt6.QtDBus import (
+    QDBusArgument, QDBusConnection, QDBusMessage, QDBusObjectPath, QDBusPendingCallWatcher,
+    QDBusPendingReply
+)
+
+NM_SERVICE = "org.freedesktop.NetworkManager"
+NM_PATH = "/org/freedesktop/NetworkManager"
+DEVICE_INTERFACE = NM_SERVICE + ".Device"
+WIRELESS_INTERFACE = NM_SERVICE + ".Device.Wireless"
+AP_INTERFACE = NM_SERVICE + ".AccessPoint"
+PROPERTIES_INTERFACE = "org.freedesktop.DBus.Properties"
+
+DEVICE_TYPE_WIFI = 2
+AP_FLAGS_PRIVACY = 0x1
+NO_OBJECT = "/"
+
+AccessPoint = namedtuple("AccessPoint", "path ssid bssid strength frequency secured")
+
+
+def object_path(value):
+    return value.path() if isinstance(value, QDBusObjectPath) else str(value)
+
+
+def ssid_text(value):
+    data = bytes(value) if isinstance(value, (QByteArray, bytes, bytearray)) else bytes(value or [])
+    return data.decode("utf-8", errors="replace")
+
+
+def connection_settings(access_point, password):
+    """Настройки нового подключения: a{sa{sv}}"""
+    settings = {
+        "connection": {"type": "802-11-wireless"},
+        "802-11-wireless": {"ssid": QByteArray(access_point.ssid.encode())},
+    }
+    if password:
+        settings["802-11-wireless-security"] = {"key-mgmt": "wpa-psk", "psk": password}
+    argument = QDBusArgument()
+    argument.beginMap(QMetaType(QMetaType.Type.QString.value), QMetaType(QMetaType.Type.QVariantMap.value))
+    for group, values in settings.items():
+        argument.beginMapEntry()
+        argument.add(group)
+        argument.add(values)
+        argument.endMapEntry()
+    argument.endMap()
+    return argument
+
+
+class NetworkManagerClient(QObject):
+    access_points_changed = pyqtSignal()
+    active_access_point_changed = pyqtSignal(str)
+    activation_finished = pyqtSignal(bool, str)
+    error = pyqtSignal(str)
+
+    def __init__(self, bus=None, parent=None):
+        super().__init__(parent)
+        self.bus = bus if bus is not None else QDBusConnection.systemBus()
+        self.device = None
+        self.access_points = {}
+        self.active_access_point = NO_OBJECT
+        self.watchers = set()
+
+        # Пачка изменений (например, после сканирования) даёт один сигнал
+        self.changed_timer = QTimer(self)
+        self.changed_timer.setSingleShot(True)
+        self.changed_timer.setInterval(0)
+        self.changed_timer.timeout.connect(self.access_points_changed)
+
+    def available(self):
+        return self.bus.isConnected()
+
+    def start(self):
+        """Ищет Wi-Fi устройство и подписывается на его сигналы"""
+        if not self.available():
+            self.error.emit("Нет соединения с системной шиной D-Bus")
+            return
+        # Пустой путь — сигналы всех объектов NetworkManager одной подпиской
+        self.bus.connect(NM_SERVICE, "", PROPERTIES_INTERFACE, "PropertiesChanged",
+                         self.on_properties_changed)
+        self.call(NM_PATH, NM_SERVICE, "GetDevices", on_reply=self.on_devices)
+
+    def call(self, path, interface, method, *args, on_reply=None, interactive=False):
+        message = QDBusMessage.createMethodCall(NM_SERVICE, path, interface, method)
+        message.setArguments(list(args))
+        # Разрешаем polkit спросить пароль администратора
+        message.setInteractiveAuthorizationAllowed(interactive)
+        watcher = QDBusPendingCallWatcher(self.bus.asyncCall(message), self)
+        self.watchers.add(watcher)
+        watcher.finished.connect(lambda w: self.on_reply(w, method, on_reply))
+
+    def on_reply(self, watcher, method, callback):
+        self.watchers.discard(watcher)
+        watcher.deleteLater()
+        reply = QDBusPendingReply(watcher).reply()
+        if reply.type() == QDBusMessage.MessageType.ErrorMessage:
+            self.on_call_failed(method, reply.errorMessage() or reply.errorName())
+            return
+        if callback is not None:
+            callback(*reply.arguments())
+
+    def on_call_failed(self, method, message):
+        if method in ("ActivateConnection", "AddAndActivateConnection"):
+            self.activation_finished.emit(False, message)
+        else:
+            self.error.emit(f"{method}: {message}")
+
+    def get_property(self, path, interface, name, on_reply):
+        self.call(path, PROPERTIES_INTERFACE, "Get", interface, name,
+                  on_reply=lambda value: on_reply(path, value))
+
+    # Устройства
+
+    def on_devices(self, devices):
+        for device in devices:
+            self.get_property(object_path(device), DEVICE_INTERFACE, "DeviceType", self.on_device_type)
+
+    def on_device_type(self, path, device_type):
+        if device_type != DEVICE_TYPE_WIFI or self.device is not None:
+            return
+        self.device = path
+        self.bus.connect(NM_SERVICE, path, WIRELESS_INTERFACE, "AccessPointAdded",
+                         self.on_access_point_added)
+        self.bus.connect(NM_SERVICE, path, WIRELESS_INTERFACE, "AccessPointRemoved",
+                         self.on_access_point_removed)
+        self.call(path, WIRELESS_INTERFACE, "GetAllAccessPoints", on_reply=self.on_access_points)
+        self.get_property(path, WIRELESS_INTERFACE, "ActiveAccessPoint", self.on_active_access_point)
+
+    def on_active_access_point(self, _path, value):
+        self.active_access_point = object_path(value)
+        self.active_access_point_changed.emit(self.active_access_point)
+
+    # Точки доступа
+
+    def on_access_points(self, paths):
+        for path in paths:
+            self.load_access_point(object_path(path))
+
+    def load_access_point(self, path):
+        self.call(path, PROPERTIES_INTERFACE, "GetAll", AP_INTERFACE,
+                  on_reply=lambda properties: self.update_access_point(path, properties))
+
+    def update_access_point(self, path, properties):
+        old = self.access_points.get(path)
+        if old is None and "Ssid" not in properties:
+            return
+        secured = old.secured if old else False
+        if "Flags" in properties or "WpaFlags" in properties or "RsnFlags" in properties:
+            secured = bool(properties.get("Flags", 0) & AP_FLAGS_PRIVACY
+                           or properties.get("WpaFlags", 0) or properties.get("RsnFlags", 0))
+        self.access_points[path] = AccessPoint(
+            path,
+            ssid_text(properties["Ssid"]) if "Ssid" in properties else old.ssid,
+            properties.get("HwAddress", old.bssid if old else ""),
+            properties.get("Strength", old.strength if old else 0),
+            properties.get("Frequency", old.frequency if old else 0),
+            secured,
+        )
+        self.changed_timer.start()
+
+    @pyqtSlot(QDBusMessage)
+    def on_access_point_added(self, message):
+        self.load_access_point(object_path(message.arguments()[0]))
+
+    @pyqtSlot(QDBusMessage)
+    def on_access_point_removed(self, message):
+        if self.access_points.pop(object_path(message.arguments()[0]), None) is not None:
+            self.changed_timer.start()
+
+    @pyqtSlot(QDBusMessage)
+    def on_properties_changed(self, message):
+        interface, changed = message.arguments()[:2]
+        path = message.path()
+        if interface == AP_INTERFACE and path in self.access_points:
+            self.update_access_point(path, changed)
+        elif interface == WIRELESS_INTERFACE and path == self.device and "ActiveAccessPoint" in changed:
+            self.on_active_access_point(path, changed["ActiveAccessPoint"])
+
+    def sorted_access_points(self):
+        """По убыванию сигнала; у одинаковых SSID — только сильнейшая точка"""
+        best = {}
+        for access_point in self.access_points.values():
+            current = best.get(access_point.ssid)
+            if current is None or access_point.strength > current.strength:
+                best[access_point.ssid] = access_point
+        return sorted(best.values(), key=lambda ap: (-ap.strength, ap.ssid))
+
+    # Действия
+
+    def request_scan(self):
+        if self.device is not None:
+            self.call(self.device, WIRELESS_INTERFACE, "RequestScan", {}, interactive=True)
+
+    def connect_access_point(self, access_point, password=None):
+        """Без пароля — сохранённое подключение, с паролем — новое"""
+        if self.device is None:
+            return
+        device = QDBusObjectPath(self.device)
+        specific = QDBusObjectPath(access_point.path)
+        done = lambda *reply: self.activation_finished.emit(True, access_point.ssid)
+        if password is None:
+            self.call(NM_PATH, NM_SERVICE, "ActivateConnection", QDBusObjectPath(NO_OBJECT),
+                      device, specific, on_reply=done, interactive=True)
+        else:
+            self.call(NM_PATH, NM_SERVICE, "AddAndActivateConnection",
+                      connection_settings(access_point, password), device, specific,
+                      on_reply=done, interactive=True)
+
+    def disconnect_device(self):
+        if self.device is not None:
+            self.call(self.device, DEVICE_INTERFACE, "Disconnect", interactive=True)
+
+    def set_networking_enabled(self, enabled, on_reply=None):
+        self.call(NM_PATH, NM_SERVICE, "Enable", enabled, on_reply=on_reply, interactive=True)
@@ -0,0 +1,123 @@
+"""Владельцы сокетов: inode -> процесс, с инкрементальным кэшем по /proc.
+
+Полный обход /proc/*/fd — самая дорогая часть списка подключений, поэтому
+ссылки каждого процесса перечитываются, только если изменилась подпись
+его каталога fd. Время изменения этого каталога procfs не обновляет, зато
+размер каталога равен числу открытых дескрипторов (Linux 6.2+), а inode
+меняется при повторном использовании PID. Если в снимке всё же есть
+неизвестный inode (закрыли один дескриптор и открыли другой), выполняется
+полный обход. Модуль не зависит от Qt.
+"""
+import os
+from collections import namedtuple
+
+ProcessInfo = namedtuple("ProcessInfo", "pid name cmdline")
+
+
+def _fd_signature(pid):
+    stat = os.stat(f"/proc/{pid}/fd")
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def socket_inodes(pid):
+    """inode всех сокетов процесса"""
+    fd_dir = f"/proc/{pid}/fd"
+    inodes = set()
+    for fd in os.listdir(fd_dir):
+        try:
+            target = os.readlink(f"{fd_dir}/{fd}")
+        except OSError:
+            continue
+        if target.startswith("socket:["):
+            inodes.add(int(target[8:-1]))
+    return inodes
+
+
+def read_process_info(pid):
+    try:
+        with open(f"/proc/{pid}/comm", "r") as f:
+            name = f.read().strip()
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            cmdline = f.read().rstrip(b"\0").replace(b"\0", b" ").decode(errors="replace")
+    except OSError:
+        return None
+    return ProcessInfo(pid, name, cmdline)
+
+
+def owns_socket(pid, inode):
+    """Проверка перед действием над процессом: сокет всё ещё его?"""
+    try:
+        return inode in socket_inodes(pid)
+    except OSError:
+        return False
+
+
+class SocketOwnerResolver:
+    """Не потокобезопасен: используется одним потоком"""
+
+    def __init__(self):
+        self.processes = {}   # PID -> (подпись каталога fd, inode сокетов)
+        self.owners = {}      # inode -> PID
+        self.info = {}        # PID -> ProcessInfo
+        self.unresolvable = set()
+
+    def scan(self, pid, signature):
+        try:
+            inodes = socket_inodes(pid)
+        except OSError:
+            # Чужой процесс без root: запоминаем пустым, чтобы не пробовать каждый раз
+            inodes = set()
+        self.forget_sockets(pid)
+        self.processes[pid] = (signature, inodes)
+        for inode in inodes:
+            self.owners[inode] = pid
+
+    def forget_sockets(self, pid):
+        entry = self.processes.pop(pid, None)
+        if entry is None:
+            return
+        for inode in entry[1]:
+            if self.owners.get(inode) == pid:
+                del self.owners[inode]
+
+    def drop(self, pid):
+        self.forget_sockets(pid)
+        self.info.pop(pid, None)
+
+    def refresh(self, force=False):
+        """Перечитывает новые процессы и те, чья подпись изменилась; вышедшие удаляет"""
+        pids = {int(name) for name in os.listdir("/proc") if name.isdigit()}
+        for pid in self.processes.keys() - pids:
+            self.drop(pid)
+        for pid in pids:
+            try:
+                signature = _fd_signature(pid)
+            except OSError:
+                # Процесс уже вышел
+                self.drop(pid)
+                continue
+            entry = self.processes.get(pid)
+            if force or entry is None or entry[0] != signature:
+                if entry is not None and entry[0][0] != signature[0]:
+                    # Другой inode каталога — PID занял новый процесс
+                    self.drop(pid)
+                self.scan(pid, signature)
+
+    def resolve(self, inodes):
+        """{inode: PID} для сокетов снимка"""
+        self.refresh()
+        unknown = {inode for inode in inodes if inode and inode not in self.owners}
+        if unknown - self.unresolvable:
+            self.refresh(force=True)
+            # Не найденные и после полного обхода — чужие сокеты; не ищем их каждый раз
+            self.unresolvable = {inode for inode in unknown if inode not in self.owners}
+        return {inode: self.owners[inode] for inode in inodes if inode in self.owners}
+
+    def process(self, pid):
+        """Имя и командная строка процесса, кэшируются до его выхода"""
+        info = self.info.get(pid)
+        if info is None:
+            info = read_process_info(pid)
+            if info is not None:
+                self.info[pid] = info
+        return info
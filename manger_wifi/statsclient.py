@@ -0,0 +1,189 @@
+"""Клиент сборщика статистики (statsd.py) для окна Network Manager.
+
+Окно само ничего не опрашивает: интерфейсы, замеры трафика и таблица
+сокетов приходят от демона, один экземпляр которого обслуживает все окна.
+Если демон не запущен, клиент запускает его сам (с --linger, чтобы тот
+вышел вслед за последним окном) и переподключается. Подписки
+восстанавливаются после переподключения.
+"""
+import json
+import os
+import sys
+
+from PyQt6.QtCore import QObject, QProcess, QTimer, pyqtSignal
+from PyQt6.QtNetwork import QLocalSocket
+
+import netinfo
+from statsd import daemon_socket_path
+
+DAEMON_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "statsd.py")
+# Сколько демон, запущенный окном, живёт без клиентов, с
+DAEMON_LINGER = 60
+RETRY_INTERVAL = 200
+MAX_RETRIES = 25
+
+
+class StatsClient(QObject):
+    """Интерфейс списка как у NetlinkWatcher: list(), resync(), interfaces_changed"""
+    interfaces_changed = pyqtSignal()
+    traffic_received = pyqtSignal(dict)
+    connections_received = pyqtSignal(list)
+    error = pyqtSignal(str)
+    # Соединение с демоном оборвалось; запросы без ответа уйдут после переподключения
+    disconnected = pyqtSignal()
+
+    def __init__(self, path=None, parent=None):
+        super().__init__(parent)
+        self.path = path or daemon_socket_path()
+        self.interfaces = []
+        self.uplinks = set()
+        self.topics = set()
+        # id -> (строка запроса, callback, errback): ещё без ответа, переотправляются после переподключения
+        self.pending = {}
+        self.next_id = 1
+        self.buffer = bytearray()
+        self.spawned = False
+        self.retries = 0
+
+        self.socket = QLocalSocket(self)
+        self.socket.connected.connect(self.on_connected)
+        self.socket.disconnected.connect(self.on_disconnected)
+        self.socket.errorOccurred.connect(self.on_error)
+        self.socket.readyRead.connect(self.read)
+
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.setInterval(RETRY_INTERVAL)
+        self.retry_timer.timeout.connect(self.start)
+
+    def start(self):
+        if self.socket.state() == QLocalSocket.LocalSocketState.UnconnectedState:
+            self.socket.connectToServer(self.path)
+
+    def is_connected(self):
+        return self.socket.state() == QLocalSocket.LocalSocketState.ConnectedState
+
+    def on_connected(self):
+        self.retries = 0
+        # Если демон потом упадёт, его можно будет запустить заново
+        self.spawned = False
+        self.buffer.clear()
+        queued = list(self.pending.values())
+        self.request("interfaces", callback=self.on_interfaces)
+        if self.topics:
+            self.request("subscribe", {"topics": sorted(self.topics)})
+        for data, _callback, _errback in queued:
+            self.socket.write(data)
+
+    def on_disconnected(self):
+        self.retry_timer.start()
+        self.disconnected.emit()
+
+    def on_error(self, error):
+        # Обрыв установленного соединения обрабатывает on_disconnected
+        if self.socket.state() != QLocalSocket.LocalSocketState.ConnectingState:
+            return
+        if error not in (QLocalSocket.LocalSocketError.ServerNotFoundError,
+                         QLocalSocket.LocalSocketError.ConnectionRefusedError):
+            self.error.emit(f"Сборщик статистики: {self.socket.errorString()}")
+            return
+        if not self.spawned:
+            self.spawn_daemon()
+        self.retries += 1
+        if self.retries > MAX_RETRIES:
+            self.error.emit(f"Не удалось подключиться к сборщику статистики: {self.path}")
+            return
+        self.retry_timer.start()
+
+    def spawn_daemon(self):
+        self.spawned = True
+        started = QProcess.startDetached(sys.executable, [
+            DAEMON_SCRIPT, "--socket", self.path, "--linger", str(DAEMON_LINGER)])
+        if not started[0]:
+            self.error.emit("Не удалось запустить сборщик статистики")
+
+    def close(self):
+        self.retry_timer.stop()
+        self.socket.disconnected.disconnect(self.on_disconnected)
+        self.socket.disconnectFromServer()
+
+    # Протокол
+
+    def request(self, method, params=None, callback=None, errback=None):
+        """Пока демон недоступен, запрос ждёт подключения; на ошибку вызывается errback"""
+        request_id = self.next_id
+        self.next_id += 1
+        message = {"id": request_id, "method": method}
+        if params:
+            message["params"] = params
+        data = json.dumps(message).encode() + b"\n"
+        self.pending[request_id] = (data, callback, errback)
+        if self.is_connected():
+            self.socket.write(data)
+
+    def read(self):
+        self.buffer.extend(self.socket.readAll().data())
+        end = self.buffer.rfind(b"\n")
+        if end < 0:
+            return
+        lines = bytes(self.buffer[:end]).split(b"\n")
+        del self.buffer[:end + 1]
+        for line in lines:
+            if line:
+                self.dispatch(json.loads(line))
+
+    def dispatch(self, message):
+        if "event" in message:
+            handler = getattr(self, f"on_{message['event']}_event", None)
+            if handler is not None:
+                handler(message["data"])
+            return
+        _data, callback, errback = self.pending.pop(message.get("id"), (None, None, None))
+        if "error" in message:
+            if errback is not None:
+                errback(message["error"])
+            self.error.emit(message["error"])
+        elif callback is not None:
+            callback(message["result"])
+
+    def subscribe(self, topic):
+        self.topics.add(topic)
+        self.request("subscribe", {"topics": [topic]})
+
+    def unsubscribe(self, topic):
+        self.topics.discard(topic)
+        self.request("unsubscribe", {"topics": [topic]})
+
+    # Интерфейсы
+
+    def list(self):
+        return self.interfaces
+
+    def resync(self):
+        self.start()
+        self.request("resync", callback=self.on_interfaces)
+
+    def on_interfaces(self, state):
+        self.interfaces = [netinfo.Interface(*item[:5], [netinfo.Address(*address) for address in item[5]])
+                           for item in state["interfaces"]]
+        self.uplinks = set(state["uplinks"])
+        self.interfaces_changed.emit()
+
+    on_interfaces_event = on_interfaces
+
+    # Трафик и подключения
+
+    def on_traffic_event(self, sample):
+        sample["counters"] = {name: tuple(values) for name, values in sample["counters"].items()}
+        self.traffic_received.emit(sample)
+
+    def request_connections(self, callback, errback=None):
+        self.request("connections", callback=lambda rows: callback(self.connection_rows(rows)),
+                     errback=errback)
+
+    def connection_rows(self, rows):
+        # Ключи модели — кортежи, JSON же отдаёт списки
+        return [(tuple(key), tuple(values)) for key, values in rows]
+
+    def on_connections_event(self, rows):
+        self.connections_received.emit(self.connection_rows(rows))
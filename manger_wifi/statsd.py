@@ -0,0 +1,292 @@
+"""Сборщик сетевой статистики без окна: один на пользователя, сколько угодно зрителей.
+
+Процесс раз в секунду снимает счётчики /proc/net/dev и ведёт учёт трафика,
+держит список интерфейсов по событиям netlink и по запросу собирает таблицу
+сокетов с владельцами. Окна (и любые другие клиенты) подключаются к
+Unix-сокету и говорят построчным JSON:
+
+    → {"id": 1, "method": "interfaces"}
+    ← {"id": 1, "result": {"interfaces": [...], "uplinks": [...]}}
+    → {"id": 2, "method": "subscribe", "params": {"topics": ["traffic"]}}
+    ← {"event": "traffic", "data": {"time": ..., "counters": {...}, ...}}
+
+Методы: interfaces, resync, traffic, connections, usage, subscribe,
+unsubscribe. Темы подписки: traffic (каждый замер), interfaces (при
+изменениях), connections (снимок раз в секунду, пока есть подписчики).
+Работает на QtCore, поэтому запускается и на машинах без дисплея:
+
+    python statsd.py [--socket ПУТЬ] [--linger СЕКУНДЫ]
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.applog import setup_logging
+from common.single_instance import is_alive, socket_path
+
+from PyQt6.QtCore import QCoreApplication, QObject, QThread, QTimer, pyqtSignal
+from PyQt6.QtNetwork import QLocalServer
+
+import netinfo
+from accounting import TrafficAccounting
+from connections import AUTO_REFRESH_INTERVAL, SnapshotWorker
+from netwatch import NetlinkWatcher
+
+APP_ID = "wifi-manager-statsd"
+SAMPLE_INTERVAL = 1000
+TOPICS = ("traffic", "interfaces", "connections")
+# Клиент, не забирающий данные, отключается, а не копит их в памяти демона
+MAX_BACKLOG = 16 * 1024 * 1024
+
+
+def daemon_socket_path():
+    """Общий для демона и клиентов путь; NUROS_STATSD_SOCKET — для системного демона"""
+    return os.environ.get("NUROS_STATSD_SOCKET") or socket_path(APP_ID)
+
+
+def encode(message):
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+
+class StatsClientConnection:
+    """Состояние одного клиента: буфер чтения и подписки"""
+
+    def __init__(self, socket):
+        self.socket = socket
+        self.buffer = bytearray()
+        self.topics = set()
+
+
+class StatsServer(QObject):
+    _snapshot_requested = pyqtSignal()
+
+    def __init__(self, path, linger=None, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.linger = linger
+        self.clients = {}
+        self.last_sample = None
+        self.snapshot_waiters = []
+        self.snapshot_busy = False
+
+        self.accounting = TrafficAccounting()
+        self.watcher = NetlinkWatcher(self)
+        self.watcher.interfaces_changed.connect(self.publish_interfaces)
+        self.watcher.routes_changed.connect(self.publish_interfaces)
+
+        # Таблица сокетов собирается в рабочем потоке: замеры трафика не ждут её
+        self.thread = QThread()
+        self.worker = SnapshotWorker()
+        self.worker.moveToThread(self.thread)
+        self._snapshot_requested.connect(self.worker.snapshot)
+        self.worker.snapshot_ready.connect(self.on_snapshot)
+
+        self.sample_timer = QTimer(self)
+        self.sample_timer.setInterval(SAMPLE_INTERVAL)
+        self.sample_timer.timeout.connect(self.sample)
+        self.connections_timer = QTimer(self)
+        self.connections_timer.setInterval(AUTO_REFRESH_INTERVAL)
+        self.connections_timer.timeout.connect(self.request_snapshot)
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.timeout.connect(QCoreApplication.quit)
+
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+
+    def listen(self):
+        """False — на сокете уже работает другой сборщик"""
+        # С UserAccessOption listen() молча подменяет чужой сокет, поэтому проверяем заранее
+        if is_alive(self.path):
+            return False
+        if not self.server.listen(self.path):
+            QLocalServer.removeServer(self.path)
+            if not self.server.listen(self.path):
+                raise OSError(self.server.errorString())
+        self.server.newConnection.connect(self.accept)
+        self.watcher.resync()
+        self.sample()
+        self.sample_timer.start()
+        self.update_idle()
+        return True
+
+    def shutdown(self):
+        self.sample_timer.stop()
+        self.connections_timer.stop()
+        self.server.close()
+        self.thread.quit()
+        self.thread.wait()
+        self.watcher.close()
+        self.accounting.close()
+
+    # Клиенты
+
+    def accept(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            client = StatsClientConnection(socket)
+            self.clients[socket] = client
+            socket.readyRead.connect(lambda client=client: self.read(client))
+            socket.disconnected.connect(lambda client=client: self.drop(client))
+        self.update_idle()
+
+    def drop(self, client):
+        if self.clients.pop(client.socket, None) is None:
+            return
+        client.socket.deleteLater()
+        self.update_connections_timer()
+        self.update_idle()
+
+    def update_idle(self):
+        # Запущенный окном сборщик выходит, когда зрителей не осталось
+        if self.linger is None:
+            return
+        if self.clients:
+            self.idle_timer.stop()
+        elif not self.idle_timer.isActive():
+            self.idle_timer.start(int(self.linger * 1000))
+
+    def read(self, client):
+        client.buffer.extend(client.socket.readAll().data())
+        while True:
+            end = client.buffer.find(b"\n")
+            if end < 0:
+                return
+            line = bytes(client.buffer[:end])
+            del client.buffer[:end + 1]
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                self.handle(client, request.get("id"), request["method"], request.get("params") or {})
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                self.send(client, {"id": None, "error": f"Неверный запрос: {e}"})
+
+    def send(self, client, message):
+        self.write(client, encode(message))
+
+    def write(self, client, data):
+        if client.socket not in self.clients:
+            return
+        if client.socket.bytesToWrite() > MAX_BACKLOG:
+            client.socket.abort()
+            self.drop(client)
+            return
+        client.socket.write(data)
+
+    def reply(self, client, request_id, result):
+        self.send(client, {"id": request_id, "result": result})
+
+    def publish(self, topic, data):
+        clients = [client for client in self.clients.values() if topic in client.topics]
+        if not clients:
+            return
+        # Кодируем один раз для всех подписчиков
+        message = encode({"event": topic, "data": data})
+        for client in clients:
+            self.write(client, message)
+
+    def subscribers(self, topic):
+        return any(topic in client.topics for client in self.clients.values())
+
+    # Запросы
+
+    def handle(self, client, request_id, method, params):
+        if method in ("interfaces", "resync"):
+            if method == "resync":
+                self.watcher.resync()
+            self.reply(client, request_id, self.interfaces_state())
+        elif method == "traffic":
+            self.reply(client, request_id, self.last_sample)
+        elif method == "connections":
+            self.snapshot_waiters.append((client, request_id))
+            self.request_snapshot()
+        elif method == "usage":
+            rows = self.accounting.usage(int(params["resolution"]), params.get("start", 0), params.get("end"))
+            self.reply(client, request_id, rows)
+        elif method in ("subscribe", "unsubscribe"):
+            topics = set(params.get("topics", [])) & set(TOPICS)
+            if method == "subscribe":
+                client.topics |= topics
+            else:
+                client.topics -= topics
+            self.update_connections_timer()
+            self.reply(client, request_id, sorted(client.topics))
+        else:
+            self.send(client, {"id": request_id, "error": f"Неизвестный метод: {method}"})
+
+    def interfaces_state(self):
+        return {"interfaces": self.watcher.list(), "uplinks": sorted(netinfo.default_route_interfaces())}
+
+    def publish_interfaces(self):
+        if self.subscribers("interfaces"):
+            self.publish("interfaces", self.interfaces_state())
+
+    # Трафик
+
+    def sample(self):
+        counters = netinfo.read_interface_counters()
+        self.accounting.record(counters)
+        self.last_sample = {"time": time.monotonic(), "counters": counters}
+        if self.subscribers("traffic"):
+            # Итоги из SQLite нужны только зрителям
+            self.last_sample["today"] = self.accounting.today()
+            self.last_sample["month"] = self.accounting.this_month()
+            self.publish("traffic", self.last_sample)
+
+    # Подключения
+
+    def update_connections_timer(self):
+        if self.subscribers("connections"):
+            if not self.connections_timer.isActive():
+                self.connections_timer.start()
+                self.request_snapshot()
+        else:
+            self.connections_timer.stop()
+
+    def request_snapshot(self):
+        # Один снимок на всех: и подписчиков, и ждущих ответа на запрос
+        if self.snapshot_busy:
+            return
+        if not self.thread.isRunning():
+            self.thread.start()
+        self.snapshot_busy = True
+        self._snapshot_requested.emit()
+
+    def on_snapshot(self, rows):
+        self.snapshot_busy = False
+        waiters, self.snapshot_waiters = self.snapshot_waiters, []
+        for client, request_id in waiters:
+            self.reply(client, request_id, rows)
+        self.publish("connections", rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сборщик сетевой статистики для Network Manager")
+    parser.add_argument("--socket", default=daemon_socket_path(), help="путь к Unix-сокету")
+    parser.add_argument("--linger", type=float, default=None,
+                        help="выйти через столько секунд после отключения последнего клиента")
+    args = parser.parse_args()
+
+    setup_logging("wifi-statsd")
+    app = QCoreApplication(sys.argv)
+    server = StatsServer(args.socket, args.linger)
+    if not server.listen():
+        print(f"Сборщик уже запущен: {args.socket}", file=sys.stderr)
+        return 1
+    # Обработчики Python выполняются между событиями; таймер замеров будит цикл каждую секунду
+    signal.signal(signal.SIGTERM, lambda *args: app.quit())
+    signal.signal(signal.SIGINT, lambda *args: app.quit())
+    try:
+        app.exec()
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
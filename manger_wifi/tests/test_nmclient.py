@@ -0,0 +1,356 @@
+"""NetworkManagerClient против поддельного NetworkManager на частной шине.
+
+Шину поднимает dbus-run-session, поддельный сервис живёт в том же процессе
+на отдельном соединении. Запуск:
+
+    python -m unittest discover -s manger_wifi/tests
+"""
+import os
+import shutil
+import subprocess
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtCore import (QByteArray, QCoreApplication, QEvent, QEventLoop, QLoggingCategory, QMetaType,
+                          QObject, pyqtClassInfo, pyqtSlot)
+from PyQt6.QtDBus import (QDBusAbstractAdaptor, QDBusArgument, QDBusConnection, QDBusMessage,
+                          QDBusObjectPath, QDBusVariant)
+
+from nmclient import (AP_INTERFACE, DEVICE_INTERFACE, NM_PATH, NM_SERVICE, NO_OBJECT,
+                      PROPERTIES_INTERFACE, WIRELESS_INTERFACE, AccessPoint, NetworkManagerClient)
+
+# Держит шину dbus-run-session, пока открыт stdin
+BUS_HOLDER = "import os, sys; print(os.environ['DBUS_SESSION_BUS_ADDRESS'], flush=True); sys.stdin.read()"
+WAIT_TIMEOUT = 3.0
+
+ETHERNET = NM_PATH + "/Devices/1"
+WIFI = NM_PATH + "/Devices/2"
+HOME = NM_PATH + "/AccessPoint/1"
+CAFE = NM_PATH + "/AccessPoint/2"
+OFFICE = NM_PATH + "/AccessPoint/3"
+
+
+def access_point_properties(ssid, strength, secured):
+    return {"Ssid": QByteArray(ssid.encode()), "HwAddress": "00:11:22:33:44:55",
+            "Strength": strength, "Frequency": 2412, "Flags": 1 if secured else 0,
+            "WpaFlags": 0, "RsnFlags": 0x188 if secured else 0}
+
+
+def object_paths(paths):
+    """Массив ao, как в ответах NetworkManager"""
+    argument = QDBusArgument()
+    argument.beginArray(QMetaType.fromName(b"QDBusObjectPath"))
+    for path in paths:
+        argument.add(QDBusObjectPath(path))
+    argument.endArray()
+    return argument
+
+
+def no_strings():
+    argument = QDBusArgument()
+    argument.beginArray(QMetaType(QMetaType.Type.QString.value))
+    argument.endArray()
+    return argument
+
+
+class MockObject(QObject):
+    def __init__(self, mock, path):
+        super().__init__()
+        self.mock = mock
+        self.path = path
+
+
+@pyqtClassInfo("D-Bus Interface", PROPERTIES_INTERFACE)
+class PropertiesAdaptor(QDBusAbstractAdaptor):
+    @pyqtSlot(str, str, QDBusMessage)
+    def Get(self, interface, name, message):
+        values = self.parent().mock.properties[self.parent().path].get(interface, {})
+        self.parent().mock.respond(message, QDBusVariant(values.get(name)))
+
+    @pyqtSlot(str, QDBusMessage)
+    def GetAll(self, interface, message):
+        self.parent().mock.respond(message, self.parent().mock.properties[self.parent().path].get(interface, {}))
+
+
+@pyqtClassInfo("D-Bus Interface", NM_SERVICE)
+class ManagerAdaptor(QDBusAbstractAdaptor):
+    @pyqtSlot(QDBusMessage)
+    def GetDevices(self, message):
+        self.parent().mock.respond(message, object_paths(self.parent().mock.devices))
+
+    @pyqtSlot(QDBusObjectPath, QDBusObjectPath, QDBusObjectPath, QDBusMessage)
+    def ActivateConnection(self, _connection, _device, _specific, message):
+        self.parent().mock.respond(message, QDBusObjectPath(NM_PATH + "/ActiveConnection/1"))
+
+    # a{sa{sv}} не раскладывается по аргументам слота: разбираем сообщение целиком
+    @pyqtSlot(QDBusMessage)
+    def AddAndActivateConnection(self, message):
+        self.parent().mock.respond(message, QDBusObjectPath(NM_PATH + "/Settings/1"),
+                                   QDBusObjectPath(NM_PATH + "/ActiveConnection/1"))
+
+    @pyqtSlot(bool, QDBusMessage)
+    def Enable(self, _enabled, message):
+        self.parent().mock.respond(message)
+
+
+@pyqtClassInfo("D-Bus Interface", DEVICE_INTERFACE)
+class DeviceAdaptor(QDBusAbstractAdaptor):
+    @pyqtSlot(QDBusMessage)
+    def Disconnect(self, message):
+        self.parent().mock.respond(message)
+
+
+@pyqtClassInfo("D-Bus Interface", WIRELESS_INTERFACE)
+class WirelessAdaptor(QDBusAbstractAdaptor):
+    @pyqtSlot(QDBusMessage)
+    def GetAllAccessPoints(self, message):
+        self.parent().mock.respond(message, object_paths(self.parent().mock.access_points))
+
+    @pyqtSlot("QVariantMap", QDBusMessage)
+    def RequestScan(self, _options, message):
+        self.parent().mock.respond(message)
+
+
+class MockNetworkManager:
+    """Проводное и Wi-Fi устройства, точки доступа; записывает вызовы методов"""
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.objects = {}
+        # Путь -> интерфейс -> свойства
+        self.properties = {}
+        self.devices = []
+        self.access_points = []
+        # Метод -> (имя ошибки, текст): вызов получит ответ-ошибку
+        self.failures = {}
+        # (путь, метод, аргументы) в порядке поступления
+        self.calls = []
+
+        self.add_object(NM_PATH, ManagerAdaptor)
+        for path, device_type in ((ETHERNET, 1), (WIFI, 2)):
+            self.add_object(path, DeviceAdaptor, WirelessAdaptor)
+            self.properties[path] = {DEVICE_INTERFACE: {"DeviceType": device_type}}
+            self.devices.append(path)
+        self.properties[WIFI][WIRELESS_INTERFACE] = {"ActiveAccessPoint": QDBusObjectPath(HOME)}
+        self.add_access_point(HOME, access_point_properties("home", 70, True), announce=False)
+        self.add_access_point(CAFE, access_point_properties("cafe", 40, False), announce=False)
+        self.bus.registerService(NM_SERVICE)
+
+    def close(self):
+        self.bus.unregisterService(NM_SERVICE)
+        for path in list(self.objects):
+            self.bus.unregisterObject(path)
+        # Объекты ссылаются на mock: без этого их удалил бы сборщик мусора уже после отключения от шины
+        self.objects.clear()
+
+    def add_object(self, path, *adaptors):
+        obj = MockObject(self, path)
+        PropertiesAdaptor(obj)
+        for adaptor in adaptors:
+            adaptor(obj)
+        self.objects[path] = obj
+        self.properties.setdefault(path, {})
+        self.bus.registerObject(path, obj, QDBusConnection.RegisterOption.ExportAdaptors)
+
+    def add_access_point(self, path, properties, announce=True):
+        self.add_object(path)
+        self.properties[path][AP_INTERFACE] = properties
+        self.access_points.append(path)
+        if announce:
+            self.emit(WIFI, WIRELESS_INTERFACE, "AccessPointAdded", QDBusObjectPath(path))
+
+    def remove_access_point(self, path):
+        self.access_points.remove(path)
+        self.bus.unregisterObject(path)
+        del self.objects[path]
+        self.emit(WIFI, WIRELESS_INTERFACE, "AccessPointRemoved", QDBusObjectPath(path))
+
+    def change_properties(self, path, interface, changed):
+        self.properties[path][interface].update(changed)
+        self.emit(path, PROPERTIES_INTERFACE, "PropertiesChanged", interface, changed, no_strings())
+
+    def emit(self, path, interface, name, *arguments):
+        signal = QDBusMessage.createSignal(path, interface, name)
+        signal.setArguments(list(arguments))
+        self.bus.send(signal)
+
+    def respond(self, message, *arguments):
+        self.calls.append((message.path(), message.member(), message.arguments()))
+        message.setDelayedReply(True)
+        failure = self.failures.get(message.member())
+        if failure is not None:
+            self.bus.send(message.createErrorReply(*failure))
+        else:
+            self.bus.send(message.createReply(list(arguments)))
+
+    def called(self, member):
+        return [(path, arguments) for path, called, arguments in self.calls if called == member]
+
+
+bus_process = None
+app = None
+
+
+def setUpModule():
+    global bus_process, app
+    if shutil.which("dbus-run-session") is None:
+        raise unittest.SkipTest("нет dbus-run-session")
+    bus_process = subprocess.Popen(
+        ["dbus-run-session", "--", sys.executable, "-c", BUS_HOLDER],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    address = bus_process.stdout.readline().strip()
+    if not address:
+        bus_process.wait()
+        raise unittest.SkipTest("dbus-run-session не поднял шину")
+    app = QCoreApplication.instance() or QCoreApplication([])
+    # QtDBus предупреждает о слоте AddAndActivateConnection, прежде чем отдать ему сообщение
+    QLoggingCategory.setFilterRules("qt.dbus.integration.warning=false")
+    for name in ("nm-mock", "nm-client"):
+        QDBusConnection.connectToBus(address, name)
+
+
+def tearDownModule():
+    for name in ("nm-mock", "nm-client"):
+        QDBusConnection.disconnectFromBus(name)
+    if bus_process is not None:
+        bus_process.stdin.close()
+        bus_process.wait(timeout=10)
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        app.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 50)
+        time.sleep(0.005)
+    return True
+
+
+class NetworkManagerClientTest(unittest.TestCase):
+    def setUp(self):
+        self.mock = MockNetworkManager(QDBusConnection("nm-mock"))
+        self.client = NetworkManagerClient(bus=QDBusConnection("nm-client"))
+        self.changes = 0
+        self.activations = []
+        self.errors = []
+        self.client.access_points_changed.connect(self.count_change)
+        self.client.activation_finished.connect(lambda ok, message: self.activations.append((ok, message)))
+        self.client.error.connect(self.errors.append)
+
+    def tearDown(self):
+        self.mock.close()
+        self.client.deleteLater()
+        app.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+
+    def count_change(self):
+        self.changes += 1
+
+    def start(self):
+        self.client.start()
+        self.assertTrue(wait_until(lambda: len(self.client.access_points) == 2
+                                   and self.client.active_access_point != NO_OBJECT))
+
+    def test_loads_wifi_device_and_access_points(self):
+        self.start()
+        self.assertEqual(self.client.device, WIFI)
+        self.assertEqual(self.client.active_access_point, HOME)
+        self.assertEqual(self.client.access_points[HOME],
+                         AccessPoint(HOME, "home", "00:11:22:33:44:55", 70, 2412, True))
+        self.assertFalse(self.client.access_points[CAFE].secured)
+        self.assertEqual([ap.ssid for ap in self.client.sorted_access_points()], ["home", "cafe"])
+        # Проводное устройство спрошено о типе, но точки доступа — только у Wi-Fi
+        self.assertEqual([path for path, _ in self.mock.called("GetAllAccessPoints")], [WIFI])
+        self.assertEqual(self.errors, [])
+
+    def test_access_point_added(self):
+        self.start()
+        self.mock.add_access_point(OFFICE, access_point_properties("office", 90, True))
+        self.assertTrue(wait_until(lambda: OFFICE in self.client.access_points))
+        self.assertEqual(self.client.access_points[OFFICE].ssid, "office")
+        self.assertEqual(self.client.sorted_access_points()[0].path, OFFICE)
+
+    def test_access_point_removed(self):
+        self.start()
+        self.assertTrue(wait_until(lambda: self.changes > 0))
+        changes = self.changes
+        self.mock.remove_access_point(CAFE)
+        self.assertTrue(wait_until(lambda: CAFE not in self.client.access_points))
+        self.assertTrue(wait_until(lambda: self.changes > changes))
+        self.assertEqual(list(self.client.access_points), [HOME])
+
+    def test_strength_from_properties_changed(self):
+        self.start()
+        self.mock.change_properties(CAFE, AP_INTERFACE, {"Strength": 95})
+        self.assertTrue(wait_until(lambda: self.client.access_points[CAFE].strength == 95))
+        # Остальные поля остаются от GetAll
+        self.assertEqual(self.client.access_points[CAFE].ssid, "cafe")
+        self.assertEqual(self.client.sorted_access_points()[0].path, CAFE)
+
+    def test_active_access_point_from_properties_changed(self):
+        self.start()
+        active = []
+        self.client.active_access_point_changed.connect(active.append)
+        self.mock.change_properties(WIFI, WIRELESS_INTERFACE, {"ActiveAccessPoint": QDBusObjectPath(CAFE)})
+        self.assertTrue(wait_until(lambda: active == [CAFE]))
+        self.assertEqual(self.client.active_access_point, CAFE)
+
+    def test_connect_saved_connection(self):
+        self.start()
+        self.client.connect_access_point(self.client.access_points[HOME])
+        self.assertTrue(wait_until(lambda: self.activations))
+        self.assertEqual(self.activations, [(True, "home")])
+        ((path, arguments),) = self.mock.called("ActivateConnection")
+        self.assertEqual(path, NM_PATH)
+        self.assertEqual(arguments, [NO_OBJECT, WIFI, HOME])
+
+    def test_connect_with_password(self):
+        self.start()
+        self.client.connect_access_point(self.client.access_points[HOME], "secret")
+        self.assertTrue(wait_until(lambda: self.activations))
+        self.assertEqual(self.activations, [(True, "home")])
+        ((_path, (settings, device, specific)),) = self.mock.called("AddAndActivateConnection")
+        self.assertEqual(bytes(settings["802-11-wireless"]["ssid"]), b"home")
+        self.assertEqual(settings["802-11-wireless-security"],
+                         {"key-mgmt": "wpa-psk", "psk": "secret"})
+        self.assertEqual((device, specific), (WIFI, HOME))
+
+    def test_connect_error_reply(self):
+        self.start()
+        self.mock.failures["ActivateConnection"] = (
+            "org.freedesktop.NetworkManager.UnknownConnection", "No suitable connection found")
+        self.client.connect_access_point(self.client.access_points[CAFE])
+        self.assertTrue(wait_until(lambda: self.activations))
+        self.assertEqual(self.activations, [(False, "No suitable connection found")])
+        self.assertEqual(self.errors, [])
+
+    def test_disconnect(self):
+        self.start()
+        self.client.disconnect_device()
+        self.assertTrue(wait_until(lambda: self.mock.called("Disconnect")))
+        self.assertEqual(self.mock.called("Disconnect"), [(WIFI, [])])
+        app.processEvents()
+        self.assertEqual(self.errors, [])
+
+    def test_disconnect_error_reply(self):
+        self.start()
+        self.mock.failures["Disconnect"] = (
+            "org.freedesktop.NetworkManager.Device.NotActive", "This device is not active")
+        self.client.disconnect_device()
+        self.assertTrue(wait_until(lambda: self.errors))
+        self.assertEqual(self.errors, ["Disconnect: This device is not active"])
+
+    def test_enable_error_reply(self):
+        self.mock.failures["Enable"] = (
+            "org.freedesktop.NetworkManager.PermissionDenied", "Not authorized to enable networking")
+        self.client.set_networking_enabled(False)
+        self.assertTrue(wait_until(lambda: self.errors))
+        self.assertEqual(self.errors, ["Enable: Not authorized to enable networking"])
+        self.assertEqual(self.mock.called("Enable"), [(NM_PATH, [False])])
+
+
+if __name__ == "__main__":
+    unittest.main()
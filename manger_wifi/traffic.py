@@ -0,0 +1,199 @@
+"""История трафика по интерфейсам и графики-спарклайны.
+
+Счётчики хранятся в кольцевом буфере NumPy фиксированного размера, скорости
+считаются сразу для всех интерфейсов по реальному времени между замерами
+(time.monotonic), а не по настроенному интервалу таймера.
+"""
+import time
+
+import numpy as np
+from PyQt6.QtCore import QPointF, Qt
+from PyQt6.QtGui import QColor, QPainter, QPen, QPixmap
+from PyQt6.QtWidgets import QGridLayout, QLabel, QWidget
+
+# Час истории при замере раз в секунду
+HISTORY_SAMPLES = 3600
+RX, TX = 0, 1
+
+
+class TrafficHistory:
+    """Кольцевой буфер счётчиков: [интерфейс, rx/tx, слот]"""
+
+    def __init__(self, capacity=HISTORY_SAMPLES):
+        self.capacity = capacity
+        self.names = []
+        self.rows = {}
+        self.times = np.full(capacity, np.nan)
+        self.counters = np.full((0, 2, capacity), np.nan)
+        self.head = 0
+        self.count = 0
+
+    def add(self, counters, now=None):
+        """Записывает замер {имя: (rx, tx)}; пропавшие интерфейсы получают NaN"""
+        for name in counters:
+            if name not in self.rows:
+                self.rows[name] = len(self.names)
+                self.names.append(name)
+        missing = len(self.names) - self.counters.shape[0]
+        if missing:
+            self.counters = np.concatenate(
+                [self.counters, np.full((missing, 2, self.capacity), np.nan)])
+
+        column = np.full((len(self.names), 2), np.nan)
+        for name, values in counters.items():
+            column[self.rows[name]] = values
+        self.counters[:, :, self.head] = column
+        self.times[self.head] = time.monotonic() if now is None else now
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def slots(self, samples):
+        samples = min(samples, self.count)
+        return (self.head - samples + np.arange(samples)) % self.capacity
+
+    def rates(self, intervals=None):
+        """Скорости, байт/с, за последние intervals промежутков: [интерфейс, rx/tx, промежуток]"""
+        slots = self.slots(self.count if intervals is None else intervals + 1)
+        if len(slots) < 2:
+            return np.zeros((len(self.names), 2, 0))
+        deltas = np.diff(self.counters[:, :, slots], axis=2)
+        elapsed = np.diff(self.times[slots])
+        # Счётчик обнулился (интерфейс пересоздан) — это не отрицательная скорость
+        deltas[deltas < 0] = np.nan
+        return np.nan_to_num(deltas / elapsed, nan=0.0)
+
+    def current_rates(self):
+        """Скорости за последний промежуток: [интерфейс, rx/tx]"""
+        rates = self.rates(1)
+        if rates.shape[2] == 0:
+            return np.zeros((len(self.names), 2))
+        return rates[:, :, -1]
+
+
+class Sparkline(QWidget):
+    """График последних скоростей rx/tx.
+
+    Картинка кэшируется в QPixmap: новый замер сдвигает её на STEP пикселей
+    и дорисовывает только последний отрезок. Полная перерисовка — лишь при
+    смене масштаба или размера; скрытый график только запоминает значения.
+    """
+    STEP = 2
+    # Столько точек хватит на график шириной 2048 пикселей
+    MAX_POINTS = 1024
+    COLORS = (QColor("#4caf50"), QColor("#5c90ff"))
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(32)
+        self.values = np.zeros((2, 0))
+        self.scale = 0.0
+        self.cache = None
+
+    def visible_values(self):
+        return self.values[:, -(self.width() // self.STEP + 1):]
+
+    def set_values(self, values):
+        """Полная история [rx/tx, промежуток]"""
+        self.values = values[:, -self.MAX_POINTS:]
+        self.cache = None
+        self.update()
+
+    def push(self, rates):
+        """Добавляет скорости последнего промежутка (rx, tx)"""
+        self.values = np.concatenate([self.values, np.asarray(rates).reshape(2, 1)], axis=1)
+        self.values = self.values[:, -self.MAX_POINTS:]
+        peak = self.visible_values().max(initial=0.0)
+        if (self.cache is None or not self.isVisible() or peak > self.scale
+                or peak < self.scale / 4 or self.values.shape[1] < 2):
+            self.cache = None
+        else:
+            self.scroll_cache()
+        self.update()
+
+    def y(self, value):
+        height = self.height() - 2
+        return 1 + height - value / self.scale * height
+
+    def scroll_cache(self):
+        width = self.width()
+        self.cache.scroll(-self.STEP, 0, self.cache.rect())
+        painter = QPainter(self.cache)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+        painter.fillRect(width - self.STEP, 0, self.STEP, self.height(), Qt.GlobalColor.transparent)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        x = width - 1
+        for series, color in zip(self.values[:, -2:], self.COLORS):
+            painter.setPen(QPen(color, 1.5))
+            painter.drawLine(QPointF(x - self.STEP, self.y(series[0])), QPointF(x, self.y(series[1])))
+        painter.end()
+
+    def redraw(self):
+        self.cache = QPixmap(self.size())
+        self.cache.fill(Qt.GlobalColor.transparent)
+        values = self.visible_values()
+        self.scale = max(values.max(initial=0.0) * 1.25, 1024.0)
+        count = values.shape[1]
+        if count < 2:
+            return
+        xs = self.width() - 1 - self.STEP * np.arange(count - 1, -1, -1)
+        painter = QPainter(self.cache)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        for series, color in zip(values, self.COLORS):
+            painter.setPen(QPen(color, 1.5))
+            painter.drawPolyline([QPointF(x, self.y(v)) for x, v in zip(xs, series)])
+        painter.end()
+
+    def resizeEvent(self, event):
+        self.cache = None
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        if self.cache is None or self.cache.size() != self.size():
+            self.redraw()
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#2d2d2d"))
+        painter.drawPixmap(0, 0, self.cache)
+        painter.end()
+
+
+class TrafficPanel(QWidget):
+    """Строка на интерфейс: имя, текущие скорости и график"""
+
+    def __init__(self, format_bytes, parent=None):
+        super().__init__(parent)
+        self.format_bytes = format_bytes
+        self.history = TrafficHistory()
+        self.grid = QGridLayout(self)
+        self.grid.setColumnStretch(2, 1)
+        self.widgets = {}
+
+    def sample(self, counters, now=None):
+        """Добавляет замер {имя: (rx, tx)} и обновляет строки"""
+        counters = {name: values for name, values in counters.items() if name != "lo"}
+        self.history.add(counters, now)
+        rates = self.history.current_rates()
+        for name, row in self.history.rows.items():
+            widgets = self.widgets.get(name)
+            if widgets is None:
+                widgets = self.add_row(name)
+                widgets[2].set_values(self.history.rates()[row])
+            else:
+                widgets[2].push(rates[row])
+            for widget in widgets:
+                widget.setVisible(name in counters)
+            widgets[1].setText(f"↓ {self.format_bytes(rates[row, RX])}/s  "
+                               f"↑ {self.format_bytes(rates[row, TX])}/s")
+
+    def add_row(self, name):
+        row = len(self.widgets)
+        widgets = (QLabel(name), QLabel(), Sparkline())
+        widgets[1].setMinimumWidth(220)
+        for column, widget in enumerate(widgets):
+            self.grid.addWidget(widget, row, column)
+        self.widgets[name] = widgets
+        return widgets
+
+    def total_rates(self):
+        """Суммарные скорости (rx, tx) по всем интерфейсам"""
+        return self.history.current_rates().sum(axis=0)
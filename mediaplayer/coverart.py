@@ -0,0 +1,283 @@
+"""Обложки альбомов: встроенные в теги (через mutagen) или cover.jpg рядом с треком.
+
+Обложка читается и уменьшается в рабочем потоке: QImageReader с
+setScaledSize декодирует JPEG сразу в малом размере. Ключ кэша — хэш
+содержимого картинки, поэтому одна обложка на все треки альбома хранится
+один раз: и на диске (XDG cache), и в памяти (LRU готовых QPixmap).
+"""
+import base64
+import hashlib
+import os
+from collections import OrderedDict
+
+from PyQt6.QtCore import (QBuffer, QByteArray, QCoreApplication, QObject, QSize, QThread, Qt,
+                          pyqtSignal, pyqtSlot)
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+
+# Сторона уменьшенной обложки, пикселей
+COVER_SIZE = 256
+# Сторона обложки на экране, пикселей
+COVER_DISPLAY_SIZE = 200
+# Сколько готовых обложек держать в памяти
+MEMORY_CACHE_SIZE = 64
+# Сколько файлов держать в дисковом кэше; лишние — давно не использованные
+DISK_CACHE_LIMIT = 1000
+# Сколько треков помнить, с какой обложкой (или без неё) они
+TRACK_INDEX_SIZE = 4096
+# Формат файла кэша -> расширение; качество JPEG
+CACHE_FORMATS = {"JPEG": ".jpg", "PNG": ".png"}
+CACHE_QUALITY = 90
+FOLDER_COVER_NAMES = ("cover.jpg", "cover.jpeg", "cover.png", "folder.jpg", "front.jpg")
+# Тип картинки «передняя обложка» в APIC и METADATA_BLOCK_PICTURE
+FRONT_COVER = 3
+
+
+def cache_dir():
+    """Каталог уменьшенных обложек в XDG cache dir"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    path = os.path.join(base, "nuros-mediaplayer", "covers")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def front_cover(pictures):
+    """Данные передней обложки, иначе первой картинки"""
+    pictures = list(pictures)
+    for picture in pictures:
+        if picture.type == FRONT_COVER:
+            return picture.data
+    return pictures[0].data if pictures else None
+
+
+def embedded_picture(path):
+    """Байты встроенной обложки: APIC (ID3), FLAC/Vorbis picture или covr (MP4)"""
+    try:
+        import mutagen
+        from mutagen.flac import Picture
+    except ImportError:
+        return None
+    try:
+        audio = mutagen.File(path)
+    except Exception:
+        return None
+    if audio is None:
+        return None
+
+    if getattr(audio, "pictures", None):
+        return front_cover(audio.pictures)
+    tags = audio.tags
+    if not tags:
+        return None
+    if hasattr(tags, "getall"):
+        return front_cover(tags.getall("APIC"))
+    if "covr" in tags:
+        covers = tags["covr"]
+        return bytes(covers[0]) if covers else None
+    try:
+        blocks = tags.get("metadata_block_picture") or []
+        return front_cover(Picture(base64.b64decode(block)) for block in blocks)
+    except Exception:
+        return None
+
+
+def folder_picture_path(path):
+    """cover.jpg и подобные рядом с треком (без учёта регистра)"""
+    directory = os.path.dirname(path)
+    try:
+        names = {name.lower(): name for name in os.listdir(directory)}
+    except OSError:
+        return None
+    for name in FOLDER_COVER_NAMES:
+        if name in names:
+            return os.path.join(directory, names[name])
+    return None
+
+
+def decode_scaled(data):
+    """Декодирование сразу в размер не больше COVER_SIZE"""
+    buffer = QBuffer()
+    buffer.setData(QByteArray(data))
+    reader = QImageReader(buffer)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid() and max(size.width(), size.height()) > COVER_SIZE:
+        reader.setScaledSize(size.scaled(QSize(COVER_SIZE, COVER_SIZE),
+                                         Qt.AspectRatioMode.KeepAspectRatio))
+    image = reader.read()
+    if not image.isNull() and max(image.width(), image.height()) > COVER_SIZE:
+        # Формат, который не умеет уменьшать при чтении
+        image = image.scaled(COVER_SIZE, COVER_SIZE, Qt.AspectRatioMode.KeepAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+    return image
+
+
+class CoverWorker(QObject):
+    cover_loaded = pyqtSignal(str, str, QImage)  # путь трека, ключ ("" — обложки нет), картинка
+
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+        # Записывается из GUI-потока: запросы со старшим поколением устарели
+        self.latest = 0
+        # Каталог -> ключ его cover.jpg: файл не читается заново для каждого трека
+        self.folder_keys = {}
+        self.pruned = False
+
+    @pyqtSlot(int, str)
+    def load(self, generation, path):
+        if generation < self.latest:
+            # Пользователь уже переключил трек дальше
+            return
+        if not self.pruned:
+            self.pruned = True
+            self.prune()
+        try:
+            key, image = self.load_cover(path)
+        except OSError:
+            key, image = "", QImage()
+        self.cover_loaded.emit(path, key, image)
+
+    def load_cover(self, path):
+        data = embedded_picture(path)
+        if data is not None:
+            return self.cover(data)
+        directory = os.path.dirname(path)
+        key = self.folder_keys.get(directory)
+        if key == "":
+            return key, QImage()
+        if key is not None:
+            image = self.read_cached(key)
+            if not image.isNull():
+                return key, image
+            # Обложку вытеснили из дискового кэша — читаем файл заново
+        if len(self.folder_keys) > TRACK_INDEX_SIZE:
+            self.folder_keys.clear()
+        key, image = "", QImage()
+        picture = folder_picture_path(path)
+        if picture is not None:
+            with open(picture, "rb") as f:
+                key, image = self.cover(f.read())
+        self.folder_keys[directory] = key
+        return key, image
+
+    def cover(self, data):
+        """Ключ — хэш содержимого: обложка альбома уменьшается и хранится один раз"""
+        key = hashlib.blake2b(data, digest_size=16).hexdigest()
+        image = self.read_cached(key)
+        if image.isNull():
+            image = decode_scaled(data)
+            if image.isNull():
+                return "", image
+            self.store(key, image)
+        return key, image
+
+    def read_cached(self, key):
+        for extension in CACHE_FORMATS.values():
+            path = os.path.join(self.directory, key + extension)
+            image = QImage(path)
+            if not image.isNull():
+                # mtime — время последнего использования для очистки кэша
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return image
+        return QImage()
+
+    def store(self, key, image):
+        # JPEG в несколько раз меньше; PNG только ради прозрачности
+        image_format = "PNG" if image.hasAlphaChannel() else "JPEG"
+        path = os.path.join(self.directory, key + CACHE_FORMATS[image_format])
+        temporary = path + ".tmp"
+        if image.save(temporary, image_format, CACHE_QUALITY):
+            os.replace(temporary, path)
+
+    def prune(self):
+        """Удаляет давно не использованные обложки сверх DISK_CACHE_LIMIT"""
+        try:
+            with os.scandir(self.directory) as entries:
+                files = [(entry.stat().st_mtime, entry.path) for entry in entries
+                         if entry.is_file()]
+        except OSError:
+            return
+        if len(files) <= DISK_CACHE_LIMIT:
+            return
+        files.sort()
+        for _, path in files[:len(files) - DISK_CACHE_LIMIT]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class CoverArt(QObject):
+    """Обложки треков с кэшем; cover_ready приходит в GUI-поток"""
+    cover_ready = pyqtSignal(str, QPixmap)  # путь трека, обложка (пустая — нет обложки)
+    _load_requested = pyqtSignal(int, str)
+
+    def __init__(self, parent=None, directory=None):
+        super().__init__(parent)
+        self.directory = directory
+        self.generation = 0
+        self.thread = None
+        self.worker = None
+        # Путь трека -> ключ обложки ("" — обложки нет)
+        self.track_keys = OrderedDict()
+        # Ключ -> QPixmap, самые давние в начале
+        self.pixmaps = OrderedDict()
+
+    def ensure_thread(self):
+        if self.thread is not None:
+            return
+        self.thread = QThread()
+        self.worker = CoverWorker(self.directory or cache_dir())
+        self.worker.moveToThread(self.thread)
+        self._load_requested.connect(self.worker.load)
+        self.worker.cover_loaded.connect(self.on_cover_loaded)
+        QCoreApplication.instance().aboutToQuit.connect(self.shutdown)
+        self.thread.start()
+
+    def cached(self, path):
+        """Обложка из памяти: QPixmap (возможно, пустой) или None, если ещё неизвестна"""
+        key = self.track_keys.get(path)
+        if key is None:
+            return None
+        if not key:
+            return QPixmap()
+        pixmap = self.pixmaps.get(key)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(key)
+        return pixmap
+
+    def request(self, path):
+        """Обложка трека; если её нет в памяти, она придёт через cover_ready"""
+        pixmap = self.cached(path)
+        if pixmap is not None:
+            self.cover_ready.emit(path, pixmap)
+            return
+        self.ensure_thread()
+        self.generation += 1
+        self.worker.latest = self.generation
+        self._load_requested.emit(self.generation, path)
+
+    def on_cover_loaded(self, path, key, image):
+        self.track_keys[path] = key
+        self.track_keys.move_to_end(path)
+        if len(self.track_keys) > TRACK_INDEX_SIZE:
+            self.track_keys.popitem(last=False)
+        if not key or image.isNull():
+            self.cover_ready.emit(path, QPixmap())
+            return
+        pixmap = self.pixmaps.get(key)
+        if pixmap is None:
+            pixmap = QPixmap.fromImage(image)
+            self.pixmaps[key] = pixmap
+            if len(self.pixmaps) > MEMORY_CACHE_SIZE:
+                self.pixmaps.popitem(last=False)
+        self.pixmaps.move_to_end(key)
+        self.cover_ready.emit(path, pixmap)
+
+    def shutdown(self):
+        if self.thread is not None and self.thread.isRunning():
+            self.thread.quit()
+            self.thread.wait()
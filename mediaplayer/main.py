@@ -1,28 +1,72 @@
+import bisect
 import sys
-from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, 
-                            QVBoxLayout, QHBoxLayout, QPushButton, 
-                            QLabel, QSlider, QListWidget, QFileDialog)
-from PyQt6.QtCore import Qt, QUrl
-from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
 import os
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.applog import setup_logging
+from common.startup import profiler
+
+with profiler.phase("import PyQt6"):
+    from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, 
+                                QVBoxLayout, QHBoxLayout, QPushButton, 
+                                QLabel, QSlider, QListWidget, QFileDialog, QMenu)
+    from PyQt6.QtCore import Qt, QTimer, QUrl
+    from PyQt6.QtGui import QPixmap
+
+from coverart import COVER_DISPLAY_SIZE, CoverArt
+from library import TrackImporter, local_paths
+from playqueue import PlayQueue, REPEAT_ALL, REPEAT_OFF, REPEAT_ONE
+from readahead import TrackBuffer
+from session import SessionStore
+
+# Текст, подсказка и «нажатость» кнопки повтора для каждого режима
+REPEAT_MODES = {
+    REPEAT_OFF: ("🔁", "Повтор выключен", False),
+    REPEAT_ALL: ("🔁", "Повтор плейлиста", True),
+    REPEAT_ONE: ("🔂", "Повтор трека", True),
+}
+# Строки, которые восстанавливаются сразу (примерно экран), остальные — пачками
+FIRST_ROWS = 100
+ROW_BATCH = 5000
+
 class SpotifyClone(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Mediaplayer")
         self.setFixedSize(1200, 800)
         
-        # Инициализация плеера
-        self.player = QMediaPlayer()
-        self.audio_output = QAudioOutput()
-        self.player.setAudioOutput(self.audio_output)
+        # Плеер создаётся при первом воспроизведении: QtMultimedia и
+        # инициализация аудиобэкенда заметно замедляют запуск
+        self.player = None
+        self.audio_output = None
+        # Анализатор спектра появляется вместе с плеером
+        self.buffer_output = None
+        self.spectrum = None
+        
+        # Состояние плеера: треки адресуются постоянными id очереди
+        self.queue = PlayQueue()
+        # Как раньше: после последнего трека снова первый
+        self.queue.set_repeat(REPEAT_ALL)
+        # id трека в каждой строке; id только растут, поэтому список упорядочен
+        self.track_ids = []
+        # Папки обходятся в фоне, треки приходят пачками
+        self.importer = TrackImporter(self)
+        # Треки с сетевых дисков читаются заранее, следующий — ещё во время текущего
+        self.track_buffer = TrackBuffer()
+        # Обложки читаются и уменьшаются в фоне, одна на альбом
+        self.covers = CoverArt(self)
+        self.setAcceptDrops(True)
         
-        # Состояние плеера
-        self.playlist = []
-        self.current_track = 0
+        # Восстановленные строки, которые ещё не добавлены в список
+        self.pending_rows = []
+        self.pending_start = 0
+        # (id трека, позиция): куда перемотать при первом запуске восстановленного трека
+        self.resume = None
+        self.session = SessionStore(self.session_paths, self.session_state, parent=self)
         
         self.setup_ui()
         self.setup_connections()
+        self.restore_session()
 
     def setup_ui(self):
         central = QWidget()
@@ -40,11 +84,16 @@ class SpotifyClone(QMainWindow):
         
         self.playlist_widget = QListWidget()
         self.playlist_widget.setMinimumWidth(300)
+        # Строки одной высоты: вставка тысяч треков не пересчитывает их размеры
+        self.playlist_widget.setUniformItemSizes(True)
+        self.playlist_widget.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         
         playlist_controls = QHBoxLayout()
         self.add_button = QPushButton("Добавить")
+        self.add_folder_button = QPushButton("Папка")
         self.remove_button = QPushButton("Удалить")
         playlist_controls.addWidget(self.add_button)
+        playlist_controls.addWidget(self.add_folder_button)
         playlist_controls.addWidget(self.remove_button)
         
         playlist_layout.addWidget(self.playlist_widget)
@@ -54,6 +103,14 @@ class SpotifyClone(QMainWindow):
         # Правая панель (плеер)
         player_panel = QWidget()
         player_layout = QVBoxLayout(player_panel)
+        self.player_layout = player_layout
+        
+        # Обложка
+        self.cover = QLabel()
+        self.cover.setFixedSize(COVER_DISPLAY_SIZE, COVER_DISPLAY_SIZE)
+        self.cover.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.cover.setText("♪")
+        player_layout.addWidget(self.cover, 0, Qt.AlignmentFlag.AlignCenter)
         
         # Информация о треке
         self.track_info = QLabel("Нет воспроизведения")
@@ -77,10 +134,19 @@ class SpotifyClone(QMainWindow):
         self.prev_button = QPushButton("⏮")
         self.play_button = QPushButton("⏵")
         self.next_button = QPushButton("⏭")
+        self.shuffle_button = QPushButton("🔀")
+        self.shuffle_button.setCheckable(True)
+        self.shuffle_button.setToolTip("Перемешать")
+        self.repeat_button = QPushButton()
+        self.repeat_button.setCheckable(True)
         
-        for button in [self.prev_button, self.play_button, self.next_button]:
+        for button in [self.shuffle_button, self.prev_button, self.play_button,
+                       self.next_button, self.repeat_button]:
             button.setFixedSize(50, 50)
             controls_layout.addWidget(button)
+        for button in [self.shuffle_button, self.repeat_button]:
+            button.setObjectName("toggle")
+        self.show_repeat_mode()
             
         player_layout.addLayout(controls_layout)
         
@@ -104,20 +170,66 @@ class SpotifyClone(QMainWindow):
     def setup_connections(self):
         # Плейлист
         self.add_button.clicked.connect(self.add_files)
+        self.add_folder_button.clicked.connect(self.add_folder)
+        self.importer.tracks_found.connect(self.add_tracks)
         self.remove_button.clicked.connect(self.remove_selected)
         self.playlist_widget.itemDoubleClicked.connect(self.play_selected)
+        self.playlist_widget.customContextMenuRequested.connect(self.show_playlist_menu)
         
         # Контролы
         self.play_button.clicked.connect(self.play_pause)
         self.prev_button.clicked.connect(self.play_previous)
         self.next_button.clicked.connect(self.play_next)
-        self.volume_slider.valueChanged.connect(
-            lambda x: self.audio_output.setVolume(x / 100))
+        self.shuffle_button.toggled.connect(self.queue.set_shuffle)
+        self.shuffle_button.toggled.connect(lambda: self.session.mark())
+        self.repeat_button.clicked.connect(self.cycle_repeat_mode)
+        self.volume_slider.valueChanged.connect(self.set_volume)
+        self.volume_slider.valueChanged.connect(lambda: self.session.mark())
+        self.progress_slider.sliderMoved.connect(self.set_position)
+        self.covers.cover_ready.connect(self.show_cover)
+
+    def ensure_player(self):
+        """Создаёт медиаплеер при первом обращении"""
+        if self.player is not None:
+            return self.player
+        with profiler.phase("QtMultimedia"):
+            from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
+            self.player = QMediaPlayer()
+            self.audio_output = QAudioOutput()
+            self.player.setAudioOutput(self.audio_output)
+        self.set_volume(self.volume_slider.value())
         
         # События плеера
         self.player.positionChanged.connect(self.update_position)
         self.player.durationChanged.connect(self.update_duration)
-        self.progress_slider.sliderMoved.connect(self.set_position)
+        self.player.mediaStatusChanged.connect(self.handle_media_status)
+        self.setup_spectrum()
+        return self.player
+
+    def setup_spectrum(self):
+        """Анализатор спектра под названием трека; без QAudioBufferOutput (Qt до 6.8) его нет"""
+        with profiler.phase("spectrum"):
+            from player import spectrum_output
+            from spectrum import SpectrumWidget
+            self.buffer_output = spectrum_output(self)
+            if self.buffer_output is None:
+                return
+            self.player.setAudioBufferOutput(self.buffer_output)
+            self.spectrum = SpectrumWidget()
+        index = self.player_layout.indexOf(self.track_info) + 1
+        self.player_layout.insertWidget(index, self.spectrum)
+        self.buffer_output.audioBufferReceived.connect(self.on_audio_buffer)
+
+    def on_audio_buffer(self, buffer):
+        """Отсчёты воспроизведения -> анализатор спектра"""
+        from player import buffer_samples
+        samples = buffer_samples(buffer)
+        if samples is not None and len(samples):
+            self.spectrum.feed(samples, buffer.format().sampleRate())
+
+    def set_volume(self, value):
+        if self.audio_output is not None:
+            self.audio_output.setVolume(value / 100)
 
     def add_files(self):
         files, _ = QFileDialog.getOpenFileNames(
@@ -126,60 +238,165 @@ class SpotifyClone(QMainWindow):
             "",
             "Audio Files (*.mp3 *.wav *.ogg *.m4a *.flac)"
         )
-        
-        for file in files:
-            self.playlist.append(file)
-            self.playlist_widget.addItem(os.path.basename(file))
+        self.add_tracks(files)
+
+    def add_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Выберите папку с музыкой")
+        if folder:
+            self.importer.import_paths([folder])
+
+    def add_tracks(self, paths):
+        # Новые строки встают после всех восстановленных
+        self.stream_rows(len(self.pending_rows))
+        self.track_ids.extend(self.queue.extend(paths))
+        self.playlist_widget.addItems([os.path.basename(path) for path in paths])
+        self.session.mark(playlist=True)
+
+    def dragEnterEvent(self, event):
+        if local_paths(event.mimeData()):
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        paths = local_paths(event.mimeData())
+        if paths:
+            event.acceptProposedAction()
+            self.importer.import_paths(paths)
+
+    def row_of(self, track_id):
+        row = bisect.bisect_left(self.track_ids, track_id)
+        return row if row < len(self.track_ids) and self.track_ids[row] == track_id else -1
 
     def remove_selected(self):
         current = self.playlist_widget.currentRow()
         if current >= 0:
             self.playlist_widget.takeItem(current)
-            self.playlist.pop(current)
-            if current == self.current_track:
+            track_id = self.track_ids.pop(current)
+            playing = track_id == self.queue.current
+            # Очередь сама продолжит с соседей удалённого трека
+            self.queue.remove(track_id)
+            self.session.mark(playlist=True)
+            if playing and self.player is not None:
                 self.player.stop()
+                self.play_button.setText("⏵")
                 self.track_info.setText("Нет воспроизведения")
+                self.show_cover(None, QPixmap())
 
     def play_selected(self):
         current = self.playlist_widget.currentRow()
         if current >= 0:
-            self.current_track = current
+            self.queue.play(self.track_ids[current])
             self.play_current()
 
+    def show_playlist_menu(self, position):
+        row = self.playlist_widget.indexAt(position).row()
+        if row < 0:
+            return
+        track_id = self.track_ids[row]
+        menu = QMenu(self)
+        menu.addAction("Играть следующим", lambda: self.queue_track(track_id, first=True))
+        menu.addAction("Добавить в очередь", lambda: self.queue_track(track_id))
+        menu.exec(self.playlist_widget.viewport().mapToGlobal(position))
+
+    def queue_track(self, track_id, first=False):
+        if first:
+            self.queue.play_next(track_id)
+        else:
+            self.queue.enqueue(track_id)
+        self.session.mark()
+
+    def cycle_repeat_mode(self):
+        self.queue.set_repeat({REPEAT_OFF: REPEAT_ALL, REPEAT_ALL: REPEAT_ONE,
+                               REPEAT_ONE: REPEAT_OFF}[self.queue.repeat])
+        self.show_repeat_mode()
+        self.session.mark()
+
+    def show_repeat_mode(self):
+        text, tooltip, checked = REPEAT_MODES[self.queue.repeat]
+        self.repeat_button.setText(text)
+        self.repeat_button.setToolTip(tooltip)
+        self.repeat_button.setChecked(checked)
+
     def play_pause(self):
-        if self.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
+        if self.player is None or self.queue.current is None:
+            # Ещё ничего не загружено: начинаем с первого трека очереди
+            if self.queue.current is None and self.queue.next() is None:
+                return
+            self.play_current()
+            return
+        if self.player.playbackState() == self.player.PlaybackState.PlayingState:
             self.player.pause()
             self.play_button.setText("⏵")
         else:
-            if self.player.position() == 0 and not self.playlist:
+            if self.player.position() == 0 and not self.queue:
                 return
             self.player.play()
             self.play_button.setText("⏸")
 
     def play_previous(self):
-        if self.playlist:
-            self.current_track = (self.current_track - 1) % len(self.playlist)
+        if self.queue.previous() is not None:
             self.play_current()
 
     def play_next(self):
-        if self.playlist:
-            self.current_track = (self.current_track + 1) % len(self.playlist)
+        if self.queue.next() is not None:
             self.play_current()
 
+    def handle_media_status(self, status):
+        if status == self.player.MediaStatus.LoadedMedia and self.resume is not None:
+            track_id, position = self.resume
+            self.resume = None
+            if track_id == self.queue.current:
+                # Восстановленный трек продолжается с места, где остановились
+                self.player.setPosition(position)
+            return
+        if status != self.player.MediaStatus.EndOfMedia:
+            return
+        if self.queue.next(auto=True) is not None:
+            self.play_current()
+        else:
+            self.play_button.setText("⏵")
+
     def play_current(self):
-        if 0 <= self.current_track < len(self.playlist):
-            self.player.setSource(QUrl.fromLocalFile(self.playlist[self.current_track]))
+        path = self.queue.path(self.queue.current)
+        if path is not None:
+            if self.resume is not None and self.resume[0] != self.queue.current:
+                # Выбран другой трек: восстановленная позиция больше не нужна
+                self.resume = None
+            self.ensure_player()
+            device = self.track_buffer.open(path)
+            if device is None:
+                self.player.setSource(QUrl.fromLocalFile(path))
+            else:
+                self.player.setSourceDevice(device, QUrl.fromLocalFile(path))
+            self.track_buffer.retire()
+            self.track_buffer.prewarm(self.queue.path(self.queue.peek()))
             self.player.play()
             self.play_button.setText("⏸")
-            self.track_info.setText(os.path.basename(self.playlist[self.current_track]))
-            self.playlist_widget.setCurrentRow(self.current_track)
+            self.track_info.setText(os.path.basename(path))
+            self.covers.request(path)
+            self.playlist_widget.setCurrentRow(self.row_of(self.queue.current))
+            self.session.mark()
+
+    def show_cover(self, path, pixmap):
+        """Обложка текущего трека; без неё — заглушка"""
+        if path is not None and path != self.queue.path(self.queue.current):
+            # Обложка трека, который уже переключили
+            return
+        if pixmap.isNull():
+            self.cover.setPixmap(QPixmap())
+            self.cover.setText("♪")
+        else:
+            self.cover.setPixmap(pixmap.scaled(
+                self.cover.size(), Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation))
 
     def set_position(self, position):
-        self.player.setPosition(position)
+        if self.player is not None:
+            self.player.setPosition(position)
 
     def update_position(self, position):
         self.progress_slider.setValue(position)
         self.time_label.setText(self.format_time(position))
+        self.session.mark()
 
     def update_duration(self, duration):
         self.progress_slider.setRange(0, duration)
@@ -190,6 +407,81 @@ class SpotifyClone(QMainWindow):
         m, s = divmod(s, 60)
         return f"{m}:{s:02d}"
 
+    def session_paths(self):
+        return [self.queue.path(track_id) for track_id in self.track_ids]
+
+    def session_state(self):
+        current = self.row_of(self.queue.current) if self.queue.current is not None else -1
+        if self.player is not None and self.resume is None:
+            position = self.player.position()
+        else:
+            position = self.resume[1] if self.resume is not None else 0
+        up_next = [self.row_of(track_id) for track_id in self.queue.up_next]
+        return {
+            "current": current,
+            "position": position,
+            "volume": self.volume_slider.value(),
+            "shuffle": self.queue.shuffle,
+            "repeat": self.queue.repeat,
+            "up_next": [row for row in up_next if row >= 0],
+        }
+
+    def restore_session(self):
+        """Прошлая сессия: текущий трек и первый экран строк сразу, остальные строки — в фоне"""
+        paths, state = self.session.load()
+        self.volume_slider.setValue(state.get("volume", self.volume_slider.value()))
+        self.shuffle_button.setChecked(bool(state.get("shuffle")))
+        if state.get("repeat") in REPEAT_MODES:
+            self.queue.set_repeat(state["repeat"])
+            self.show_repeat_mode()
+        if not paths:
+            return
+
+        # Очередь строится целиком: это словари, без виджетов
+        self.track_ids = self.queue.extend(paths)
+        self.pending_rows = paths
+        self.pending_start = 0
+        self.stream_rows(FIRST_ROWS)
+
+        current = state.get("current", -1)
+        if isinstance(current, int) and 0 <= current < len(paths):
+            self.queue.play(self.track_ids[current])
+            position = state.get("position", 0)
+            self.resume = (self.queue.current, position)
+            self.track_info.setText(os.path.basename(paths[current]))
+            self.covers.request(paths[current])
+            self.time_label.setText(self.format_time(position))
+            self.playlist_widget.setCurrentRow(current)
+        for row in state.get("up_next", []):
+            if isinstance(row, int) and 0 <= row < len(paths):
+                self.queue.enqueue(self.track_ids[row])
+
+    def stream_rows(self, count=ROW_BATCH):
+        """Следующая пачка восстановленных строк; пока остались — продолжит в следующем цикле событий"""
+        if not self.pending_rows:
+            return
+        start = self.pending_start
+        end = min(start + count, len(self.pending_rows))
+        self.playlist_widget.addItems([os.path.basename(path) for path in self.pending_rows[start:end]])
+        self.pending_start = end
+        if end < len(self.pending_rows):
+            QTimer.singleShot(0, self.stream_rows)
+            return
+        self.pending_rows = []
+        if self.queue.current is not None:
+            row = self.row_of(self.queue.current)
+            self.playlist_widget.setCurrentRow(row)
+            self.playlist_widget.scrollToItem(self.playlist_widget.item(row))
+
+    def closeEvent(self, event):
+        self.session.flush()
+        self.importer.shutdown()
+        if self.player is not None:
+            # Сначала плеер отпускает устройство, потом оно закрывается
+            self.player.setSource(QUrl())
+        self.track_buffer.close()
+        super().closeEvent(event)
+
     def apply_styles(self):
         self.setStyleSheet("""
             QMainWindow, QWidget {
@@ -207,6 +499,9 @@ class SpotifyClone(QMainWindow):
             QPushButton:hover {
                 background-color: #1ed760;
             }
+            QPushButton#toggle:!checked {
+                background-color: #404040;
+            }
             QListWidget {
                 background-color: #282828;
                 border-radius: 10px;
@@ -246,9 +541,13 @@ class SpotifyClone(QMainWindow):
         """)
 
 def main():
-    app = QApplication(sys.argv)
-    window = SpotifyClone()
-    window.show()
+    setup_logging("mediaplayer")
+    with profiler.phase("QApplication"):
+        app = QApplication(sys.argv)
+    profiler.watch_first_paint("mediaplayer")
+    with profiler.phase("SpotifyClone"):
+        window = SpotifyClone()
+        window.show()
     sys.exit(app.exec())
 
 if __name__ == "__main__":
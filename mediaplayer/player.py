@@ -1,7 +1,61 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
                            QPushButton, QLabel, QSlider)
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
+from PyQt6.QtCore import Qt, QUrl, pyqtSignal
+from PyQt6.QtGui import QPixmap
+from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput, QAudioFormat
+import numpy as np
+
+from coverart import COVER_DISPLAY_SIZE, CoverArt
+from readahead import TrackBuffer
+from spectrum import SpectrumWidget
+
+try:
+    # Отсчёты воспроизведения для анализатора спектра (Qt 6.8+)
+    from PyQt6.QtMultimedia import QAudioBufferOutput
+except ImportError:
+    QAudioBufferOutput = None
+
+# Формат отсчётов -> (тип NumPy, смещение нуля, полная шкала)
+SAMPLE_FORMATS = {
+    QAudioFormat.SampleFormat.UInt8: (np.uint8, 128, 128),
+    QAudioFormat.SampleFormat.Int16: (np.int16, 0, 32768),
+    QAudioFormat.SampleFormat.Int32: (np.int32, 0, 2 ** 31),
+    QAudioFormat.SampleFormat.Float: (np.float32, 0, 1),
+}
+# Частота, в которой просим отсчёты для анализатора
+SPECTRUM_SAMPLE_RATE = 44100
+
+
+def buffer_samples(buffer):
+    """Моно-отсчёты float32 из QAudioBuffer или None для неизвестного формата"""
+    audio_format = buffer.format()
+    dtype, zero, scale = SAMPLE_FORMATS.get(audio_format.sampleFormat(), (None, 0, 1))
+    channels = audio_format.channelCount()
+    if dtype is None or channels < 1:
+        return None
+    data = buffer.constData()
+    data.setsize(buffer.byteCount())
+    # Буфер живёт только во время сигнала, поэтому astype с копированием обязателен
+    samples = np.frombuffer(data, dtype, buffer.frameCount() * channels).astype(np.float32)
+    if zero:
+        samples -= zero
+    if scale != 1:
+        samples /= scale
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+def spectrum_output(parent):
+    """QAudioBufferOutput для анализатора спектра или None, если Qt его не умеет"""
+    if QAudioBufferOutput is None:
+        return None
+    # Сразу моно float: преобразование формата делает Qt, а не Python
+    audio_format = QAudioFormat()
+    audio_format.setSampleFormat(QAudioFormat.SampleFormat.Float)
+    audio_format.setChannelCount(1)
+    audio_format.setSampleRate(SPECTRUM_SAMPLE_RATE)
+    return QAudioBufferOutput(audio_format, parent)
+
 
 class PlayerWidget(QWidget):
     # Сигналы
@@ -9,6 +63,11 @@ class PlayerWidget(QWidget):
     
     def __init__(self):
         super().__init__()
+        self.current_path = None
+        # Обложки читаются и уменьшаются в фоне, одна на альбом
+        self.covers = CoverArt(self)
+        # Треки с сетевых дисков читаются заранее в фоне
+        self.track_buffer = TrackBuffer()
         self.setup_player()
         self.setup_ui()
         self.connect_signals()
@@ -20,17 +79,34 @@ class PlayerWidget(QWidget):
         self.player.setAudioOutput(self.audio_output)
         self.audio_output.setVolume(0.5)  # 50% громкость по умолчанию
 
+        self.buffer_output = spectrum_output(self)
+        if self.buffer_output is not None:
+            self.player.setAudioBufferOutput(self.buffer_output)
+
     def setup_ui(self):
         """Настройка интерфейса"""
         layout = QVBoxLayout(self)
         layout.setSpacing(20)
 
+        # Обложка
+        self.cover = QLabel()
+        self.cover.setObjectName("cover")
+        self.cover.setFixedSize(COVER_DISPLAY_SIZE, COVER_DISPLAY_SIZE)
+        self.cover.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.show_cover(None, QPixmap())
+        layout.addWidget(self.cover, 0, Qt.AlignmentFlag.AlignCenter)
+
         # Информация о треке
         self.track_info = QLabel("Нет воспроизведения")
         self.track_info.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.track_info.setObjectName("track-title")
         layout.addWidget(self.track_info)
 
+        # Спектр; без QAudioBufferOutput отсчётов нет, и панель не показывается
+        self.spectrum = SpectrumWidget()
+        self.spectrum.setVisible(self.buffer_output is not None)
+        layout.addWidget(self.spectrum)
+
         # Прогресс воспроизведения
         progress_layout = QHBoxLayout()
         
@@ -91,13 +167,37 @@ class PlayerWidget(QWidget):
         # Обработка окончания трека
         self.player.mediaStatusChanged.connect(self.handle_media_status)
 
+        self.covers.cover_ready.connect(self.show_cover)
+
+        if self.buffer_output is not None:
+            self.buffer_output.audioBufferReceived.connect(self.on_audio_buffer)
+
     def load_track(self, path):
         """Загрузка трека"""
-        self.player.setSource(path)
+        self.set_source(path)
+        self.current_path = path
         self.track_info.setText(self.get_filename_from_path(path))
+        self.covers.request(path)
         self.progress_slider.setEnabled(True)
         self.play()
 
+    def set_source(self, path):
+        """Источник плеера: файл или буфер упреждающего чтения"""
+        device = self.track_buffer.open(path)
+        if device is None:
+            self.player.setSource(path)
+        else:
+            self.player.setSourceDevice(device, QUrl.fromLocalFile(path))
+        self.track_buffer.retire()
+
+    def prewarm(self, path):
+        """Следующий трек начинает читаться заранее"""
+        self.track_buffer.prewarm(path)
+
+    def underruns(self):
+        """Сколько раз воспроизведение ждало данных с диска"""
+        return self.track_buffer.underruns
+
     def play(self):
         """Начать воспроизведение"""
         self.player.play()
@@ -109,6 +209,8 @@ class PlayerWidget(QWidget):
     def stop(self):
         """Остановить воспроизведение"""
         self.player.stop()
+        self.current_path = None
+        self.show_cover(None, QPixmap())
         self.progress_slider.setEnabled(False)
         self.track_info.setText("Нет воспроизведения")
         self.time_current.setText("0:00")
@@ -147,6 +249,25 @@ class PlayerWidget(QWidget):
         if status == QMediaPlayer.MediaStatus.EndOfMedia:
             self.playback_ended.emit()
 
+    def show_cover(self, path, pixmap):
+        """Обложка текущего трека; без неё — заглушка"""
+        if path != self.current_path:
+            # Обложка трека, который уже переключили
+            return
+        if pixmap.isNull():
+            self.cover.setPixmap(QPixmap())
+            self.cover.setText("♪")
+        else:
+            self.cover.setPixmap(pixmap.scaled(
+                self.cover.size(), Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation))
+
+    def on_audio_buffer(self, buffer):
+        """Отсчёты воспроизведения -> анализатор спектра"""
+        samples = buffer_samples(buffer)
+        if samples is not None and len(samples):
+            self.spectrum.feed(samples, buffer.format().sampleRate())
+
     def set_volume(self, volume):
         """Установка громкости"""
         self.volume_slider.setValue(int(volume * 100))
@@ -1,8 +1,15 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
                            QListWidget, QPushButton, QFileDialog)
 from PyQt6.QtCore import pyqtSignal
+import bisect
+import logging
 import os
 
+from library import TrackImporter, local_paths
+from playqueue import PlayQueue, REPEAT_ALL
+
+logger = logging.getLogger(__name__)
+
 class PlaylistWidget(QWidget):
     # Сигналы для взаимодействия с главным окном
     track_selected = pyqtSignal(str, int)  # путь к файлу, индекс
@@ -11,6 +18,12 @@ class PlaylistWidget(QWidget):
     def __init__(self):
         super().__init__()
         self.tracks = []  # список путей к файлам
+        # Переходы считает очередь; строкам соответствуют её постоянные id
+        self.track_ids = []
+        self.queue = PlayQueue()
+        self.queue.set_repeat(REPEAT_ALL)
+        self.importer = TrackImporter(self)
+        self.setAcceptDrops(True)
         self.setup_ui()
         self.connect_signals()
 
@@ -22,22 +35,26 @@ class PlaylistWidget(QWidget):
         # Список треков
         self.list_widget = QListWidget()
         self.list_widget.setMinimumWidth(300)
+        self.list_widget.setUniformItemSizes(True)
         layout.addWidget(self.list_widget)
 
         # Кнопки управления
         btn_layout = QHBoxLayout()
         
         self.add_btn = QPushButton("Добавить")
+        self.add_folder_btn = QPushButton("Папка")
         self.remove_btn = QPushButton("Удалить")
         self.clear_btn = QPushButton("Очистить")
         
-        for btn in [self.add_btn, self.remove_btn, self.clear_btn]:
+        for btn in [self.add_btn, self.add_folder_btn, self.remove_btn, self.clear_btn]:
             btn_layout.addWidget(btn)
             
         layout.addLayout(btn_layout)
 
     def connect_signals(self):
         self.add_btn.clicked.connect(self.add_files)
+        self.add_folder_btn.clicked.connect(self.add_folder)
+        self.importer.tracks_found.connect(self.add_tracks)
         self.remove_btn.clicked.connect(self.remove_selected)
         self.clear_btn.clicked.connect(self.clear_playlist)
         self.list_widget.itemDoubleClicked.connect(self.on_track_selected)
@@ -52,11 +69,31 @@ class PlaylistWidget(QWidget):
         )
         
         if files:
-            for file_path in files:
-                self.tracks.append(file_path)
-                self.list_widget.addItem(os.path.basename(file_path))
-            
-            self.playlist_updated.emit(self.tracks)
+            self.add_tracks(files)
+
+    def add_folder(self):
+        """Добавление папки со всеми вложенными треками"""
+        folder = QFileDialog.getExistingDirectory(self, "Выберите папку с музыкой")
+        if folder:
+            self.importer.import_paths([folder])
+
+    def add_tracks(self, paths):
+        """Добавление пачки треков (из диалога или от фонового обхода)"""
+        self.tracks.extend(paths)
+        self.track_ids.extend(self.queue.extend(paths))
+        self.list_widget.addItems([os.path.basename(path) for path in paths])
+        self.playlist_updated.emit(self.tracks)
+
+    def dragEnterEvent(self, event):
+        if local_paths(event.mimeData()):
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        """Перетащенные файлы и папки"""
+        paths = local_paths(event.mimeData())
+        if paths:
+            event.acceptProposedAction()
+            self.importer.import_paths(paths)
 
     def remove_selected(self):
         """Удаление выбранного трека"""
@@ -64,33 +101,47 @@ class PlaylistWidget(QWidget):
         if current >= 0:
             self.list_widget.takeItem(current)
             self.tracks.pop(current)
+            self.queue.remove(self.track_ids.pop(current))
             self.playlist_updated.emit(self.tracks)
 
     def clear_playlist(self):
         """Очистка плейлиста"""
+        # Пачки незавершённого обхода не должны вернуть удалённое
+        self.importer.cancel()
         self.list_widget.clear()
         self.tracks.clear()
+        self.track_ids.clear()
+        self.queue.clear()
         self.playlist_updated.emit(self.tracks)
 
     def on_track_selected(self, item):
         """Обработка выбора трека"""
         current = self.list_widget.row(item)
         if current >= 0:
+            self.queue.play(self.track_ids[current])
             self.track_selected.emit(self.tracks[current], current)
 
-    def get_next_track(self, current_index):
-        """Получить следующий трек"""
-        if self.tracks:
-            next_index = (current_index + 1) % len(self.tracks)
-            return self.tracks[next_index], next_index
-        return None, -1
+    def sync_current(self, current_index):
+        """Строка, которую считает текущей вызывающий, становится текущей и в очереди"""
+        if 0 <= current_index < len(self.track_ids) and self.track_ids[current_index] != self.queue.current:
+            self.queue.play(self.track_ids[current_index])
+
+    def track_at(self, track_id):
+        """(путь, строка) трека очереди или (None, -1)"""
+        if track_id is None:
+            return None, -1
+        row = bisect.bisect_left(self.track_ids, track_id)
+        return self.tracks[row], row
+
+    def get_next_track(self, current_index, auto=False):
+        """Получить следующий трек (с учётом очереди, перемешивания и повтора)"""
+        self.sync_current(current_index)
+        return self.track_at(self.queue.next(auto))
 
     def get_previous_track(self, current_index):
         """Получить предыдущий трек"""
-        if self.tracks:
-            prev_index = (current_index - 1) % len(self.tracks)
-            return self.tracks[prev_index], prev_index
-        return None, -1
+        self.sync_current(current_index)
+        return self.track_at(self.queue.previous())
 
     def highlight_playing(self, index):
         """Подсветка играющего трека"""
@@ -112,11 +163,7 @@ class PlaylistWidget(QWidget):
     def load_playlist(self, file_paths):
         """Загрузка плейлиста из списка путей"""
         self.clear_playlist()
-        for path in file_paths:
-            if os.path.exists(path):
-                self.tracks.append(path)
-                self.list_widget.addItem(os.path.basename(path))
-        self.playlist_updated.emit(self.tracks)
+        self.add_tracks([path for path in file_paths if os.path.exists(path)])
 
     def save_playlist(self, file_path):
         """Сохранение плейлиста в файл"""
@@ -126,7 +173,7 @@ class PlaylistWidget(QWidget):
                     f.write(f"{track}\n")
             return True
         except Exception as e:
-            print(f"Ошибка при сохранении плейлиста: {e}")
+            logger.error("Ошибка при сохранении плейлиста %s: %s", file_path, e)
             return False
 
     def get_current_track(self):
@@ -0,0 +1,277 @@
+"""Очередь воспроизведения: порядок плейлиста, перемешивание, «играть следующим», повтор.
+
+Треки адресуются постоянными идентификаторами, а не позициями, поэтому
+вставка и удаление не сдвигают ни текущий трек, ни очередь, ни историю.
+Порядок плейлиста хранится двусвязным списком, перемешивание — ленивым
+Фишером–Йетсом: следующий трек тянется случайно из ещё не сыгранных
+только в момент перехода, и весь порядок никогда не строится целиком.
+Переходы, вставки и удаления — O(1) (амортизированно); только включение
+перемешивания один раз проходит по уже сыгранным трекам. Модуль не
+зависит от Qt.
+"""
+import random
+from collections import deque
+
+REPEAT_OFF, REPEAT_ALL, REPEAT_ONE = 0, 1, 2
+# Сколько треков помнит «назад»
+HISTORY_SIZE = 200
+
+
+class IndexedSet:
+    """Множество со случайным извлечением: список плюс позиции элементов"""
+
+    def __init__(self):
+        self.items = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def add(self, item):
+        if item not in self.positions:
+            self.positions[item] = len(self.items)
+            self.items.append(item)
+
+    def discard(self, item):
+        position = self.positions.pop(item, None)
+        if position is None:
+            return
+        # Последний элемент встаёт на место удалённого
+        last = self.items.pop()
+        if position < len(self.items):
+            self.items[position] = last
+            self.positions[last] = position
+
+    def pop_random(self, rng):
+        item = self.items[rng.randrange(len(self.items))]
+        self.discard(item)
+        return item
+
+
+class PlayQueue:
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+        self.tracks = {}        # id -> путь
+        self.next_of = {}
+        self.prev_of = {}
+        self.head = None
+        self.tail = None
+        self.next_id = 1
+
+        self.current = None
+        # Соседи удалённого текущего трека: от них продолжается последовательный порядок
+        self.detached = (None, None)
+        self.up_next = deque()  # «играть следующим» и «добавить в очередь»
+        # При перемешивании «назад» идёт по истории, а «вперёд» после него — обратно
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.future = []
+
+        self.shuffle = False
+        self.repeat = REPEAT_OFF
+        # Цикл перемешивания: ещё не сыгранные и уже сыгранные
+        self.undrawn = IndexedSet()
+        self.drawn = IndexedSet()
+        # Следующий трек перемешивания, вытянутый заранее ради peek()
+        self.peeked = None
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def __contains__(self, track_id):
+        return track_id in self.tracks
+
+    # Плейлист
+
+    def add(self, path):
+        """Трек в конец плейлиста; возвращает его постоянный id"""
+        track_id = self.next_id
+        self.next_id += 1
+        self.tracks[track_id] = path
+        self.prev_of[track_id] = self.tail
+        self.next_of[track_id] = None
+        if self.tail is None:
+            self.head = track_id
+        else:
+            self.next_of[self.tail] = track_id
+        self.tail = track_id
+        self.undrawn.add(track_id)
+        return track_id
+
+    def extend(self, paths):
+        return [self.add(path) for path in paths]
+
+    def remove(self, track_id):
+        """Удаляет трек; очередь и история забывают его лениво"""
+        if track_id not in self.tracks:
+            return
+        before, after = self.prev_of.pop(track_id), self.next_of.pop(track_id)
+        if before is None:
+            self.head = after
+        else:
+            self.next_of[before] = after
+        if after is None:
+            self.tail = before
+        else:
+            self.prev_of[after] = before
+        del self.tracks[track_id]
+        self.undrawn.discard(track_id)
+        self.drawn.discard(track_id)
+
+        if track_id == self.current:
+            self.current = None
+            self.detached = (before, after)
+        elif self.current is None:
+            detached_before, detached_after = self.detached
+            self.detached = (before if detached_before == track_id else detached_before,
+                             after if detached_after == track_id else detached_after)
+
+    def clear(self):
+        rng, shuffle, repeat = self.rng, self.shuffle, self.repeat
+        self.__init__(rng)
+        self.shuffle, self.repeat = shuffle, repeat
+
+    def path(self, track_id):
+        return self.tracks.get(track_id)
+
+    # Очередь
+
+    def play_next(self, track_id):
+        if track_id in self.tracks:
+            self.up_next.appendleft(track_id)
+
+    def enqueue(self, track_id):
+        if track_id in self.tracks:
+            self.up_next.append(track_id)
+
+    def set_shuffle(self, enabled):
+        if self.peeked is not None:
+            # Вытянутый заранее трек возвращается в несыгранные
+            if self.peeked in self.tracks:
+                self.undrawn.add(self.peeked)
+            self.peeked = None
+        if enabled and not self.shuffle:
+            # Новый цикл: всё, кроме текущего, снова не сыграно
+            for track_id in list(self.drawn.items):
+                if track_id != self.current:
+                    self.drawn.discard(track_id)
+                    self.undrawn.add(track_id)
+        self.future.clear()
+        self.shuffle = enabled
+
+    def set_repeat(self, mode):
+        self.repeat = mode
+
+    # Переходы
+
+    def play(self, track_id):
+        """Выбор трека пользователем"""
+        if track_id not in self.tracks:
+            return None
+        self.future.clear()
+        self.jump(track_id)
+        return track_id
+
+    def peek(self):
+        """Трек, который вернёт next(auto=True), без перехода; None — конец очереди"""
+        if self.repeat == REPEAT_ONE and self.current is not None:
+            return self.current
+        if self.shuffle:
+            for track_id in reversed(self.future):
+                if track_id in self.tracks:
+                    return track_id
+        for track_id in self.up_next:
+            if track_id in self.tracks:
+                return track_id
+        if not self.shuffle:
+            return self.sequential_next()
+        if self.peeked not in self.tracks:
+            self.peeked = self.draw()
+        return self.peeked
+
+    def jump(self, track_id):
+        if track_id == self.peeked:
+            self.peeked = None
+        if self.current is not None and self.current != track_id:
+            self.history.append(self.current)
+        self.current = track_id
+        self.detached = (None, None)
+        # Выбранный вручную трек в этом цикле перемешивания уже сыгран
+        self.undrawn.discard(track_id)
+        self.drawn.add(track_id)
+
+    def next(self, auto=False):
+        """Следующий трек или None; auto — трек доиграл сам (для повтора одного)"""
+        if auto and self.repeat == REPEAT_ONE and self.current is not None:
+            return self.current
+        track_id = self.pop_alive(self.future) if self.shuffle else None
+        if track_id is None:
+            track_id = self.pop_alive(self.up_next, left=True)
+        if track_id is None:
+            track_id = self.draw() if self.shuffle else self.sequential_next()
+        if track_id is not None:
+            self.jump(track_id)
+        return track_id
+
+    def previous(self):
+        """По порядку плейлиста; при перемешивании — по истории"""
+        if not self.shuffle:
+            track_id = self.sequential_previous()
+            if track_id is not None:
+                self.jump(track_id)
+            return track_id
+        track_id = self.pop_alive(self.history)
+        if track_id is None:
+            return None
+        if self.current is not None:
+            self.future.append(self.current)
+        # В историю не пишем: «назад» не должно возвращаться само к себе
+        self.current = None
+        self.jump(track_id)
+        return track_id
+
+    def pop_alive(self, container, left=False):
+        """Первый ещё существующий трек; удалённые id просто пропускаются"""
+        while container:
+            track_id = container.popleft() if left else container.pop()
+            if track_id in self.tracks:
+                return track_id
+        return None
+
+    def draw(self):
+        if self.peeked is not None:
+            candidate, self.peeked = self.peeked, None
+            if candidate in self.tracks:
+                return candidate
+        if not self.undrawn:
+            if self.repeat != REPEAT_ALL or not self.drawn:
+                return None
+            # Новый цикл: сыгранные снова становятся кандидатами, без перестроения
+            self.undrawn, self.drawn = self.drawn, self.undrawn
+        candidate = self.undrawn.pop_random(self.rng)
+        if candidate == self.current and self.undrawn:
+            # Не начинаем новый цикл с только что сыгранного трека
+            other = self.undrawn.pop_random(self.rng)
+            self.undrawn.add(candidate)
+            candidate = other
+        return candidate
+
+    def sequential_next(self):
+        if self.current is not None:
+            following = self.next_of[self.current]
+        elif self.detached == (None, None):
+            # Ещё ничего не играло (или удалён единственный трек) — с начала
+            following = self.head
+        else:
+            following = self.detached[1]
+        if following is None and self.repeat == REPEAT_ALL:
+            following = self.head
+        return following
+
+    def sequential_previous(self):
+        preceding = self.prev_of[self.current] if self.current is not None else self.detached[0]
+        if preceding is None and self.repeat == REPEAT_ALL:
+            preceding = self.tail
+        return preceding
@@ -0,0 +1,235 @@
+"""Источник с упреждающим чтением для треков на медленных и сетевых дисках.
+
+QMediaPlayer читает файл мелкими порциями прямо во время воспроизведения,
+и любая задержка NFS/SMB превращается в заикание. ReadAheadDevice отдаёт
+плееру данные из памяти, а фоновый поток заранее читает файл крупными
+последовательными блоками — не больше READ_AHEAD_CHUNKS вперёд. Если
+плеер всё же обогнал чтение (недогрузка), это считается в underruns.
+TrackBuffer держит текущий трек и заранее прогревает следующий.
+"""
+import os
+import threading
+
+from PyQt6.QtCore import QIODevice
+
+CHUNK_SIZE = 1024 * 1024
+# Окно упреждения: не больше READ_AHEAD_CHUNKS блоков (16 МБ) на трек
+READ_AHEAD_CHUNKS = 16
+# Столько блоков читается у следующего трека, пока он ещё не играет
+PREWARM_CHUNKS = 2
+# Назад держим блок: ffmpeg часто возвращается на несколько байт
+BEHIND_CHUNKS = 1
+REMOTE_FILESYSTEMS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "fuse.sshfs",
+                      "fuse.rclone", "fuse.gvfsd-fuse", "davfs", "ceph", "glusterfs"}
+# always / never; по умолчанию буферизуются только треки на сетевых ФС
+MODE_ENV = "NUROS_MEDIAPLAYER_READAHEAD"
+
+
+def mount_type(path):
+    """Тип ФС по самой длинной точке монтирования в /proc/self/mounts (без stat)"""
+    path = os.path.abspath(path)
+    best, best_type = "", None
+    try:
+        with open("/proc/self/mounts") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mountpoint = fields[1].replace("\\040", " ")
+                if (path == mountpoint or path.startswith(mountpoint.rstrip("/") + "/")) \
+                        and len(mountpoint) > len(best):
+                    best, best_type = mountpoint, fields[2]
+    except OSError:
+        return None
+    return best_type
+
+
+def needs_buffering(path):
+    mode = os.environ.get(MODE_ENV, "")
+    if mode == "always":
+        return True
+    if mode == "never":
+        return False
+    return mount_type(path) in REMOTE_FILESYSTEMS
+
+
+class ReadAheadDevice(QIODevice):
+    """Файл с произвольным доступом, который читается заранее в фоновом потоке.
+
+    readData() вызывается из потока демультиплексора плеера и ждёт, пока
+    нужный блок не будет прочитан; GUI-поток не блокируется.
+    """
+
+    def __init__(self, path, prewarm=False):
+        super().__init__()
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        self.file_size = os.fstat(self.fd).st_size
+        self.chunk_count = (self.file_size + CHUNK_SIZE - 1) // CHUNK_SIZE
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(self.fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        self.chunks = {}  # номер блока -> bytes
+        self.wanted = 0   # блок, который сейчас читает плеер
+        self.ahead = PREWARM_CHUNKS if prewarm else READ_AHEAD_CHUNKS
+        self.error = None
+        self.closed = False
+        self.underruns = 0
+        self.delivered = False
+        self.condition = threading.Condition()
+
+        self.reader = threading.Thread(target=self.read_loop, name="readahead", daemon=True)
+        self.reader.start()
+
+    def activate(self):
+        """Прогретый трек начал играть: упреждение на полное окно"""
+        with self.condition:
+            self.ahead = READ_AHEAD_CHUNKS
+            self.condition.notify_all()
+        return self.open(QIODevice.OpenModeFlag.ReadOnly | QIODevice.OpenModeFlag.Unbuffered)
+
+    def read_loop(self):
+        while True:
+            with self.condition:
+                index = self.next_missing()
+                while index is None and not self.closed:
+                    self.condition.wait()
+                    index = self.next_missing()
+                if self.closed:
+                    break
+            # Чтение без блокировки: плеер тем временем берёт готовые блоки
+            try:
+                data = os.pread(self.fd, CHUNK_SIZE, index * CHUNK_SIZE)
+            except OSError as e:
+                with self.condition:
+                    self.error = e
+                    self.condition.notify_all()
+                break
+            with self.condition:
+                if self.wanted - BEHIND_CHUNKS <= index < self.wanted + self.ahead:
+                    self.chunks[index] = data
+                self.condition.notify_all()
+        os.close(self.fd)
+
+    def next_missing(self):
+        """Первый непрочитанный блок окна; за окном блоки выбрасываются"""
+        low = self.wanted - BEHIND_CHUNKS
+        high = min(self.wanted + self.ahead, self.chunk_count)
+        for index in [index for index in self.chunks if not low <= index < high]:
+            del self.chunks[index]
+        for index in range(self.wanted, high):
+            if index not in self.chunks:
+                return index
+        return None
+
+    # QIODevice
+
+    def isSequential(self):
+        return False
+
+    def size(self):
+        return self.file_size
+
+    def bytesAvailable(self):
+        return self.file_size - self.pos() + super().bytesAvailable()
+
+    def readData(self, maxlen):
+        position = self.pos()
+        if position >= self.file_size or maxlen <= 0:
+            return b""
+        index, offset = divmod(position, CHUNK_SIZE)
+        with self.condition:
+            # Недогрузка — ожидание при последовательном чтении, а не после перемотки
+            sequential = self.delivered and self.wanted <= index <= self.wanted + 1
+            if index != self.wanted:
+                # Перемотка или переход к следующему блоку: сдвигаем окно
+                self.wanted = index
+                self.condition.notify_all()
+            if index not in self.chunks:
+                if sequential:
+                    self.underruns += 1
+                while index not in self.chunks and self.error is None and not self.closed:
+                    self.condition.wait()
+            chunk = self.chunks.get(index)
+        if chunk is None:
+            return b""
+        self.delivered = True
+        return chunk[offset:offset + maxlen]
+
+    def writeData(self, data):
+        return -1
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.chunks.clear()
+            self.condition.notify_all()
+        super().close()
+
+
+class TrackBuffer:
+    """Текущий и прогреваемый следующий трек.
+
+    Прежнее устройство закрывается только в retire(), после того как плеер
+    переключился на новый источник: иначе старый поток получил бы конец
+    файла и плеер решил бы, что трек доиграл.
+    """
+
+    def __init__(self):
+        self.current = None
+        self.previous = None
+        self.next = None
+        # Недогрузки уже закрытых треков
+        self.past_underruns = 0
+
+    @property
+    def underruns(self):
+        """Сколько раз плеер ждал данных за всё время"""
+        return self.past_underruns + sum(device.underruns for device in
+                                         (self.current, self.previous) if device is not None)
+
+    def open(self, path):
+        """Устройство для трека (прогретое, если угадали) или None без буферизации"""
+        self.retire()
+        self.previous, self.current = self.current, None
+        if not needs_buffering(path):
+            return None
+        if self.next is not None and self.next.path == path:
+            device, self.next = self.next, None
+        else:
+            try:
+                device = ReadAheadDevice(path)
+            except OSError:
+                return None
+        device.activate()
+        self.current = device
+        return device
+
+    def retire(self):
+        """Закрывает устройство прошлого трека"""
+        if self.previous is not None:
+            self.past_underruns += self.previous.underruns
+            self.previous.close()
+            self.previous = None
+
+    def prewarm(self, path):
+        """Начинает читать следующий трек, пока играет текущий"""
+        if self.next is not None:
+            if self.next.path == path:
+                return
+            self.next.close()
+            self.next = None
+        if path is None or not needs_buffering(path):
+            return
+        if self.current is not None and self.current.path == path:
+            return
+        try:
+            self.next = ReadAheadDevice(path, prewarm=True)
+        except OSError:
+            self.next = None
+
+    def close(self):
+        self.retire()
+        self.previous, self.current = self.current, None
+        self.retire()
+        self.prewarm(None)
@@ -0,0 +1,125 @@
+"""Сессия медиаплеера: плейлист, очередь, текущий трек, позиция и громкость.
+
+Плейлист хранится отдельно от остального состояния: компактный двоичный
+файл (заголовок и пути через NUL) переписывается только при изменении
+списка, а маленький state.json с текущим треком и позицией — хоть каждые
+несколько секунд воспроизведения. Записи копятся и сбрасываются не чаще
+раза в SAVE_DELAY; оба файла заменяются атомарно. Номер поколения
+плейлиста в state.json защищает от пары файлов из разных записей.
+"""
+import json
+import logging
+import os
+import struct
+
+from PyQt6.QtCore import QObject, QTimer
+
+logger = logging.getLogger(__name__)
+
+PLAYLIST_FILE = "playlist.bin"
+STATE_FILE = "state.json"
+MAGIC = b"NMPL"
+FORMAT_VERSION = 1
+# Сигнатура, версия, поколение, число треков
+HEADER = struct.Struct("<4sHQI")
+# Настройки, которые не ссылаются на строки плейлиста
+GLOBAL_KEYS = ("volume", "shuffle", "repeat")
+# Как долго копятся изменения перед записью, мс
+SAVE_DELAY = 2000
+
+
+def session_dir():
+    """Каталог сессии в XDG state dir"""
+    base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    path = os.path.join(base, "nuros-mediaplayer", "session")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_atomic(path, data):
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def encode_playlist(generation, paths):
+    body = b"\0".join(os.fsencode(path) for path in paths)
+    return HEADER.pack(MAGIC, FORMAT_VERSION, generation, len(paths)) + body
+
+
+def decode_playlist(data):
+    """(поколение, пути) или None для чужого или повреждённого файла"""
+    if len(data) < HEADER.size:
+        return None
+    magic, version, generation, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+    if not count:
+        return generation, []
+    # Одно декодирование на весь файл вместо fsdecode на каждый путь
+    paths = data[HEADER.size:].decode("utf-8", "surrogateescape").split("\0")
+    if len(paths) != count:
+        return None
+    return generation, paths
+
+
+class SessionStore(QObject):
+    """Пишет сессию с задержкой; пути и состояние спрашивает у окна при записи"""
+
+    def __init__(self, paths, state, directory=None, parent=None):
+        super().__init__(parent)
+        self.paths = paths
+        self.state = state
+        self.directory = directory or session_dir()
+        self.generation = 0
+        self.playlist_dirty = False
+
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(SAVE_DELAY)
+        self.save_timer.timeout.connect(self.flush)
+
+    def load(self):
+        """(пути, состояние); ссылки на строки отбрасываются, если state.json от другого плейлиста"""
+        try:
+            with open(os.path.join(self.directory, PLAYLIST_FILE), "rb") as f:
+                playlist = decode_playlist(f.read())
+        except OSError:
+            playlist = None
+        paths = []
+        if playlist is not None:
+            self.generation, paths = playlist
+        try:
+            with open(os.path.join(self.directory, STATE_FILE), encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        if not isinstance(state, dict):
+            return paths, {}
+        if state.get("playlist") != self.generation:
+            state = {key: state[key] for key in GLOBAL_KEYS if key in state}
+        return paths, state
+
+    def mark(self, playlist=False):
+        """Что-то изменилось; playlist — изменился сам список треков"""
+        self.playlist_dirty |= playlist
+        # Не перезапускаем таймер: во время воспроизведения позиция меняется
+        # постоянно, и запись иначе откладывалась бы бесконечно
+        if not self.save_timer.isActive():
+            self.save_timer.start()
+
+    def flush(self):
+        self.save_timer.stop()
+        state = self.state()
+        try:
+            if self.playlist_dirty:
+                self.generation += 1
+                write_atomic(os.path.join(self.directory, PLAYLIST_FILE),
+                             encode_playlist(self.generation, self.paths()))
+                self.playlist_dirty = False
+            state["playlist"] = self.generation
+            write_atomic(os.path.join(self.directory, STATE_FILE),
+                         json.dumps(state).encode("utf-8"))
+        except OSError as e:
+            logger.error("Ошибка при сохранении сессии: %s", e)
@@ -0,0 +1,260 @@
+"""Анализатор спектра плеера: БПФ в рабочем потоке, столбцы по логарифму частоты.
+
+GUI-поток только дописывает декодированные отсчёты в кольцевой буфер.
+Рабочий поток с ограниченной частотой кадров берёт последние FFT_SIZE
+отсчётов, умножает на окно Ханна и считает БПФ в заранее выделенных
+массивах; виджету уходят лишь BAND_COUNT уровней. Время расчёта и
+отрисовки замеряется, и если вместе они занимают больше LOAD_BUDGET одного
+ядра, частота кадров снижается. На паузе поток засыпает.
+"""
+import threading
+import time
+
+import numpy as np
+from PyQt6.QtCore import QCoreApplication, QObject, QRectF, QThread, QTimer, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QColor, QPainter
+from PyQt6.QtWidgets import QWidget
+
+FFT_SIZE = 2048
+RING_SIZE = FFT_SIZE * 4
+BAND_COUNT = 32
+MIN_FREQUENCY = 40
+MAX_FREQUENCY = 16000
+# Уровень, соответствующий пустому столбцу, дБ относительно полной шкалы
+DB_FLOOR = -70
+# Доля предыдущего уровня, остающаяся через кадр: столбцы опускаются плавно
+DECAY = 0.85
+# Интервал кадров, мс: ~30 кадров/с и не реже 10 кадров/с при перегрузке
+FRAME_INTERVAL = 33
+MAX_FRAME_INTERVAL = 100
+# Доля одного ядра на БПФ и отрисовку
+LOAD_BUDGET = 0.03
+# За сколько секунд усредняется нагрузка
+LOAD_WINDOW = 2.0
+# rfft с out= появился в NumPy 2.0
+RFFT_HAS_OUT = np.lib.NumpyVersion(np.__version__) >= "2.0.0"
+
+
+def band_starts(sample_rate):
+    """Первые бины столбцов (логарифмическая шкала) и конец последнего"""
+    top = min(MAX_FREQUENCY, sample_rate / 2 * 0.95)
+    edges = np.geomspace(MIN_FREQUENCY, top, BAND_COUNT + 1)
+    bins = (edges * FFT_SIZE / sample_rate).astype(int)
+    # Внизу несколько столбцов попадают в один бин — раздвигаем их по одному бину
+    for i in range(1, len(bins)):
+        bins[i] = max(bins[i], bins[i - 1] + 1)
+    return bins[:-1], bins[-1]
+
+
+class PcmRing:
+    """Последние отсчёты моно-сигнала: пишет GUI-поток, читает рабочий"""
+
+    def __init__(self, size=RING_SIZE):
+        self.data = np.zeros(size, np.float32)
+        self.position = 0
+        self.sample_rate = 0
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def write(self, samples, sample_rate):
+        size = len(self.data)
+        samples = samples[-size:]
+        count = len(samples)
+        with self.lock:
+            end = self.position + count
+            if end <= size:
+                self.data[self.position:end] = samples
+            else:
+                first = size - self.position
+                self.data[self.position:] = samples[:first]
+                self.data[:count - first] = samples[first:]
+            self.position = end % size
+            self.sample_rate = sample_rate
+            self.generation += 1
+
+    def read_latest(self, out):
+        """Копирует последние len(out) отсчётов; возвращает (поколение, частота)"""
+        size = len(self.data)
+        count = len(out)
+        with self.lock:
+            start = (self.position - count) % size
+            if start + count <= size:
+                out[:] = self.data[start:start + count]
+            else:
+                first = size - start
+                out[:first] = self.data[start:]
+                out[first:] = self.data[:count - first]
+            return self.generation, self.sample_rate
+
+
+class SpectrumWorker(QObject):
+    levels_ready = pyqtSignal(object, float)  # уровни 0..1, время расчёта, с
+    idle = pyqtSignal()
+
+    def __init__(self, ring):
+        super().__init__()
+        self.ring = ring
+        self.timer = None
+        self.interval = FRAME_INTERVAL
+        self.last_generation = -1
+        self.sample_rate = 0
+        self.starts = None
+        self.stop_bin = 0
+
+        # Все буферы расчёта выделены один раз
+        self.frame = np.zeros(FFT_SIZE, np.float32)
+        self.window = np.hanning(FFT_SIZE).astype(np.float32)
+        self.spectrum = np.zeros(FFT_SIZE // 2 + 1, np.complex64)
+        self.power = np.zeros(FFT_SIZE // 2 + 1, np.float32)
+        self.levels = np.zeros(BAND_COUNT, np.float32)
+        # Мощность синусоиды полной шкалы в пике спектра с этим окном
+        self.reference = (self.window.sum() / 2) ** 2
+
+    @pyqtSlot()
+    def start(self):
+        if self.timer is None:
+            self.timer = QTimer()
+            self.timer.timeout.connect(self.tick)
+        self.timer.start(self.interval)
+
+    @pyqtSlot()
+    def stop(self):
+        if self.timer is not None:
+            self.timer.stop()
+
+    @pyqtSlot(int)
+    def set_interval(self, interval):
+        self.interval = interval
+        if self.timer is not None and self.timer.isActive():
+            self.timer.start(interval)
+
+    def tick(self):
+        started = time.perf_counter()
+        generation, sample_rate = self.ring.read_latest(self.frame)
+        if generation != self.last_generation and sample_rate:
+            self.last_generation = generation
+            self.analyze(sample_rate)
+        else:
+            # Новых отсчётов нет (пауза): столбцы опускаются, потом поток засыпает
+            self.levels *= DECAY
+            if self.levels.max() < 0.01:
+                self.levels[:] = 0
+                self.timer.stop()
+                self.idle.emit()
+        self.levels_ready.emit(self.levels.copy(), time.perf_counter() - started)
+
+    def analyze(self, sample_rate):
+        if sample_rate != self.sample_rate:
+            self.sample_rate = sample_rate
+            self.starts, self.stop_bin = band_starts(sample_rate)
+        np.multiply(self.frame, self.window, out=self.frame)
+        if RFFT_HAS_OUT:
+            np.fft.rfft(self.frame, out=self.spectrum)
+        else:
+            self.spectrum[:] = np.fft.rfft(self.frame)
+        np.abs(self.spectrum, out=self.power)
+        np.square(self.power, out=self.power)
+        # Столбец показывает самый громкий бин своей полосы
+        bands = np.maximum.reduceat(self.power[:self.stop_bin], self.starts)
+        decibels = 10 * np.log10(bands / self.reference + 1e-12)
+        current = np.clip(1 - decibels / DB_FLOOR, 0, 1)
+        np.maximum(current, self.levels * DECAY, out=self.levels)
+
+
+class SpectrumWidget(QWidget):
+    _start_requested = pyqtSignal()
+    _stop_requested = pyqtSignal()
+    _interval_changed = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(80)
+        self.levels = np.zeros(BAND_COUNT, np.float32)
+        self.color = QColor("#1db954")
+        self.ring = PcmRing()
+        self.thread = None
+        self.worker = None
+        self.running = False
+
+        self.interval = FRAME_INTERVAL
+        self.busy = 0.0
+        self.frames = 0
+        self.window_start = time.perf_counter()
+        self.load = 0.0
+
+    def ensure_thread(self):
+        if self.thread is not None:
+            return
+        self.thread = QThread()
+        self.worker = SpectrumWorker(self.ring)
+        self.worker.moveToThread(self.thread)
+        self._start_requested.connect(self.worker.start)
+        self._stop_requested.connect(self.worker.stop)
+        self._interval_changed.connect(self.worker.set_interval)
+        self.worker.levels_ready.connect(self.on_levels)
+        self.worker.idle.connect(self.on_idle)
+        # Поток не должен пережить приложение, кто бы ни владел виджетом
+        QCoreApplication.instance().aboutToQuit.connect(self.shutdown)
+        self.thread.start()
+
+    def feed(self, samples, sample_rate):
+        """Моно-отсчёты float32 из воспроизведения"""
+        self.ring.write(samples, sample_rate)
+        if not self.running and self.isVisible():
+            self.ensure_thread()
+            self.running = True
+            self._start_requested.emit()
+
+    def on_idle(self):
+        self.running = False
+
+    def on_levels(self, levels, compute_time):
+        self.levels = levels
+        self.busy += compute_time
+        self.frames += 1
+        self.update()
+        self.check_budget()
+
+    def check_budget(self):
+        """Снижает частоту кадров, если БПФ и отрисовка съедают больше LOAD_BUDGET ядра"""
+        elapsed = time.perf_counter() - self.window_start
+        if elapsed < LOAD_WINDOW:
+            return
+        self.load = self.busy / elapsed
+        interval = self.interval
+        if self.load > LOAD_BUDGET:
+            interval = min(self.interval * 2, MAX_FRAME_INTERVAL)
+        elif self.load < LOAD_BUDGET / 3:
+            interval = max(self.interval // 2, FRAME_INTERVAL)
+        if interval != self.interval:
+            self.interval = interval
+            self._interval_changed.emit(interval)
+        self.setToolTip(f"Спектр: {self.frames / elapsed:.0f} кадров/с, "
+                        f"БПФ и отрисовка — {self.load:.1%} ядра")
+        self.busy = 0.0
+        self.frames = 0
+        self.window_start = time.perf_counter()
+
+    def paintEvent(self, event):
+        started = time.perf_counter()
+        painter = QPainter(self)
+        width = self.width() / BAND_COUNT
+        height = self.height()
+        for index, level in enumerate(self.levels.tolist()):
+            if level > 0:
+                bar = level * height
+                painter.fillRect(QRectF(index * width + 1, height - bar, width - 2, bar), self.color)
+        painter.end()
+        self.busy += time.perf_counter() - started
+
+    def hideEvent(self, event):
+        # Скрытый анализатор не считает: следующий feed() после показа запустит его снова
+        if self.running:
+            self._stop_requested.emit()
+            self.running = False
+        super().hideEvent(event)
+
+    def shutdown(self):
+        if self.thread is not None and self.thread.isRunning():
+            self.thread.quit()
+            self.thread.wait()